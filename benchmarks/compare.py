@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script compares two results files written by run.py, printing the median wall time and peak memory of each phase of each preset side by side.
+"""
+
+import argparse
+import collections
+import json
+import logging
+import os
+import statistics
+import sys
+import typing
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# (preset, phase, error class or "")
+PhaseKey = typing.Tuple[str, str, str]
+
+
+def summarize(
+    results: typing.Dict[str, typing.Any]
+) -> typing.Dict[PhaseKey, typing.Tuple[float, typing.Optional[int]]]:
+    """
+    Reduce a results file to the median wall time and the maximum memory use of each phase, over all repeats.  The memory use of the "total" phase, the whole review process, is its resident set size high-water mark.  That of other phases is their peak of traced Python allocations if recorded, otherwise their increase in resident set size.
+    """
+    # Key: Phase key.
+    # Value: Lists of wall times, and of peak memory figures.
+    wall_seconds: typing.DefaultDict[
+        PhaseKey, typing.List[float]
+    ] = collections.defaultdict(list)
+    peak_bytes: typing.DefaultDict[
+        PhaseKey, typing.List[int]
+    ] = collections.defaultdict(list)
+    for run in results["runs"]:
+        profile = run["profile"]
+        total_key = (run["preset"], "total", "")
+        wall_seconds[total_key].append(run["wall_seconds"])
+        # Profiles before format version 2 named the high-water mark peak_rss_bytes.
+        process_peak_rss_bytes = profile.get(
+            "process_peak_rss_bytes", profile.get("peak_rss_bytes")
+        )
+        if process_peak_rss_bytes is not None:
+            peak_bytes[total_key].append(process_peak_rss_bytes)
+        for phase in profile["phases"]:
+            key = (run["preset"], phase["phase"], phase.get("error_class", ""))
+            wall_seconds[key].append(phase["wall_seconds"])
+            # Traced allocations include memory allocated and freed within the phase, so are preferred when available.  The process's high-water mark is not specific to the phase, so is not used.
+            phase_peak = phase.get("peak_traced_bytes", phase.get("rss_increase_bytes"))
+            if phase_peak is not None:
+                peak_bytes[key].append(phase_peak)
+    return {
+        key: (
+            statistics.median(wall_seconds[key]),
+            max(peak_bytes[key]) if key in peak_bytes else None,
+        )
+        for key in wall_seconds
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        help="Exit in an error state if any phase's median wall time in candidate_json is more than this ratio of its time in baseline_json (e.g. 1.2).",
+    )
+    parser.add_argument("baseline_json")
+    parser.add_argument("candidate_json")
+    args = parser.parse_args()
+
+    with open(args.baseline_json, "r") as in_fh:
+        baseline = summarize(json.load(in_fh))
+    with open(args.candidate_json, "r") as in_fh:
+        candidate = summarize(json.load(in_fh))
+
+    def _format_bytes(n_bytes: typing.Optional[int]) -> str:
+        if n_bytes is None:
+            return "-"
+        return "%.1fMiB" % (n_bytes / (1024 * 1024))
+
+    regressions = []
+    print(
+        "\t".join(
+            [
+                "preset",
+                "phase",
+                "error_class",
+                "baseline_s",
+                "candidate_s",
+                "ratio",
+                "baseline_mem",
+                "candidate_mem",
+            ]
+        )
+    )
+    for key in sorted(set(baseline.keys()) | set(candidate.keys())):
+        (baseline_seconds, baseline_bytes) = baseline.get(key, (float("nan"), None))
+        (candidate_seconds, candidate_bytes) = candidate.get(key, (float("nan"), None))
+        ratio = (
+            candidate_seconds / baseline_seconds
+            if baseline_seconds > 0
+            else float("nan")
+        )
+        if args.threshold is not None and ratio > args.threshold:
+            regressions.append(key)
+        print(
+            "\t".join(
+                [
+                    key[0],
+                    key[1],
+                    key[2].rsplit("/", 1)[-1],
+                    "%.4f" % baseline_seconds,
+                    "%.4f" % candidate_seconds,
+                    "%.2f" % ratio,
+                    _format_bytes(baseline_bytes),
+                    _format_bytes(candidate_bytes),
+                ]
+            )
+        )
+
+    if len(regressions) > 0:
+        for key in regressions:
+            _logger.error("Regression in preset %r, phase %r, error class %r.", *key)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script generates synthetic OWL/SHACL ontologies for benchmarking case_shacl_inheritance_reviewer.
+
+Each ontology is a class tree of a given depth and fan-out.  Every class is also a node shape, with a number of property shapes.  Each property shape constrains a property of its own, with sh:class, sh:minCount and sh:maxCount, and that property is the bottom of its own rdfs:subPropertyOf chain.  So, a generated ontology has no inheritance errors except for those planted at the requested violation density.  A planted violation is one property shape on a class that broadens a property shape of the class's parent, rotating among the error classes the reviewer implements.
+
+A JSON summary of the generated ontology, including the number of results a review should report, is printed to stdout.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import typing
+
+import rdflib.util
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+NS_EX = rdflib.Namespace("http://example.org/ontology/benchmark/")
+NS_OWL = rdflib.OWL
+NS_RDF = rdflib.RDF
+NS_RDFS = rdflib.RDFS
+NS_SH = rdflib.SH
+NS_XSD = rdflib.XSD
+
+# sh:class, spelled out because "class" is a Python keyword.
+N_SH_CLASS = rdflib.URIRef(str(NS_SH) + "class")
+
+# Key: Preset name.
+# Value: Generation parameters.
+PRESETS: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+    "tiny": {
+        "depth": 2,
+        "fanout": 2,
+        "property_shapes": 2,
+        "subproperty_chain": 1,
+        "violation_density": 0.5,
+    },
+    "small": {
+        "depth": 4,
+        "fanout": 3,
+        "property_shapes": 3,
+        "subproperty_chain": 1,
+        "violation_density": 0.1,
+    },
+    # Of the order of UCO: a few hundred classes, a thousand or so property shapes, and a few thousand properties.
+    "uco": {
+        "depth": 5,
+        "fanout": 3,
+        "property_shapes": 3,
+        "subproperty_chain": 2,
+        "violation_density": 0.05,
+    },
+    "deep": {
+        "depth": 40,
+        "fanout": 1,
+        "property_shapes": 5,
+        "subproperty_chain": 1,
+        "violation_density": 0.1,
+    },
+    "wide": {
+        "depth": 2,
+        "fanout": 30,
+        "property_shapes": 3,
+        "subproperty_chain": 1,
+        "violation_density": 0.05,
+    },
+    "broken": {
+        "depth": 4,
+        "fanout": 3,
+        "property_shapes": 3,
+        "subproperty_chain": 1,
+        "violation_density": 1.0,
+    },
+    "large": {
+        "depth": 6,
+        "fanout": 4,
+        "property_shapes": 4,
+        "subproperty_chain": 3,
+        "violation_density": 0.02,
+    },
+}
+
+# Order in which planted violations rotate among error classes.
+VIOLATION_KINDS = ["class", "datatype", "maxCount", "minCount", "path"]
+
+
+def generate(
+    depth: int,
+    fanout: int,
+    property_shapes: int,
+    subproperty_chain: int,
+    violation_density: float,
+    seed: int = 0,
+) -> typing.Tuple[rdflib.Graph, typing.Dict[str, typing.Any]]:
+    """
+    Return a generated ontology, and a summary of its size and planted violations.
+    """
+    rng = random.Random(seed)
+    graph = rdflib.Graph()
+    graph.bind("ex", NS_EX)
+    graph.bind("owl", NS_OWL)
+    graph.bind("sh", NS_SH)
+
+    # Key: Class.
+    # Value: Parent class, or None for the root.
+    class_parents: typing.Dict[rdflib.URIRef, typing.Optional[rdflib.URIRef]] = dict()
+    # Key: Class.
+    # Value: Local name, encoding the class's position in the tree (e.g. "C-0-2").
+    class_names: typing.Dict[rdflib.URIRef, str] = dict()
+    generation = [NS_EX["C"]]
+    class_parents[NS_EX["C"]] = None
+    class_names[NS_EX["C"]] = "C"
+    for _ in range(depth):
+        next_generation = []
+        for n_parent in generation:
+            for child_index in range(fanout):
+                child_name = "%s-%d" % (class_names[n_parent], child_index)
+                n_child = NS_EX[child_name]
+                class_parents[n_child] = n_parent
+                class_names[n_child] = child_name
+                next_generation.append(n_child)
+        generation = next_generation
+    classes = list(class_parents.keys())
+    non_root_classes = [x for x in classes if class_parents[x] is not None]
+
+    n_properties = 0
+    # Key: Class.
+    # Value: List of (property shape, path, path's superproperty or None, sh:class value) tuples.
+    class_shapes: typing.Dict[
+        rdflib.URIRef,
+        typing.List[
+            typing.Tuple[
+                rdflib.BNode,
+                rdflib.URIRef,
+                typing.Optional[rdflib.URIRef],
+                rdflib.URIRef,
+            ]
+        ],
+    ] = dict()
+    for n_class in classes:
+        graph.add((n_class, NS_RDF.type, NS_OWL.Class))
+        graph.add((n_class, NS_RDF.type, NS_SH.NodeShape))
+        n_class_parent = class_parents[n_class]
+        if n_class_parent is not None:
+            graph.add((n_class, NS_RDFS.subClassOf, n_class_parent))
+
+        class_shapes[n_class] = []
+        for shape_index in range(property_shapes):
+            n_path = NS_EX["%s-p%d" % (class_names[n_class], shape_index)]
+            graph.add((n_path, NS_RDF.type, NS_OWL.ObjectProperty))
+            n_properties += 1
+            n_path_superproperty: typing.Optional[rdflib.URIRef] = None
+            n_link = n_path
+            for chain_index in range(subproperty_chain):
+                n_superproperty = NS_EX[
+                    "%s-p%d-super%d" % (class_names[n_class], shape_index, chain_index)
+                ]
+                graph.add((n_superproperty, NS_RDF.type, NS_OWL.ObjectProperty))
+                graph.add((n_link, NS_RDFS.subPropertyOf, n_superproperty))
+                n_properties += 1
+                if n_path_superproperty is None:
+                    n_path_superproperty = n_superproperty
+                n_link = n_superproperty
+
+            # Range classes are non-root, so a planted sh:class violation can broaden to the range's parent.
+            n_range = rng.choice(non_root_classes) if non_root_classes else n_class
+
+            n_property_shape = rdflib.BNode()
+            graph.add((n_class, NS_SH.property, n_property_shape))
+            graph.add((n_property_shape, NS_SH.path, n_path))
+            graph.add((n_property_shape, N_SH_CLASS, n_range))
+            graph.add((n_property_shape, NS_SH.datatype, NS_XSD.integer))
+            graph.add((n_property_shape, NS_SH.minCount, rdflib.Literal(1)))
+            graph.add((n_property_shape, NS_SH.maxCount, rdflib.Literal(1)))
+            class_shapes[n_class].append(
+                (n_property_shape, n_path, n_path_superproperty, n_range)
+            )
+
+    # Key: Error class kind.
+    # Value: Number planted.
+    planted: typing.Dict[str, int] = {x: 0 for x in VIOLATION_KINDS}
+    violation_kinds = [
+        x for x in VIOLATION_KINDS if x != "path" or subproperty_chain > 0
+    ]
+    if property_shapes > 0:
+        for n_class in non_root_classes:
+            if rng.random() >= violation_density:
+                continue
+            n_broadened_class = class_parents[n_class]
+            assert n_broadened_class is not None
+            (_, n_path, n_path_superproperty, n_range) = rng.choice(
+                class_shapes[n_broadened_class]
+            )
+            kind = violation_kinds[sum(planted.values()) % len(violation_kinds)]
+            n_property_shape = rdflib.BNode()
+            graph.add((n_class, NS_SH.property, n_property_shape))
+            if kind == "class":
+                n_range_parent = class_parents[n_range]
+                assert n_range_parent is not None
+                graph.add((n_property_shape, NS_SH.path, n_path))
+                graph.add((n_property_shape, N_SH_CLASS, n_range_parent))
+            elif kind == "datatype":
+                graph.add((n_property_shape, NS_SH.path, n_path))
+                graph.add((n_property_shape, NS_SH.datatype, NS_XSD.decimal))
+            elif kind == "maxCount":
+                graph.add((n_property_shape, NS_SH.path, n_path))
+                graph.add((n_property_shape, NS_SH.maxCount, rdflib.Literal(2)))
+            elif kind == "minCount":
+                graph.add((n_property_shape, NS_SH.path, n_path))
+                graph.add((n_property_shape, NS_SH.minCount, rdflib.Literal(0)))
+            else:
+                assert n_path_superproperty is not None
+                graph.add((n_property_shape, NS_SH.path, n_path_superproperty))
+            planted[kind] += 1
+
+    summary = {
+        "parameters": {
+            "depth": depth,
+            "fanout": fanout,
+            "property_shapes": property_shapes,
+            "subproperty_chain": subproperty_chain,
+            "violation_density": violation_density,
+            "seed": seed,
+        },
+        "classes": len(classes),
+        "properties": n_properties,
+        "property_shapes": len(classes) * property_shapes + sum(planted.values()),
+        "triples": len(graph),
+        "planted_violations": planted,
+        "expected_results": sum(planted.values()),
+    }
+    return (graph, summary)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--preset",
+        choices=sorted(PRESETS.keys()),
+        default="small",
+        help="Parameters to start from.  Any of the other generation options override the preset's value.  (Default: %(default)s.)",
+    )
+    parser.add_argument("--depth", type=int, help="Depth of the class tree.")
+    parser.add_argument(
+        "--fanout", type=int, help="Number of subclasses of each non-leaf class."
+    )
+    parser.add_argument(
+        "--property-shapes", type=int, help="Number of property shapes per class."
+    )
+    parser.add_argument(
+        "--subproperty-chain",
+        type=int,
+        help="Length of the rdfs:subPropertyOf chain above each property.",
+    )
+    parser.add_argument(
+        "--violation-density",
+        type=float,
+        help="Fraction of non-root classes with a planted inheritance error.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "out_graph", help="Output file.  Format is guessed from the extension."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    parameters = dict(PRESETS[args.preset])
+    for key in parameters:
+        if getattr(args, key) is not None:
+            parameters[key] = getattr(args, key)
+
+    (graph, summary) = generate(seed=args.seed, **parameters)
+    summary["preset"] = args.preset
+    _logger.debug("Serializing %d triples...", len(graph))
+    graph.serialize(
+        args.out_graph, format=rdflib.util.guess_format(args.out_graph) or "turtle"
+    )
+    print(json.dumps(summary, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
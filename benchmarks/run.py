@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script runs case_shacl_inheritance_reviewer against generated ontologies, and records wall time and peak memory per phase of each review to a JSON results file.  Results files from different versions can be compared with compare.py.
+
+Each review runs in its own process, so memory figures of one review do not carry into the next.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+import rdflib.util
+
+# generate.py is a sibling script.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import generate  # noqa: E402
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Increment when the layout of the results file changes.
+RESULTS_FORMAT_VERSION = 1
+
+DEFAULT_PRESETS = ["small", "uco", "deep", "wide", "broken"]
+
+
+def run_review(
+    in_graph_filepath: str,
+    work_dir: str,
+    reviewer_args: typing.List[str],
+    trace_memory: bool,
+) -> typing.Dict[str, typing.Any]:
+    """
+    Review in_graph_filepath once, returning the run's wall time, result count and per-phase profile.
+    """
+    out_filepath = os.path.join(work_dir, "review.ttl")
+    profile_filepath = os.path.join(work_dir, "review-profile.json")
+    for filepath in [out_filepath, profile_filepath]:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+    env = dict(os.environ)
+    if trace_memory:
+        env["PYTHONTRACEMALLOC"] = "1"
+    command = (
+        ["case_shacl_inheritance_reviewer", "--profile", profile_filepath]
+        + reviewer_args
+        + [out_filepath, in_graph_filepath]
+    )
+    _logger.debug("Running %r...", command)
+    started = time.perf_counter()
+    subprocess.run(command, check=True, env=env)
+    wall_seconds = time.perf_counter() - started
+
+    with open(profile_filepath, "r") as profile_fh:
+        profile = json.load(profile_fh)
+    report_graph = rdflib.Graph()
+    report_graph.parse(
+        out_filepath, format=rdflib.util.guess_format(out_filepath) or "turtle"
+    )
+    results_tally = len(list(report_graph.triples((None, rdflib.SH.result, None))))
+    os.remove(out_filepath)
+    os.remove(profile_filepath)
+
+    return {
+        "wall_seconds": wall_seconds,
+        "results": results_tally,
+        "profile": profile,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--preset",
+        action="append",
+        choices=sorted(generate.PRESETS.keys()),
+        help="Generated ontology preset to review.  Repeat to run several presets.  (Default: %s.)"
+        % ", ".join(DEFAULT_PRESETS),
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of reviews of each ontology.  (Default: %(default)s.)",
+    )
+    parser.add_argument(
+        "--reviewer-args",
+        default="",
+        help="Further arguments for case_shacl_inheritance_reviewer, as one shell-quoted string (e.g. '--engine index').",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Run reviews with tracemalloc, to record the peak of traced Python allocations within each phase.  This slows the reviews, so wall times of traced and untraced runs should not be compared.",
+    )
+    parser.add_argument(
+        "--work-dir",
+        help="Directory for generated ontologies and reports.  A temporary directory is used if not provided.",
+    )
+    parser.add_argument("out_json", help="Results file.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    reviewer_args = shlex.split(args.reviewer_args)
+    presets = args.preset or DEFAULT_PRESETS
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        os.makedirs(work_dir, exist_ok=True)
+
+        runs = []
+        for preset in presets:
+            (graph, summary) = generate.generate(
+                seed=args.seed, **generate.PRESETS[preset]
+            )
+            in_graph_filepath = os.path.join(work_dir, "benchmark-%s.ttl" % preset)
+            graph.serialize(in_graph_filepath, format="turtle")
+            del graph
+
+            for repeat in range(args.repeat):
+                _logger.info(
+                    "Reviewing preset %r (%d of %d)...",
+                    preset,
+                    repeat + 1,
+                    args.repeat,
+                )
+                run = run_review(
+                    in_graph_filepath, work_dir, reviewer_args, args.trace_memory
+                )
+                if run["results"] != summary["expected_results"]:
+                    _logger.warning(
+                        "Preset %r review reported %d results, but %d were planted.",
+                        preset,
+                        run["results"],
+                        summary["expected_results"],
+                    )
+                run["preset"] = preset
+                run["repeat"] = repeat
+                run["summary"] = summary
+                runs.append(run)
+
+    results = {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "reviewer_args": reviewer_args,
+        "trace_memory": args.trace_memory,
+        "runs": runs,
+    }
+    with open(args.out_json, "w") as out_fh:
+        json.dump(results, out_fh, indent=2)
+        out_fh.write("\n")
+
+
+if __name__ == "__main__":
+    main()
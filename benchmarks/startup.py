@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script measures the startup cost of case_shacl_inheritance_reviewer: the time to import the package, the time of a --help run, and the time of reviews of a tiny ontology, each in fresh processes.  It also lists which of the slow-to-import subsystems are loaded by importing the package alone.
+
+The package's import time is read from Python's -X importtime report, so it excludes interpreter startup.  If its median exceeds the target, this script exits in an error state.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+# generate.py is a sibling script.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import generate  # noqa: E402
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Target median import time of the package, in milliseconds.  Most of this is rdflib's own import time.
+DEFAULT_TARGET_IMPORT_MS = 200.0
+
+# Modules that only some code paths need, and that should not be loaded by importing the package.
+DEFERRED_MODULES = [
+    "concurrent.futures",
+    "numpy",
+    "pyshacl",
+    "rdflib.plugins.parsers.ntriples",
+    "rdflib.plugins.sparql",
+    "rdflib.plugins.serializers.turtle",
+    "case_shacl_inheritance_reviewer.cache",
+    "case_shacl_inheritance_reviewer.catalog",
+    "case_shacl_inheritance_reviewer.index",
+    "case_shacl_inheritance_reviewer.load",
+    "case_shacl_inheritance_reviewer.queries",
+    "case_shacl_inheritance_reviewer.vectorized",
+]
+
+
+def import_milliseconds() -> float:
+    """
+    Import the package in a fresh interpreter, returning the cumulative import time of the package, in milliseconds.
+    """
+    completed_process = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import case_shacl_inheritance_reviewer",
+        ],
+        check=True,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    # Line format: "import time: self [us] | cumulative | imported package".
+    for line in completed_process.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == "case_shacl_inheritance_reviewer":
+            return int(fields[1]) / 1000
+    raise ValueError("Import time of case_shacl_inheritance_reviewer not reported.")
+
+
+def wall_milliseconds(command: typing.List[str]) -> float:
+    started = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - started) * 1000
+
+
+def loaded_deferred_modules() -> typing.List[str]:
+    """
+    Return the members of DEFERRED_MODULES that a fresh interpreter loads on importing the package.
+    """
+    completed_process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import json, sys; import case_shacl_inheritance_reviewer; print(json.dumps(sorted(sys.modules)))",
+        ],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    loaded_modules = set(json.loads(completed_process.stdout))
+    return [x for x in DEFERRED_MODULES if x in loaded_modules]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=10,
+        help="Number of runs of each measurement.  (Default: %(default)s.)",
+    )
+    parser.add_argument(
+        "--target-import-ms",
+        type=float,
+        default=DEFAULT_TARGET_IMPORT_MS,
+        help="Exit in an error state if the median import time of the package, in milliseconds, exceeds this.  (Default: %(default)s.)",
+    )
+    parser.add_argument(
+        "out_json",
+        nargs="?",
+        help="Results file.  Results are only logged if not provided.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        (graph, _) = generate.generate(seed=0, **generate.PRESETS["tiny"])
+        in_graph_filepath = os.path.join(tmp_dir, "startup-tiny.ttl")
+        graph.serialize(in_graph_filepath, format="turtle")
+        out_graph_filepath = os.path.join(tmp_dir, "startup-tiny-review.ttl")
+
+        # Key: Measurement name.
+        # Value: Command run for that measurement.
+        commands = {
+            "interpreter": [sys.executable, "-c", "pass"],
+            "help": ["case_shacl_inheritance_reviewer", "--help"],
+            "review_tiny_index": [
+                "case_shacl_inheritance_reviewer",
+                "--engine",
+                "index",
+                out_graph_filepath,
+                in_graph_filepath,
+            ],
+            "review_tiny_sparql": [
+                "case_shacl_inheritance_reviewer",
+                out_graph_filepath,
+                in_graph_filepath,
+            ],
+        }
+
+        # Key: Measurement name.
+        # Value: List of milliseconds, one per run.
+        runs: typing.Dict[str, typing.List[float]] = {"import": []}
+        for command_name in commands:
+            runs[command_name] = []
+        for repeat in range(args.repeat):
+            _logger.debug("Run %d of %d...", repeat + 1, args.repeat)
+            runs["import"].append(import_milliseconds())
+            for (command_name, command) in commands.items():
+                runs[command_name].append(wall_milliseconds(command))
+                # The reviewer does not overwrite reports.
+                if os.path.exists(out_graph_filepath):
+                    os.remove(out_graph_filepath)
+
+    medians = {k: statistics.median(v) for (k, v) in runs.items()}
+    for (measurement_name, median) in medians.items():
+        _logger.info("%s: median %.1f ms.", measurement_name, median)
+
+    loaded_modules = loaded_deferred_modules()
+    for loaded_module in loaded_modules:
+        _logger.warning("Importing the package loaded %r.", loaded_module)
+
+    if args.out_json is not None:
+        results = {
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "target_import_ms": args.target_import_ms,
+            "median_ms": medians,
+            "runs_ms": runs,
+            "loaded_deferred_modules": loaded_modules,
+        }
+        with open(args.out_json, "w") as out_fh:
+            json.dump(results, out_fh, indent=2)
+            out_fh.write("\n")
+
+    if medians["import"] > args.target_import_ms:
+        _logger.error(
+            "Median import time %.1f ms exceeds target of %.1f ms.",
+            medians["import"],
+            args.target_import_ms,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
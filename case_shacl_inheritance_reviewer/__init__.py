@@ -14,13 +14,25 @@
 __version__ = "0.3.0"
 
 import argparse
+import functools
 import logging
 import os
 import typing
 
-import rdflib.plugins.sparql
 import rdflib.util
 
+import case_shacl_inheritance_reviewer.context
+import case_shacl_inheritance_reviewer.datatypes
+import case_shacl_inheritance_reviewer.profiling
+import case_shacl_inheritance_reviewer.stream
+
+# The loading, catalog, cache and query compilation modules are imported where they are used, so runs that do not need them, such as --help, do not pay for their imports.
+if typing.TYPE_CHECKING:
+    from case_shacl_inheritance_reviewer.cache import GraphCache
+    from case_shacl_inheritance_reviewer.database import DatabaseIndex, SQLiteStore
+    from case_shacl_inheritance_reviewer.index import HierarchyIndex
+    from case_shacl_inheritance_reviewer.vectorized import VectorizedIndex
+
 _logger = logging.getLogger(os.path.basename(__file__))
 
 NS_RDF = rdflib.RDF
@@ -28,66 +40,46 @@ NS_RDFS = rdflib.RDFS
 NS_SH = rdflib.SH
 NS_SHIR = rdflib.Namespace("http://example.org/ontology/shacl-inheritance-review/")
 
+# Message of the ValueError an engine raises for an error class it cannot evaluate, formatted with the engine name and the error class IRI.
+UNKNOWN_ERROR_CLASS_MESSAGE = "The %s has no evaluation for error class %r."
+
 
 class ConformanceError(Exception):
     pass
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--debug", action="store_true")
-    parser.add_argument(
-        "--strict",
-        action="store_true",
-        help="Exit in an error state if any inheritance errors are reported (i.e. if conforms==False).  (The error report in out_graph will still be intact.)",
+def _datatype_values_clause(
+    datatype_broadening_pairs: typing.Iterable[
+        typing.Tuple[rdflib.URIRef, rdflib.URIRef]
+    ]
+) -> str:
+    """
+    Bind (?nClassPropertyShapeDatatype ?nSuperclassPropertyShapeDatatype) to each pair of datatype_broadening_pairs.  rdflib cannot evaluate an empty VALUES block, so no pairs is spelled as a filter that excludes every binding.  (rdflib also does not exclude bindings with FILTER (false), so the filter is a comparison.)
+    """
+    rows = sorted(
+        "    (%s %s)" % (x.n3(), y.n3()) for (x, y) in datatype_broadening_pairs
     )
-    parser.add_argument(
-        "--verbose",
-        action="store_true",
-        help="Augment debug log messages with timestamps.",
-    )
-    parser.add_argument(
-        "out_graph", help="Output file.  Required to not exist."
-    )  # Requirement is to prevent accidental overwrite of inputs.
-    parser.add_argument("in_graph", nargs="+")
-    args = parser.parse_args()
-
-    if os.path.exists(args.out_graph):
-        raise ValueError(
-            "File found where output graph was going to be written.  Please ensure first positional argument is a currently non-existent output file."
-        )
-
-    logging_kwargs: typing.Dict[str, typing.Any] = dict()
-    logging_kwargs["level"] = logging.DEBUG if args.debug else logging.INFO
-    logging_kwargs["format"] = (
-        "%(asctime)s:" + logging.BASIC_FORMAT if args.verbose else logging.BASIC_FORMAT
+    if len(rows) == 0:
+        return "  FILTER (1 = 0)"
+    return (
+        "  VALUES (?nClassPropertyShapeDatatype ?nSuperclassPropertyShapeDatatype) {\n"
+        + "\n".join(rows)
+        + "\n  }"
     )
-    logging.basicConfig(**logging_kwargs)
-
-    # Initialize output graph, and add carrying-documentation triple denoting what an InheritanceValidationReport is.
-    out_graph = rdflib.Graph()
-    out_graph.namespace_manager.bind("sh", NS_SH)
-    out_graph.namespace_manager.bind("shir", NS_SHIR)
 
-    # Add anchoring report node.
-    n_report = rdflib.BNode()
-    out_graph.add((n_report, NS_RDF.type, NS_SHIR.InheritanceValidationReport))
 
-    # Initialize and load input graph.
-    in_graph = rdflib.Graph()
-    for in_graph_filepath in args.in_graph:
-        _logger.debug("Loading graph in %r...", in_graph_filepath)
-        in_graph.parse(
-            in_graph_filepath, format=rdflib.util.guess_format(in_graph_filepath)
+def _error_class_iri_to_message_and_query(
+    datatype_broadening_pairs: typing.Optional[
+        typing.Iterable[typing.Tuple[rdflib.URIRef, rdflib.URIRef]]
+    ] = None
+) -> typing.Dict[str, typing.Tuple[str, str]]:
+    """
+    datatype_broadening_pairs is the (broader datatype, narrower datatype) pairs the sh:datatype query binds.  If not provided, the pairs of the built-in datatypes are used.
+    """
+    if datatype_broadening_pairs is None:
+        datatype_broadening_pairs = (
+            case_shacl_inheritance_reviewer.datatypes.builtin_broadening_pairs()
         )
-        _logger.debug("Loaded.")
-    nsdict = {k: v for (k, v) in in_graph.namespace_manager.namespaces()}
-
-    for prefix in nsdict:
-        out_graph.namespace_manager.bind(prefix, nsdict[prefix])
-
-    # Members: Triples, fit for argument to rdflib.Graph.triples().
-    triple_patterns_to_link = set()
 
     # Explain known "sub-shape" issues.
     # Key: String of IRI of SHIR error class.
@@ -170,6 +162,48 @@ WHERE {
         str(NS_SHIR["PropertyShapeComponentBroadenedError-class"])
     ] = (message_string, query_string)
 
+    message_string = "Subclass (sh:focusNode) has property shape (sh:value) corresponding with an ancestor class's (rdfs:seeAlso) property shape (sh:sourceShape).  However, the sh:datatype references on the two property shapes are inverted - the ancestor class property shape's sh:datatype is derived from the subclass shape's sh:datatype."
+    query_string = (
+        """\
+SELECT ?nClassNodeShape ?nClassPropertyShape ?nClassPropertyShapePath ?nSuperclassNodeShape ?nSuperclassPropertyShape ?nSuperclassPropertyShapePath
+WHERE {
+  ?nSuperclassNodeShape
+    a owl:Class ;
+    a sh:NodeShape ;
+    sh:property ?nSuperclassPropertyShape ;
+    .
+
+  ?nSuperclassPropertyShape
+    sh:datatype ?nSuperclassPropertyShapeDatatype ;
+    sh:path ?nSuperclassPropertyShapePath ;
+    .
+
+  ?nClassNodeShape
+    a owl:Class ;
+    a sh:NodeShape ;
+    rdfs:subClassOf+ ?nSuperclassNodeShape ;
+    sh:property ?nClassPropertyShape ;
+    .
+
+  ?nClassPropertyShape
+    sh:datatype ?nClassPropertyShapeDatatype ;
+    sh:path ?nClassPropertyShapePath ;
+    .
+
+  ?nClassPropertyShapePath
+    rdfs:subPropertyOf* ?nSuperclassPropertyShapePath ;
+    .
+
+"""
+        + _datatype_values_clause(datatype_broadening_pairs)
+        + """
+}
+"""
+    )
+    error_class_iri_to_message_and_query[
+        str(NS_SHIR["PropertyShapeComponentBroadenedError-datatype"])
+    ] = (message_string, query_string)
+
     message_string = "Subclass (sh:focusNode) has property shape (sh:value) from ancestor class (rdfs:seeAlso), but according to ancestor property shape (sh:sourceShape) has a lower sh:minCount."
     query_string = """\
 SELECT ?nClassNodeShape ?nClassPropertyShape ?nClassPropertyShapePath ?nSuperclassNodeShape ?nSuperclassPropertyShape ?nSuperclassPropertyShapePath
@@ -246,38 +280,616 @@ WHERE {
         str(NS_SHIR["PropertyShapeComponentBroadenedError-minCount"])
     ] = (message_string, query_string)
 
-    for error_class_iri in sorted(error_class_iri_to_message_and_query.keys()):
+    return error_class_iri_to_message_and_query
+
+
+if typing.TYPE_CHECKING:
+    # Key: String of IRI of SHIR error class.
+    # Value: Tuple.
+    #   0: Error message.
+    #   1: SPARQL query to find all applicable instances for error message.
+    ERROR_CLASS_IRI_TO_MESSAGE_AND_QUERY: typing.Dict[str, typing.Tuple[str, str]]
+
+
+@functools.lru_cache(maxsize=None)
+def _builtin_error_class_iri_to_message_and_query() -> typing.Dict[
+    str, typing.Tuple[str, str]
+]:
+    """
+    The messages and queries with the built-in datatype pairs, built on first use rather than at package import.
+    """
+    return _error_class_iri_to_message_and_query()
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name == "ERROR_CLASS_IRI_TO_MESSAGE_AND_QUERY":
+        return _builtin_error_class_iri_to_message_and_query()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+# Key: String of IRI of SHIR error class.
+# Value: Constraint predicate the error class reviews, as shir:reviews records in the ontology.
+ERROR_CLASS_IRI_TO_REVIEWED_PREDICATE = {
+    # sh:class, spelled out because "class" is a Python keyword.
+    str(NS_SHIR["PropertyShapeComponentBroadenedError-class"]): rdflib.URIRef(
+        str(NS_SH) + "class"
+    ),
+    str(NS_SHIR["PropertyShapeComponentBroadenedError-datatype"]): NS_SH.datatype,
+    str(NS_SHIR["PropertyShapeComponentBroadenedError-maxCount"]): NS_SH.maxCount,
+    str(NS_SHIR["PropertyShapeComponentBroadenedError-minCount"]): NS_SH.minCount,
+    str(NS_SHIR["PropertyShapeComponentBroadenedError-path"]): NS_SH.path,
+}
+
+# Key: Hierarchy predicate.
+# Value: Message of shir:HierarchyCycleError results for cycles of the predicate's links.
+HIERARCHY_PREDICATE_TO_CYCLE_MESSAGE = {
+    NS_RDFS.subClassOf: "Class (sh:focusNode) is on a cycle of rdfs:subClassOf links (sh:resultPath), with any other classes on the cycle (sh:value).  The classes on the cycle were reviewed as one class.",
+    NS_RDFS.subPropertyOf: "Property (sh:focusNode) is on a cycle of rdfs:subPropertyOf links (sh:resultPath), with any other properties on the cycle (sh:value).  The properties on the cycle were reviewed as one property.",
+}
+
+ENGINES = ["index", "numpy", "sparql", "sqlite"]
+
+
+def _review_sparql(
+    graph: rdflib.Graph,
+    nsdict: typing.Dict[str, rdflib.URIRef],
+    error_class_iri_to_query: typing.Dict[str, str],
+    prepared_queries: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    cache: typing.Optional["GraphCache"] = None,
+) -> typing.Iterator[typing.Tuple[str, typing.Any]]:
+    """
+    Yield (error class IRI, result row) pairs, running one SPARQL query per error class.
+
+    Each query repeats the join of subclass property shapes against ancestor property shapes, so run time grows with the number of error classes.  The join is not shared, because each query narrows it by its own constraint parameter, and the sh:path query joins paths in the other direction.  The index engine shares one candidate join across the error classes (see case_shacl_inheritance_reviewer.index.HierarchyIndex.review).
+
+    If prepared_queries is provided, it is used to reuse compiled queries, keyed by error class IRI, and is updated with newly compiled queries.  Queries not in prepared_queries are compiled, or read from cache if provided.
+    """
+    if prepared_queries is None:
+        prepared_queries = dict()
+    for error_class_iri in sorted(error_class_iri_to_query.keys()):
         _logger.debug("error_class_iri = %r.", error_class_iri)
-        (message_string, query_string) = error_class_iri_to_message_and_query[
-            error_class_iri
-        ]
 
-        _logger.debug("Compiling query...")
-        query_object = rdflib.plugins.sparql.processor.prepareQuery(
-            query_string, initNs=nsdict
-        )
-        _logger.debug("Compiled.")
+        if error_class_iri in prepared_queries:
+            query_object = prepared_queries[error_class_iri]
+        else:
+            # Imported here to keep the package's import time down.
+            from case_shacl_inheritance_reviewer.queries import prepare_query
+
+            query_object = prepare_query(
+                error_class_iri_to_query[error_class_iri], nsdict, cache
+            )
+            prepared_queries[error_class_iri] = query_object
 
         reported_first_result = False
         _logger.debug("Running query...")
-        for result in in_graph.query(query_object):
+        for result in graph.query(query_object):
             if not reported_first_result:
                 _logger.debug("Query now yielding results.")
                 reported_first_result = True
+            yield (error_class_iri, result)
+
+
+class ReviewResult(typing.NamedTuple):
+    """
+    One inheritance error found by a review.  The fields are named for the variables of the error classes' SPARQL queries.  A report records them as follows:
+
+    * class_node_shape - sh:focusNode
+    * class_property_shape - sh:value
+    * class_property_shape_path - (not recorded)
+    * superclass_node_shape - rdfs:seeAlso
+    * superclass_property_shape - sh:sourceShape
+    * superclass_property_shape_path - sh:resultPath
+    """
+
+    error_class_iri: str
+    class_node_shape: rdflib.term.Node
+    class_property_shape: typing.Optional[rdflib.term.Node]
+    class_property_shape_path: rdflib.term.Node
+    superclass_node_shape: rdflib.term.Node
+    superclass_property_shape: rdflib.term.Node
+    superclass_property_shape_path: rdflib.term.Node
+
+
+class ReviewReport(typing.NamedTuple):
+    """
+    The outcome of Reviewer.review().
+    """
+
+    # The report graph, or the streaming writer the report was written to.
+    graph: typing.Union[
+        rdflib.Graph, case_shacl_inheritance_reviewer.stream.NTriplesReportWriter
+    ]
+    # The shir:InheritanceValidationReport node.
+    node: rdflib.term.Node
+    results_tally: int
+    # Empty if results were not collected.
+    results: typing.List[ReviewResult]
+    # Whether the review stopped at a result cap, so results may be missing.
+    truncated: bool = False
+    # Number of rdfs:subClassOf and rdfs:subPropertyOf cycles reported.  Only condensed reviews report cycles.
+    hierarchy_cycles_tally: int = 0
+
+    @property
+    def conforms(self) -> bool:
+        return self.results_tally == 0 and self.hierarchy_cycles_tally == 0
+
+
+def is_truncated_report(report_graph: rdflib.Graph) -> bool:
+    """
+    True if report_graph holds a report marked shir:truncated true, by a review stopped at max_results.
+    """
+    for o_truncated in report_graph.objects(None, NS_SHIR.truncated):
+        if isinstance(o_truncated, rdflib.Literal) and o_truncated.toPython() is True:
+            return True
+    return False
+
+
+class Reviewer:
+    """
+    Reviews one already-loaded graph for inheritance errors.
+
+    Work that does not depend on the particular review, such as compiled SPARQL queries and the index engine's hierarchy closures, is kept for later reviews of the same graph.  If the graph is modified between reviews, call reset() first.
+
+    With engine="sqlite", a graph backed by a case_shacl_inheritance_reviewer.database.SQLiteStore is reviewed in its database.  Any other graph's schema triples are first copied into a temporary database.
+
+    With condense_hierarchies=True, the review runs over the class and property hierarchies condensed into their strongly connected components, with the index engine, whatever the engine (see case_shacl_inheritance_reviewer.index.HierarchyIndex).  Classes linked by owl:equivalentClass, properties linked by owl:equivalentProperty, and the members of rdfs:subClassOf and rdfs:subPropertyOf cycles are each reviewed as one class or property.  Each cycle is reported as a shir:HierarchyCycleError result.
+
+    With binding_ancestors=True, the sh:minCount and sh:maxCount checks are instead evaluated by one walk of the class hierarchy (see case_shacl_inheritance_reviewer.bounds), whatever the engine.  Each property shape loosening an inherited bound is then reported once, against its binding ancestor, rather than once per ancestor property shape it loosens.
+    """
+
+    def __init__(
+        self,
+        graph: rdflib.Graph,
+        engine: str = "sparql",
+        jobs: int = 1,
+        cache: typing.Optional["GraphCache"] = None,
+        binding_ancestors: bool = False,
+        condense_hierarchies: bool = False,
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine %r." % engine)
+        self.graph = graph
+        self.engine = engine
+        self.jobs = jobs
+        self.cache = cache
+        self.binding_ancestors = binding_ancestors
+        self.condense_hierarchies = condense_hierarchies
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Discard work kept from earlier reviews.
+        """
+        self._database_index: typing.Optional["DatabaseIndex"] = None
+        self._hierarchy_index: typing.Optional["HierarchyIndex"] = None
+        self._vectorized_index: typing.Optional["VectorizedIndex"] = None
+        # Key: String of IRI of SHIR error class.
+        # Value: Compiled SPARQL query.
+        self._prepared_queries: typing.Dict[str, typing.Any] = dict()
+        self._context_extractor = (
+            case_shacl_inheritance_reviewer.context.ContextExtractor(self.graph)
+        )
+        if self.engine != "sparql":
+            self.error_class_iri_to_message_and_query = (
+                _builtin_error_class_iri_to_message_and_query()
+            )
+        else:
+            # The sh:datatype query binds the datatype pairs of this graph, which can include datatypes the graph declares.  The other engines read the pairs when indexing.
+            self.error_class_iri_to_message_and_query = (
+                _error_class_iri_to_message_and_query(
+                    case_shacl_inheritance_reviewer.datatypes.broadening_pairs(
+                        case_shacl_inheritance_reviewer.datatypes.datatype_ancestors(
+                            self.graph
+                        )
+                    )
+                )
+            )
+
+    @property
+    def error_class_iris(self) -> typing.List[str]:
+        return sorted(self.error_class_iri_to_message_and_query.keys())
+
+    def check_costs(self) -> typing.Dict[str, int]:
+        """
+        Estimate the cost of each error class's check, as the number of triples in the graph with the constraint predicate the error class reviews.  Each side of a check's join is bounded by the property shapes with that predicate.
+        """
+        # Key: String of IRI of SHIR error class.
+        # Value: Estimated cost.
+        error_class_iri_to_cost: typing.Dict[str, int] = dict()
+        for error_class_iri in self.error_class_iris:
+            n_predicate = ERROR_CLASS_IRI_TO_REVIEWED_PREDICATE.get(error_class_iri)
+            if n_predicate is None:
+                error_class_iri_to_cost[error_class_iri] = len(self.graph)
+                continue
+            error_class_iri_to_cost[error_class_iri] = sum(
+                1 for _ in self.graph.triples((None, n_predicate, None))
+            )
+        return error_class_iri_to_cost
+
+    def check_order(self) -> typing.List[str]:
+        """
+        The error class IRIs, cheapest check first, as estimated by check_costs().
+        """
+        error_class_iri_to_cost = self.check_costs()
+        return sorted(
+            self.error_class_iris, key=lambda x: (error_class_iri_to_cost[x], x)
+        )
+
+    def database_index(
+        self,
+        profiler: typing.Optional[
+            case_shacl_inheritance_reviewer.profiling.PhaseProfiler
+        ] = None,
+    ) -> "DatabaseIndex":
+        """
+        The sqlite engine's closure and shape tables of the graph, built on first use.
+        """
+        # Imported here to avoid a circular import at package load.
+        from case_shacl_inheritance_reviewer.database import DatabaseIndex
+
+        if self._database_index is None:
+            if profiler is None:
+                profiler = case_shacl_inheritance_reviewer.profiling.PhaseProfiler()
+            with profiler.phase("index"):
+                self._database_index = DatabaseIndex(self.graph)
+        return self._database_index
+
+    def hierarchy_index(
+        self,
+        profiler: typing.Optional[
+            case_shacl_inheritance_reviewer.profiling.PhaseProfiler
+        ] = None,
+    ) -> "HierarchyIndex":
+        """
+        The index engine's indexes of the graph, built on first use.
+        """
+        # Imported here to avoid a circular import at package load.
+        from case_shacl_inheritance_reviewer.index import HierarchyIndex
+
+        if self._hierarchy_index is None:
+            if profiler is None:
+                profiler = case_shacl_inheritance_reviewer.profiling.PhaseProfiler()
+            with profiler.phase("index"):
+                self._hierarchy_index = HierarchyIndex(
+                    self.graph, condense=self.condense_hierarchies
+                )
+        return self._hierarchy_index
+
+    def vectorized_index(
+        self,
+        profiler: typing.Optional[
+            case_shacl_inheritance_reviewer.profiling.PhaseProfiler
+        ] = None,
+    ) -> "VectorizedIndex":
+        """
+        The numpy engine's bit matrices of the graph, built on first use.
+        """
+        # Imported here to avoid a circular import at package load.
+        from case_shacl_inheritance_reviewer.vectorized import VectorizedIndex
+
+        if self._vectorized_index is None:
+            hierarchy_index = self.hierarchy_index(profiler)
+            if profiler is None:
+                profiler = case_shacl_inheritance_reviewer.profiling.PhaseProfiler()
+            with profiler.phase("vectorize"):
+                self._vectorized_index = VectorizedIndex(hierarchy_index)
+        return self._vectorized_index
+
+    def prepare(self) -> None:
+        """
+        Do the work a review of this graph would keep for later reviews, without reviewing: build the index, numpy or sqlite engine's indexes, or compile the SPARQL queries.
+        """
+        if self.binding_ancestors:
+            self.hierarchy_index()
+        if self.engine == "index" or self.condense_hierarchies:
+            self.hierarchy_index()
+            return
+        elif self.engine == "numpy":
+            self.vectorized_index()
+            return
+        elif self.engine == "sqlite":
+            self.database_index()
+            return
+        # Imported here to keep the package's import time down.
+        from case_shacl_inheritance_reviewer.queries import prepare_query
+
+        nsdict = {k: v for (k, v) in self.graph.namespace_manager.namespaces()}
+        for error_class_iri in self.error_class_iris:
+            if error_class_iri in self._prepared_queries:
+                continue
+            _logger.debug("Compiling query for %r...", error_class_iri)
+            self._prepared_queries[error_class_iri] = prepare_query(
+                self.error_class_iri_to_message_and_query[error_class_iri][1],
+                nsdict,
+                self.cache,
+            )
+
+    def _review_phases(
+        self,
+        previous_report_graph: typing.Optional[rdflib.Graph],
+        delta_graph: typing.Optional[rdflib.Graph],
+        profiler: case_shacl_inheritance_reviewer.profiling.PhaseProfiler,
+        error_class_iris: typing.List[str],
+        per_error_class: bool = False,
+    ) -> typing.List[
+        typing.Tuple[
+            typing.Dict[str, str], typing.Iterator[typing.Tuple[str, typing.Any]]
+        ]
+    ]:
+        """
+        Return the review of error_class_iris as profiled phases, in the order of error_class_iris where an engine runs one phase per error class.  Each member is a tuple of the phase's details, and an iterator of (error class IRI, result row) pairs.
+
+        If per_error_class is True, the index and numpy engines also evaluate one error class at a time, in the order of error_class_iris, instead of all error classes in one pass.
+        """
+        if previous_report_graph is not None:
+            # Imported here to avoid a circular import at package load.
+            from case_shacl_inheritance_reviewer.incremental import review_incremental
+
+            return [
+                (
+                    dict(),
+                    review_incremental(
+                        self.hierarchy_index(profiler),
+                        self.graph,
+                        rdflib.Graph() if delta_graph is None else delta_graph,
+                        previous_report_graph,
+                        error_class_iris,
+                    ),
+                )
+            ]
+
+        review_phases: typing.List[
+            typing.Tuple[
+                typing.Dict[str, str], typing.Iterator[typing.Tuple[str, typing.Any]]
+            ]
+        ] = []
+        if self.binding_ancestors:
+            # Imported here to avoid a circular import at package load.
+            from case_shacl_inheritance_reviewer.bounds import (
+                BOUND_ERROR_CLASS_IRI_TO_PARAMETER_AND_COMPARE,
+                review_bounds,
+            )
+
+            bound_error_class_iris = [
+                x
+                for x in error_class_iris
+                if x in BOUND_ERROR_CLASS_IRI_TO_PARAMETER_AND_COMPARE
+            ]
+            if len(bound_error_class_iris) > 0:
+                review_phases.append(
+                    (
+                        dict(),
+                        review_bounds(
+                            self.hierarchy_index(profiler), bound_error_class_iris
+                        ),
+                    )
+                )
+            error_class_iris = [
+                x for x in error_class_iris if x not in bound_error_class_iris
+            ]
+            if len(error_class_iris) == 0:
+                return review_phases
+        return review_phases + self._engine_review_phases(
+            profiler, error_class_iris, per_error_class
+        )
+
+    def _engine_review_phases(
+        self,
+        profiler: case_shacl_inheritance_reviewer.profiling.PhaseProfiler,
+        error_class_iris: typing.List[str],
+        per_error_class: bool,
+    ) -> typing.List[
+        typing.Tuple[
+            typing.Dict[str, str], typing.Iterator[typing.Tuple[str, typing.Any]]
+        ]
+    ]:
+        """
+        Return the non-incremental review of error_class_iris by the engine, as _review_phases() does.
+        """
+        if self.engine == "index" or self.condense_hierarchies:
+            hierarchy_index = self.hierarchy_index(profiler)
+            if self.jobs > 1:
+                # Imported here to avoid a circular import at package load.
+                from case_shacl_inheritance_reviewer.parallel import review_parallel
+
+                # The worker pool is shared by all error classes, so runs within one phase.
+                return [
+                    (
+                        dict(),
+                        review_parallel(
+                            hierarchy_index,
+                            error_class_iris,
+                            self.jobs,
+                            per_error_class=per_error_class,
+                        ),
+                    )
+                ]
+            if per_error_class:
+                # Each error class's filter is run, lazily, within its own phase.
+                return [
+                    (
+                        {"error_class": error_class_iri},
+                        hierarchy_index.review([error_class_iri]),
+                    )
+                    for error_class_iri in error_class_iris
+                ]
+            return [(dict(), hierarchy_index.review(error_class_iris))]
+        elif self.engine == "numpy":
+            vectorized_index = self.vectorized_index(profiler)
+            if per_error_class:
+                # Each error class's filter is run, lazily, within its own phase.
+                return [
+                    (
+                        {"error_class": error_class_iri},
+                        vectorized_index.review([error_class_iri]),
+                    )
+                    for error_class_iri in error_class_iris
+                ]
+            return [(dict(), vectorized_index.review(error_class_iris))]
+        elif self.engine == "sqlite":
+            database_index = self.database_index(profiler)
+            # Each error class's SQL query is run, lazily, within its own phase.
+            return [
+                (
+                    {"error_class": error_class_iri},
+                    database_index.review([error_class_iri]),
+                )
+                for error_class_iri in error_class_iris
+            ]
+
+        nsdict = {k: v for (k, v) in self.graph.namespace_manager.namespaces()}
+        # Each error class's query is run, lazily, within its own phase.
+        return [
             (
-                n_class_node_shape,
-                n_class_property_shape,
-                n_class_property_shape_path,
-                n_superclass_node_shape,
-                n_superclass_property_shape,
-                n_superclass_property_shape_path,
-            ) = result
-            if n_class_property_shape is not None:
-                triple_patterns_to_link.add(
-                    (n_class_node_shape, None, n_class_property_shape)
+                {"error_class": error_class_iri},
+                _review_sparql(
+                    self.graph,
+                    nsdict,
+                    {
+                        error_class_iri: self.error_class_iri_to_message_and_query[
+                            error_class_iri
+                        ][1]
+                    },
+                    self._prepared_queries,
+                    self.cache,
+                ),
+            )
+            for error_class_iri in error_class_iris
+        ]
+
+    def results(
+        self,
+        previous_report_graph: typing.Optional[rdflib.Graph] = None,
+        delta_graph: typing.Optional[rdflib.Graph] = None,
+        profiler: typing.Optional[
+            case_shacl_inheritance_reviewer.profiling.PhaseProfiler
+        ] = None,
+        max_results: typing.Optional[int] = None,
+    ) -> typing.Iterator[ReviewResult]:
+        """
+        Yield each inheritance error in the graph.
+
+        If previous_report_graph is provided, the review is incremental: only node shapes that the triples of delta_graph could affect are reviewed again, and the previous report's other results are re-checked and carried forward.  delta_graph is expected to hold the current content of the files changed since the previous review.  Incremental reviews use the index engine.
+
+        Incremental reviews cannot be combined with binding_ancestors, as the previous report's results are re-checked one ancestor property shape at a time, or with condense_hierarchies.  A previous report marked shir:truncated true is refused, as the results it does not hold would not be found again for node shapes that delta_graph does not affect.
+
+        If max_results is provided, evaluation stops once that many results have been yielded and one more is found.  The "review" phase record where the further result was found is marked "truncated".  If no further result is found, every check has run to completion, and no record is marked.  Each engine then runs its checks one error class at a time, in check_order(), cheapest first, and checks not yet started when evaluation stops are not run.  The index and numpy engines otherwise evaluate every error class in one pass.
+        """
+        if previous_report_graph is not None and self.binding_ancestors:
+            raise ValueError(
+                "Incremental reviews cannot be combined with binding_ancestors."
+            )
+        if previous_report_graph is not None and self.condense_hierarchies:
+            raise ValueError(
+                "Incremental reviews cannot be combined with condense_hierarchies."
+            )
+        if previous_report_graph is not None and is_truncated_report(
+            previous_report_graph
+        ):
+            raise ValueError(
+                "Incremental reviews cannot start from a truncated previous report."
+            )
+        if profiler is None:
+            profiler = case_shacl_inheritance_reviewer.profiling.PhaseProfiler()
+        results_tally = 0
+        truncated = False
+        for (review_phase_details, error_class_results) in self._review_phases(
+            previous_report_graph,
+            delta_graph,
+            profiler,
+            self.error_class_iris if max_results is None else self.check_order(),
+            per_error_class=max_results is not None,
+        ):
+            if truncated:
+                break
+            # Key: String of IRI of SHIR error class.
+            # Value: Number of results in this phase.
+            error_class_results_tally = {
+                error_class_iri: 0
+                for error_class_iri in self.error_class_iris
+                if review_phase_details.get("error_class", error_class_iri)
+                == error_class_iri
+            }
+            with profiler.phase("review", **review_phase_details) as review_record:
+                for (error_class_iri, result) in error_class_results:
+                    if max_results is not None and results_tally >= max_results:
+                        # A result beyond the cap was found, so the results yielded are a subset.
+                        truncated = True
+                        review_record["truncated"] = True
+                        # Stop the engine's evaluation, such as worker processes, within the phase.
+                        close = getattr(error_class_results, "close", None)
+                        if close is not None:
+                            close()
+                        break
+                    error_class_results_tally[error_class_iri] += 1
+                    results_tally += 1
+                    yield ReviewResult(error_class_iri, *result)
+                review_record["results"] = sum(error_class_results_tally.values())
+                review_record["error_class_results"] = error_class_results_tally
+
+    def review(
+        self,
+        out_graph: typing.Union[
+            None,
+            rdflib.Graph,
+            case_shacl_inheritance_reviewer.stream.NTriplesReportWriter,
+        ] = None,
+        previous_report_graph: typing.Optional[rdflib.Graph] = None,
+        delta_graph: typing.Optional[rdflib.Graph] = None,
+        profiler: typing.Optional[
+            case_shacl_inheritance_reviewer.profiling.PhaseProfiler
+        ] = None,
+        annotate_profile: bool = False,
+        collect_results: bool = True,
+        max_results: typing.Optional[int] = None,
+    ) -> ReviewReport:
+        """
+        Review the graph, and write a shir:InheritanceValidationReport into out_graph.  If out_graph is not provided, a new graph is used.
+
+        See results() for the incremental review arguments.  If annotate_profile is True, the profile of each phase is added to the report node.  If collect_results is False, the returned report's results list is left empty, so memory does not grow with the number of results.
+
+        If max_results is provided, the review stops once that many results are found (see results()).  If it stopped with results left unreported, the report is a valid report of the results found so far, and its node is marked shir:truncated true.  A review finding exactly max_results results is not marked.
+        """
+        if profiler is None:
+            profiler = case_shacl_inheritance_reviewer.profiling.PhaseProfiler()
+
+        # Initialize output graph, and add carrying-documentation triple denoting what an InheritanceValidationReport is.
+        if out_graph is None:
+            out_graph = rdflib.Graph()
+        if isinstance(out_graph, rdflib.Graph):
+            out_graph.namespace_manager.bind("sh", NS_SH)
+            out_graph.namespace_manager.bind("shir", NS_SHIR)
+            for (prefix, namespace) in self.graph.namespace_manager.namespaces():
+                out_graph.namespace_manager.bind(prefix, namespace)
+
+        # Add anchoring report node.
+        n_report = rdflib.BNode()
+        out_graph.add((n_report, NS_RDF.type, NS_SHIR.InheritanceValidationReport))
+
+        # Members: (Node shape, property shape) pairs, whose link and property shape description are copied into the report.
+        shapes_to_link: typing.Set[
+            typing.Tuple[rdflib.term.Node, rdflib.term.Node]
+        ] = set()
+
+        results: typing.List[ReviewResult] = []
+        results_tally = 0
+        # Phase records from here on are this review's.
+        first_phase_index = len(profiler.phases)
+        for result in self.results(
+            previous_report_graph, delta_graph, profiler, max_results
+        ):
+            results_tally += 1
+            if collect_results:
+                results.append(result)
+            message_string = self.error_class_iri_to_message_and_query[
+                result.error_class_iri
+            ][0]
+            if result.class_property_shape is not None:
+                shapes_to_link.add(
+                    (result.class_node_shape, result.class_property_shape)
                 )
-            triple_patterns_to_link.add(
-                (n_superclass_node_shape, None, n_superclass_property_shape)
+            shapes_to_link.add(
+                (result.superclass_node_shape, result.superclass_property_shape)
             )
 
             n_inheritance_validation_result = rdflib.BNode()
@@ -286,32 +898,36 @@ WHERE {
                 (
                     n_inheritance_validation_result,
                     NS_RDF.type,
-                    rdflib.URIRef(error_class_iri),
+                    rdflib.URIRef(result.error_class_iri),
                 )
             )
             out_graph.add(
-                (n_inheritance_validation_result, NS_SH.focusNode, n_class_node_shape)
+                (
+                    n_inheritance_validation_result,
+                    NS_SH.focusNode,
+                    result.class_node_shape,
+                )
             )
             out_graph.add(
                 (
                     n_inheritance_validation_result,
                     NS_SH.resultPath,
-                    n_superclass_property_shape_path,
+                    result.superclass_property_shape_path,
                 )
             )
-            if n_class_property_shape is not None:
+            if result.class_property_shape is not None:
                 out_graph.add(
                     (
                         n_inheritance_validation_result,
                         NS_SH.value,
-                        n_class_property_shape,
+                        result.class_property_shape,
                     )
                 )
             out_graph.add(
                 (
                     n_inheritance_validation_result,
                     NS_SH.sourceShape,
-                    n_superclass_property_shape,
+                    result.superclass_property_shape,
                 )
             )
             out_graph.add(
@@ -328,34 +944,385 @@ WHERE {
                 (
                     n_inheritance_validation_result,
                     NS_RDFS.seeAlso,
-                    n_superclass_node_shape,
+                    result.superclass_node_shape,
                 )
             )
 
-    _logger.debug("error_class_iris reviewed.")
+        _logger.debug("error_class_iris reviewed.")
 
-    for triple_pattern in triple_patterns_to_link:
-        for triple in in_graph.triples(triple_pattern):
-            out_graph.add(triple)
-        # Pick up all triples of pattern's Object, presumed to be a sh:PropertyNode.
-        for triple in in_graph.triples((triple_pattern[2], None, None)):
-            out_graph.add(triple)
+        hierarchy_cycles_tally = 0
+        if self.condense_hierarchies:
+            for (n_predicate, n_members) in self.hierarchy_index(
+                profiler
+            ).hierarchy_cycles:
+                hierarchy_cycles_tally += 1
+                n_hierarchy_cycle_result = rdflib.BNode()
+                out_graph.add((n_report, NS_SH.result, n_hierarchy_cycle_result))
+                out_graph.add(
+                    (n_hierarchy_cycle_result, NS_RDF.type, NS_SHIR.HierarchyCycleError)
+                )
+                out_graph.add((n_hierarchy_cycle_result, NS_SH.focusNode, n_members[0]))
+                out_graph.add((n_hierarchy_cycle_result, NS_SH.resultPath, n_predicate))
+                for n_member in n_members[1:]:
+                    out_graph.add((n_hierarchy_cycle_result, NS_SH.value, n_member))
+                out_graph.add(
+                    (
+                        n_hierarchy_cycle_result,
+                        NS_SH.resultMessage,
+                        rdflib.Literal(
+                            HIERARCHY_PREDICATE_TO_CYCLE_MESSAGE[n_predicate]
+                        ),
+                    )
+                )
+                out_graph.add(
+                    (n_hierarchy_cycle_result, NS_SH.resultSeverity, NS_SH.Warning)
+                )
 
-    results_tally = len([x for x in out_graph.triples((None, NS_SH.result, None))])
-    # Report (extended) conformance.
-    out_graph.add((n_report, NS_SH.conforms, rdflib.Literal(results_tally == 0)))
+        with profiler.phase("link-context"):
+            # Members: Triples copied from the graph.  Collected before adding, as the streaming writer does not de-duplicate.
+            context_triples: typing.Set[
+                case_shacl_inheritance_reviewer.context.Triple
+            ] = set()
+            for (n_node_shape, n_property_shape) in shapes_to_link:
+                context_triples.update(
+                    self._context_extractor.link(n_node_shape, n_property_shape)
+                )
+            for triple in context_triples:
+                out_graph.add(triple)
 
-    serialize_kwargs: typing.Dict[str, typing.Any] = dict()
-    out_format = rdflib.util.guess_format(args.out_graph)
-    if out_format is not None:
-        serialize_kwargs["format"] = out_format
-    out_graph.serialize(args.out_graph, **serialize_kwargs)
+        # Report (extended) conformance.
+        out_graph.add(
+            (
+                n_report,
+                NS_SH.conforms,
+                rdflib.Literal(results_tally == 0 and hierarchy_cycles_tally == 0),
+            )
+        )
+
+        truncated = any(
+            x.get("truncated", False) for x in profiler.phases[first_phase_index:]
+        )
+        if truncated:
+            out_graph.add((n_report, NS_SHIR.truncated, rdflib.Literal(True)))
+
+        if annotate_profile:
+            profiler.annotate(out_graph, n_report)
+
+        return ReviewReport(
+            out_graph,
+            n_report,
+            results_tally,
+            results,
+            truncated,
+            hierarchy_cycles_tally,
+        )
+
+
+def main() -> None:
+    # Imported here to keep the package's import time down.
+    from case_shacl_inheritance_reviewer.cache import DEFAULT_MAX_BYTES, GraphCache
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--binding-ancestors",
+        action="store_true",
+        help="Report each property shape that loosens an inherited sh:minCount or sh:maxCount once, against the ancestor property shape setting the tightest bound it loosens, rather than once per ancestor property shape it loosens.  These two checks are then evaluated in one walk of the class hierarchy, whatever the --engine.  Not available with --previous-report.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for caching parsed in_graph files, keyed by a hash of their content, and compiled SPARQL queries.  Unchanged files skip parsing, and queries skip compilation, on later runs.  Caching is disabled if this is not provided.",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help="Size bound of the cache directory.  Least-recently-used entries are evicted past this size.  (Default: %(default)s.)",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Remove all entries from the cache directory before loading.",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="append",
+        metavar="CATALOG_XML",
+        help="OASIS XML catalog file, such as a Protégé catalog-v001.xml, mapping ontology IRIs to local files.  If provided, the owl:imports of the in_graph files are followed, and imported modules are loaded from the files the catalog maps them to, each parsed once.  With --jobs, modules are parsed in parallel as they are found.  Imports the catalog does not map are reported as warnings, and not loaded.  Repeat for more catalogs; earlier catalogs take precedence.",
+    )
+    parser.add_argument(
+        "--changed",
+        action="append",
+        metavar="CHANGED_GRAPH",
+        help="File changed since the review that produced --previous-report.  Repeat for each changed file.  Changed files are also expected among the in_graph files.",
+    )
+    parser.add_argument(
+        "--database",
+        metavar="DATABASE_FILE",
+        help="SQLite database file for the sqlite engine.  If the file was loaded by an earlier run from the same, unchanged, in_graph files, it is reused without parsing, along with the closures computed in it.  Otherwise it is emptied and loaded.  A temporary database is used if this is not provided.",
+    )
+    parser.add_argument(
+        "--condense-hierarchies",
+        action="store_true",
+        help="Condense the class and property hierarchies into their strongly connected components before checking.  Classes linked by owl:equivalentClass, properties linked by owl:equivalentProperty, and the members of rdfs:subClassOf and rdfs:subPropertyOf cycles are each reviewed as one class or property, rather than being checked against each other.  Each cycle is reported as a shir:HierarchyCycleError result, with severity sh:Warning.  Uses the index engine, regardless of --engine.  Not available with --previous-report.",
+    )
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="sparql",
+        help="Evaluation engine for the inheritance checks.  'sparql' runs one SPARQL query per error class.  'index' computes the rdfs:subClassOf and rdfs:subPropertyOf ancestor closures once and evaluates the same checks against those in-memory indexes.  'numpy' encodes the index engine's closures as bit matrices and evaluates the checks as array operations, and requires NumPy.  'sqlite' loads the in_graph schema triples into a SQLite database, as with --schema-only, computes the closures there with recursive queries, and evaluates the checks as SQL joins, so the input is not held in memory.  All engines produce the same report.  (Default: %(default)s.)",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Report only the first inheritance error, stopping once a second is found.  Same as --max-results 1.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes to use for parsing the in_graph files, and, with the index engine, for evaluating the checks.  Parsed files are merged in the order they were given, with the same namespace bindings as sequential loading.  Checks are divided among processes by disconnected components of the class hierarchy.  (Default: %(default)s.)",
+    )
+    parser.add_argument(
+        "--max-results",
+        type=int,
+        metavar="N",
+        help="Report at most N inheritance errors, stopping once a further error is found.  Checks are run cheapest first, estimated by how many property shapes each constrains.  out_graph is then a valid report of the errors reported, marked with shir:truncated true.  Use with --strict to fail on broken ontologies without reviewing them in full.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the cache directory, even if --cache-dir is provided.",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PROFILE_JSON",
+        help="Write the wall time, result count and memory use of each phase of the review (parsing, parsing each in_graph file, each error class, context linking, serialization) to this JSON file.",
+    )
+    parser.add_argument(
+        "--profile-annotations",
+        action="store_true",
+        help="Also record the profile of each phase up to serialization in out_graph, as shir:phaseProfile annotations on the shir:InheritanceValidationReport node.",
+    )
+    parser.add_argument(
+        "--previous-report",
+        help="Report of a previous review of the in_graph files.  Only node shapes that the --changed files could affect are reviewed again, and the previous report's other results are re-checked and carried forward.  The report is the same as a full review's.  Uses the index engine, regardless of --engine.  A report marked shir:truncated true is refused.",
+    )
+    parser.add_argument(
+        "--schema-only",
+        action="store_true",
+        help="Keep only the in_graph triples the checks and context linking read: class and property hierarchies, SHACL and OWL statements, RDF lists, and rdf:type statements of SHACL, OWL, RDF and RDFS classes.  Other triples, such as instance data, are dropped as they are parsed.  Triples about property shapes using other predicates, such as rdfs:comment, are then not copied into the report.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write results to out_graph as they are found, instead of building the report in memory.  Requires out_graph to be an N-Triples (.nt) file.",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Exit in an error state if any inheritance errors are reported (i.e. if conforms==False).  (The error report in out_graph will still be intact.)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Augment debug log messages with timestamps.",
+    )
+    parser.add_argument(
+        "out_graph", help="Output file.  Required to not exist."
+    )  # Requirement is to prevent accidental overwrite of inputs.
+    parser.add_argument("in_graph", nargs="+")
+    args = parser.parse_args()
+
+    if args.changed is not None and args.previous_report is None:
+        parser.error("--changed requires --previous-report.")
+    if args.binding_ancestors and args.previous_report is not None:
+        parser.error("--binding-ancestors cannot be used with --previous-report.")
+    if args.condense_hierarchies and args.previous_report is not None:
+        parser.error("--condense-hierarchies cannot be used with --previous-report.")
+    if args.database is not None and args.engine != "sqlite":
+        parser.error("--database requires --engine sqlite.")
+    if args.stream and rdflib.util.guess_format(args.out_graph) != "nt":
+        parser.error("--stream requires an N-Triples (.nt) out_graph.")
+    if args.fail_fast:
+        if args.max_results is not None:
+            parser.error("--fail-fast and --max-results are exclusive.")
+        args.max_results = 1
+    if args.max_results is not None and args.max_results < 1:
+        parser.error("--max-results must be at least 1.")
+
+    if os.path.exists(args.out_graph):
+        raise ValueError(
+            "File found where output graph was going to be written.  Please ensure first positional argument is a currently non-existent output file."
+        )
+
+    logging_kwargs: typing.Dict[str, typing.Any] = dict()
+    logging_kwargs["level"] = logging.DEBUG if args.debug else logging.INFO
+    logging_kwargs["format"] = (
+        "%(asctime)s:" + logging.BASIC_FORMAT if args.verbose else logging.BASIC_FORMAT
+    )
+    logging.basicConfig(**logging_kwargs)
+
+    # Imported here, once the arguments are checked, to keep the package's import time down.
+    from case_shacl_inheritance_reviewer.catalog import Catalog
+    from case_shacl_inheritance_reviewer.load import (
+        SchemaStore,
+        load_graph,
+        load_import_closure,
+    )
+
+    profiler = case_shacl_inheritance_reviewer.profiling.PhaseProfiler()
+
+    graph_cache: typing.Optional[GraphCache] = None
+    if args.cache_dir is not None:
+        graph_cache = GraphCache(args.cache_dir, max_bytes=args.cache_max_bytes)
+        if args.clear_cache:
+            graph_cache.clear()
+        if args.no_cache:
+            graph_cache = None
+
+    # Initialize and load input graph.
+    database_store: typing.Optional["SQLiteStore"] = None
+    # Settings that determine what a reusable database was loaded from.
+    load_settings = "\0".join(
+        [os.path.abspath(x) for x in args.in_graph]
+        + ["--catalog"]
+        + [os.path.abspath(x) for x in args.catalog or []]
+    )
+    reuse_database = False
+    if args.engine == "sqlite":
+        # Imported here to avoid a circular import at package load.
+        from case_shacl_inheritance_reviewer import database
+
+        database_store = database.SQLiteStore(args.database)
+        reuse_database = database_store.is_loaded(load_settings)
+        if not reuse_database:
+            database_store.clear()
+        in_graph = rdflib.Graph(store=database_store)
+    elif args.schema_only:
+        in_graph = rdflib.Graph(store=SchemaStore())
+    else:
+        in_graph = rdflib.Graph()
+    with profiler.phase("parse"):
+        if reuse_database:
+            _logger.debug("Reusing database %r.", args.database)
+        elif args.catalog is None:
+            load_graph(
+                in_graph,
+                args.in_graph,
+                jobs=args.jobs,
+                cache=graph_cache,
+                profiler=profiler,
+                schema_only=args.schema_only or database_store is not None,
+            )
+            if database_store is not None:
+                database_store.record_load(load_settings, args.in_graph)
+        else:
+            catalog = Catalog()
+            for catalog_filepath in args.catalog:
+                catalog.read(catalog_filepath)
+            loaded_filepaths = load_import_closure(
+                in_graph,
+                args.in_graph,
+                catalog,
+                jobs=args.jobs,
+                cache=graph_cache,
+                profiler=profiler,
+                schema_only=args.schema_only or database_store is not None,
+            )
+            _logger.debug(
+                "Loaded %d files, following owl:imports.", len(loaded_filepaths)
+            )
+            if database_store is not None:
+                database_store.record_load(
+                    load_settings, list(args.catalog) + loaded_filepaths
+                )
+
+    previous_report_graph: typing.Optional[rdflib.Graph] = None
+    delta_graph: typing.Optional[rdflib.Graph] = None
+    if args.previous_report is not None:
+        delta_graph = rdflib.Graph()
+        previous_report_graph = rdflib.Graph()
+        with profiler.phase("parse-previous"):
+            load_graph(
+                delta_graph,
+                args.changed or [],
+                cache=graph_cache,
+                schema_only=args.schema_only,
+            )
+            load_graph(previous_report_graph, [args.previous_report])
+        if is_truncated_report(previous_report_graph):
+            parser.error(
+                "--previous-report is marked shir:truncated true, so does not hold every result.  Review in full first."
+            )
+
+    reviewer = Reviewer(
+        in_graph,
+        engine=args.engine,
+        jobs=args.jobs,
+        cache=graph_cache,
+        binding_ancestors=args.binding_ancestors,
+        condense_hierarchies=args.condense_hierarchies,
+    )
+    # The streamed report is created only once the inputs are loaded, so a failed load leaves no output file behind.
+    out_graph: typing.Optional[
+        case_shacl_inheritance_reviewer.stream.NTriplesReportWriter
+    ] = None
+    if args.stream:
+        out_graph = case_shacl_inheritance_reviewer.stream.NTriplesReportWriter(
+            args.out_graph
+        )
+    try:
+        review_report = reviewer.review(
+            out_graph,
+            previous_report_graph=previous_report_graph,
+            delta_graph=delta_graph,
+            profiler=profiler,
+            # Serialization is not yet profiled, so is only in the --profile file.
+            annotate_profile=args.profile_annotations,
+            collect_results=False,
+            max_results=args.max_results,
+        )
+    except BaseException:
+        # Remove the partial report, so a rerun is not refused for the file existing.
+        if out_graph is not None:
+            out_graph.close()
+            os.remove(args.out_graph)
+        raise
+    results_tally = review_report.results_tally
+
+    with profiler.phase("serialize"):
+        if isinstance(review_report.graph, rdflib.Graph):
+            serialize_kwargs: typing.Dict[str, typing.Any] = dict()
+            out_format = rdflib.util.guess_format(args.out_graph)
+            if out_format is not None:
+                serialize_kwargs["format"] = out_format
+            review_report.graph.serialize(args.out_graph, **serialize_kwargs)
+        else:
+            review_report.graph.close()
+
+    if database_store is not None:
+        database_store.close()
+
+    if args.profile is not None:
+        profiler.write(args.profile)
+
+    count_messages = []
     if results_tally != 0:
-        count_message = (
-            "Encountered at least one shir:ShapeBroadenedError. (%d encountered.)"
-            % results_tally
+        count_messages.append(
+            "Encountered at least one shir:ShapeBroadenedError. (%d encountered%s.)"
+            % (
+                results_tally,
+                " before stopping" if review_report.truncated else "",
+            )
+        )
+    if review_report.hierarchy_cycles_tally != 0:
+        count_messages.append(
+            "Encountered %d rdfs:subClassOf or rdfs:subPropertyOf cycles (shir:HierarchyCycleError)."
+            % review_report.hierarchy_cycles_tally
         )
+    if len(count_messages) > 0:
+        count_message = "  ".join(count_messages)
         if args.strict:
             raise ConformanceError(count_message)
         else:
@@ -0,0 +1,348 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module reviews a batch of ontology bundles that share base modules, such as profiles and extensions that all import one core ontology.  The batch is described by a JSON manifest:
+
+    {
+      "base": ["core.ttl"],
+      "jobs": [
+        {"out_graph": "review-a.ttl", "in_graph": ["extension-a.ttl"]},
+        {"out_graph": "review-b.ttl", "in_graph": ["extension-b.ttl", "extension-c.ttl"]}
+      ]
+    }
+
+Each job's report is the same as the report of case_shacl_inheritance_reviewer, run on the base files followed by the job's in_graph files.  Relative paths are read relative to the manifest's directory.
+
+The base files are parsed once, in the parent process.  Each job is then reviewed in a worker process forked from the parent, which adds the job's files to its copy-on-write view of the base graph, so base triples are neither parsed nor copied again per job.  Each worker process reviews one job, and so always starts from the unmodified base graph.  With the index engine, the base graph is also reviewed once, and a job reviews again only the node shapes its files could affect, as an incremental review with the job's files as the changed files.
+
+On platforms without the fork start method, jobs are reviewed one at a time in the parent process, each on a copy of the base graph.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import typing
+
+import rdflib.util
+
+from case_shacl_inheritance_reviewer.cache import DEFAULT_MAX_BYTES, GraphCache
+from case_shacl_inheritance_reviewer.load import (
+    SchemaStore,
+    load_graph,
+    load_parse_result,
+    merge,
+)
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# 0: Output file path.
+# 1: Input file paths, loaded after the base files.
+BatchJob = typing.Tuple[str, typing.List[str]]
+
+
+class BatchSettings(typing.NamedTuple):
+    engine: str = "sparql"
+    cache: typing.Optional[GraphCache] = None
+    schema_only: bool = False
+
+
+# The base graph, and its report (with the index engine), each worker process reviews a job against, set by _initialize_worker.
+_worker_base: typing.Optional[
+    typing.Tuple[rdflib.Graph, typing.Optional[rdflib.Graph], BatchSettings]
+] = None
+
+
+def read_manifest(
+    manifest_filepath: str,
+) -> typing.Tuple[typing.List[str], typing.List[BatchJob]]:
+    """
+    Returns the base file paths and jobs of a batch manifest, with relative paths resolved against the manifest's directory.
+    """
+    with open(manifest_filepath, "r") as manifest_fh:
+        manifest_json = json.load(manifest_fh)
+    if not isinstance(manifest_json, dict):
+        raise ValueError("Manifest %r is not a JSON object." % manifest_filepath)
+
+    manifest_dirpath = os.path.dirname(os.path.abspath(manifest_filepath))
+
+    def _resolve(filepath: typing.Any) -> str:
+        if not isinstance(filepath, str):
+            raise ValueError(
+                "Manifest %r has a non-string file path, %r."
+                % (manifest_filepath, filepath)
+            )
+        return os.path.join(manifest_dirpath, filepath)
+
+    base_filepaths = [_resolve(x) for x in manifest_json.get("base", [])]
+    jobs: typing.List[BatchJob] = []
+    for job_json in manifest_json.get("jobs", []):
+        if not isinstance(job_json, dict) or "out_graph" not in job_json:
+            raise ValueError(
+                "Manifest %r has a job without an out_graph." % manifest_filepath
+            )
+        jobs.append(
+            (
+                _resolve(job_json["out_graph"]),
+                [_resolve(x) for x in job_json.get("in_graph", [])],
+            )
+        )
+
+    out_graph_filepaths = [x[0] for x in jobs]
+    if len(set(out_graph_filepaths)) != len(out_graph_filepaths):
+        raise ValueError(
+            "Manifest %r names an out_graph more than once." % manifest_filepath
+        )
+    return (base_filepaths, jobs)
+
+
+def review_job(
+    graph: rdflib.Graph,
+    base_report_graph: typing.Optional[rdflib.Graph],
+    job: BatchJob,
+    settings: BatchSettings,
+) -> int:
+    """
+    Add the job's input files to graph, which holds the base files, review it, and write the job's report.  Returns the number of results.
+
+    If base_report_graph is provided, it is the index engine's report of the base graph, and the review is incremental, reviewing again only node shapes the job's files could affect.
+    """
+    # Imported here to avoid a circular import at package load.
+    from case_shacl_inheritance_reviewer import Reviewer
+
+    (out_graph_filepath, in_graph_filepaths) = job
+
+    # Members: Triples of the job's files.
+    delta_graph = rdflib.Graph()
+    for in_graph_filepath in in_graph_filepaths:
+        _logger.debug("Loading graph in %r...", in_graph_filepath)
+        parse_result = load_parse_result(
+            in_graph_filepath, settings.cache, settings.schema_only
+        )
+        merge(delta_graph, parse_result)
+        # Namespace bindings are replayed into graph, so they are the same as loading the job's files after the base files.
+        for (args, kwargs) in parse_result[1]:
+            graph.bind(*args, **kwargs)
+    for triple in delta_graph:
+        graph.add(triple)
+
+    if base_report_graph is None:
+        reviewer = Reviewer(graph, engine=settings.engine, cache=settings.cache)
+        review_report = reviewer.review(collect_results=False)
+    else:
+        reviewer = Reviewer(graph, engine="index", cache=settings.cache)
+        review_report = reviewer.review(
+            previous_report_graph=base_report_graph,
+            delta_graph=delta_graph,
+            collect_results=False,
+        )
+
+    assert isinstance(review_report.graph, rdflib.Graph)
+    serialize_kwargs: typing.Dict[str, typing.Any] = dict()
+    out_format = rdflib.util.guess_format(out_graph_filepath)
+    if out_format is not None:
+        serialize_kwargs["format"] = out_format
+    review_report.graph.serialize(out_graph_filepath, **serialize_kwargs)
+    return review_report.results_tally
+
+
+def _initialize_worker(
+    graph: rdflib.Graph,
+    base_report_graph: typing.Optional[rdflib.Graph],
+    settings: BatchSettings,
+) -> None:
+    global _worker_base
+    _worker_base = (graph, base_report_graph, settings)
+
+
+def _review_job(job: BatchJob) -> typing.Tuple[str, int]:
+    """
+    Worker-process function.  Returns the job's output file path and number of results.
+    """
+    assert _worker_base is not None
+    (graph, base_report_graph, settings) = _worker_base
+    return (job[0], review_job(graph, base_report_graph, job, settings))
+
+
+def _copy_graph(graph: rdflib.Graph) -> rdflib.Graph:
+    graph_copy = rdflib.Graph()
+    for (prefix, namespace) in graph.namespaces():
+        graph_copy.bind(prefix, namespace, override=True, replace=True)
+    for triple in graph:
+        graph_copy.add(triple)
+    return graph_copy
+
+
+def review_batch(
+    base_filepaths: typing.Sequence[str],
+    jobs: typing.Sequence[BatchJob],
+    processes: int = 1,
+    settings: BatchSettings = BatchSettings(),
+) -> typing.Iterator[typing.Tuple[str, int]]:
+    """
+    Load the base files once, then review each job, writing its report.  Yields each job's output file path and number of results, in job completion order.  Up to processes jobs are reviewed at once.
+    """
+    # Imported here to avoid a circular import at package load.
+    from case_shacl_inheritance_reviewer import Reviewer
+
+    graph = (
+        rdflib.Graph(store=SchemaStore()) if settings.schema_only else rdflib.Graph()
+    )
+    load_graph(
+        graph,
+        base_filepaths,
+        jobs=processes,
+        cache=settings.cache,
+        schema_only=settings.schema_only,
+    )
+    _logger.info(
+        "Loaded %d base triples from %d files.", len(graph), len(base_filepaths)
+    )
+
+    base_report_graph: typing.Optional[rdflib.Graph] = None
+    base_reviewer = Reviewer(graph, engine=settings.engine, cache=settings.cache)
+    if settings.engine == "index":
+        base_review_report = base_reviewer.review(collect_results=False)
+        assert isinstance(base_review_report.graph, rdflib.Graph)
+        base_report_graph = base_review_report.graph
+    elif settings.engine == "sparql":
+        # Queries compiled now are memoized in the parent, so inherited by each worker.
+        base_reviewer.prepare()
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        _logger.debug("Fork is not available.  Reviewing jobs sequentially.")
+        for job in jobs:
+            yield (
+                job[0],
+                review_job(_copy_graph(graph), base_report_graph, job, settings),
+            )
+        return
+
+    # Objects allocated so far are moved out of the cyclic garbage collector's view, so its passes in workers do not write to, and so copy, the base graph's pages.
+    gc.freeze()
+    _logger.debug("Reviewing %d jobs with %d processes...", len(jobs), processes)
+    try:
+        # multiprocessing.Pool is used, rather than concurrent.futures, because its maxtasksperchild works with fork.  One job per worker process keeps each job's files out of later jobs' graphs.
+        with multiprocessing.get_context("fork").Pool(
+            processes=max(1, min(processes, len(jobs))),
+            initializer=_initialize_worker,
+            initargs=(graph, base_report_graph, settings),
+            maxtasksperchild=1,
+        ) as pool:
+            yield from pool.imap_unordered(_review_job, jobs)
+    finally:
+        gc.unfreeze()
+    _logger.debug("Reviewed.")
+
+
+def main() -> None:
+    # Imported here to avoid a circular import at package load.
+    from case_shacl_inheritance_reviewer import ENGINES, ConformanceError
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory caching parsed input files and compiled queries, as for case_shacl_inheritance_reviewer.",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help="Size limit of the cache directory.  (Default: %(default)s.)",
+    )
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="sparql",
+        help="Engine that evaluates inheritance checks.  With 'index', the base files are reviewed once, and each job reviews again only the node shapes its files could affect.  (Default: %(default)s.)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of jobs to review at once, each in its own process.  (Default: %(default)s.)",
+    )
+    parser.add_argument(
+        "--schema-only",
+        action="store_true",
+        help="Keep only the input triples the checks and context linking read, as for case_shacl_inheritance_reviewer.",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Exit in an error state if any job's report has inheritance errors.  (Every job's report will still be written.)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Augment debug log messages with timestamps.",
+    )
+    parser.add_argument(
+        "manifest",
+        help="JSON file listing the base files, and each job's out_graph and in_graph files.  Each out_graph is required to not exist.",
+    )
+    args = parser.parse_args()
+
+    logging_kwargs: typing.Dict[str, typing.Any] = dict()
+    logging_kwargs["level"] = logging.DEBUG if args.debug else logging.INFO
+    logging_kwargs["format"] = (
+        "%(asctime)s:" + logging.BASIC_FORMAT if args.verbose else logging.BASIC_FORMAT
+    )
+    logging.basicConfig(**logging_kwargs)
+
+    (base_filepaths, jobs) = read_manifest(args.manifest)
+    for (out_graph_filepath, _) in jobs:
+        if os.path.exists(out_graph_filepath):
+            raise ValueError(
+                "File found where output graph %r was going to be written.  Please ensure each job's out_graph is a currently non-existent output file."
+                % out_graph_filepath
+            )
+
+    graph_cache: typing.Optional[GraphCache] = None
+    if args.cache_dir is not None:
+        graph_cache = GraphCache(args.cache_dir, max_bytes=args.cache_max_bytes)
+
+    settings = BatchSettings(
+        engine=args.engine, cache=graph_cache, schema_only=args.schema_only
+    )
+    # Key: Output file path.
+    # Value: Number of results.
+    results_tallies: typing.Dict[str, int] = dict()
+    for (out_graph_filepath, results_tally) in review_batch(
+        base_filepaths, jobs, processes=args.jobs, settings=settings
+    ):
+        results_tallies[out_graph_filepath] = results_tally
+        _logger.info("Wrote %r, with %d results.", out_graph_filepath, results_tally)
+
+    failing_jobs = sorted(x for x in results_tallies if results_tallies[x] != 0)
+    if len(failing_jobs) > 0:
+        count_message = (
+            "Encountered at least one shir:ShapeBroadenedError in %d of %d jobs. (%d encountered.)"
+            % (
+                len(failing_jobs),
+                len(jobs),
+                sum(results_tallies.values()),
+            )
+        )
+        if args.strict:
+            raise ConformanceError(count_message)
+        else:
+            _logger.warning(count_message)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module reviews inherited sh:minCount and sh:maxCount bounds in one walk of the class hierarchy.
+
+The queries of the two count error classes compare each subclass property shape with the property shapes of every ancestor class.  So, their work grows with the depth of the hierarchy, and a loosened bound is reported once per ancestor property shape it loosens.  Here, classes are visited parents first, and each class passes down, for each property, the tightest bounds set by its ancestors' property shapes.  A property shape that loosens a bound it inherits is reported once, against the ancestor property shape that set the tightest of the bounds it loosens (its binding ancestor).
+
+A property shape inherits the bounds set on its sh:path, and on the rdfs:subPropertyOf+ ancestors of its sh:path, as the queries' rdfs:subPropertyOf* test reads.  In condensed hierarchies (see HierarchyIndex), equivalent properties share their bounds, the walk visits each class after the classes outside its component, and each class passes down the bounds of its whole component.  Otherwise, classes on or below an rdfs:subClassOf cycle cannot be visited after all of their parents, so they gather their bounds from their rdfs:subClassOf+ closures instead.
+"""
+
+import collections
+import logging
+import os
+import typing
+
+import rdflib
+
+from case_shacl_inheritance_reviewer import NS_SH, NS_SHIR, UNKNOWN_ERROR_CLASS_MESSAGE
+from case_shacl_inheritance_reviewer.index import (
+    HierarchyIndex,
+    ResultRow,
+    literal_compare,
+)
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Key: String of IRI of SHIR error class.
+# Value: Tuple.
+#   0: Constraint component parameter.
+#   1: Comparison, true if the subclass property shape's value (the first argument) loosens the ancestor's value, called as the error class's query compares them.
+BOUND_ERROR_CLASS_IRI_TO_PARAMETER_AND_COMPARE: typing.Dict[
+    str,
+    typing.Tuple[
+        rdflib.URIRef, typing.Callable[[rdflib.Literal, rdflib.Literal], typing.Any]
+    ],
+] = {
+    str(NS_SHIR["PropertyShapeComponentBroadenedError-maxCount"]): (
+        NS_SH.maxCount,
+        lambda x, y: x.__gt__(y),
+    ),
+    str(NS_SHIR["PropertyShapeComponentBroadenedError-minCount"]): (
+        NS_SH.minCount,
+        lambda x, y: x.__lt__(y),
+    ),
+}
+
+# An inherited bound.
+# 0: Bound value ID.
+# 1: Ancestor node shape ID.
+# 2: Ancestor property shape ID.
+# 3: Ancestor property shape's path ID.
+Bound = typing.Tuple[int, int, int, int]
+
+# Key: Path ID.
+# Value: Bounds on the path, none tighter than another.  Usually one.
+Bounds = typing.Dict[int, typing.List[Bound]]
+
+
+class _BoundReview:
+    """
+    The state of one error class's walk.
+    """
+
+    def __init__(
+        self,
+        hierarchy_index: HierarchyIndex,
+        error_class_iri: str,
+    ) -> None:
+        self.hierarchy_index = hierarchy_index
+        self.error_class_iri = error_class_iri
+        (
+            n_parameter,
+            self.compare,
+        ) = BOUND_ERROR_CLASS_IRI_TO_PARAMETER_AND_COMPARE[error_class_iri]
+        self.values = hierarchy_index.parameter_value_ids[n_parameter]
+        self.terms = hierarchy_index.terms.terms
+
+    def loosens(self, value_id: int, bound_value_id: int) -> bool:
+        return literal_compare(
+            self.compare, self.terms[value_id], self.terms[bound_value_id]
+        )
+
+    def equals(self, value_id: int, bound_value_id: int) -> bool:
+        return value_id == bound_value_id or literal_compare(
+            lambda x, y: x.eq(y), self.terms[value_id], self.terms[bound_value_id]
+        )
+
+    def own_bounds(self, node_shape_id: int) -> typing.Iterator[Bound]:
+        """
+        The bounds a node shape's own property shapes set.
+        """
+        hierarchy_index = self.hierarchy_index
+        if not hierarchy_index.is_node_shape_id(node_shape_id):
+            return
+        for (property_shape_id, path_id) in zip(
+            hierarchy_index.property_shape_ids[node_shape_id],
+            hierarchy_index.property_shape_path_ids[node_shape_id],
+        ):
+            for value_id in self.values[property_shape_id]:
+                yield (value_id, node_shape_id, property_shape_id, path_id)
+
+    def merge(self, bounds: Bounds, new_bounds: typing.Iterable[Bound]) -> Bounds:
+        """
+        Return bounds with new_bounds added, leaving bounds unchanged.  A bound loosened by another bound on the same path is dropped.  Of equal bounds, the one added later is kept, so along a chain of parents the nearest ancestor's bound is kept.
+        """
+        merged: typing.Optional[Bounds] = None
+        for new_bound in new_bounds:
+            if merged is None:
+                merged = dict(bounds)
+            path_id = new_bound[3]
+            frontier = merged.get(path_id, [])
+            if any(self.loosens(new_bound[0], x[0]) for x in frontier):
+                continue
+            merged[path_id] = [
+                x
+                for x in frontier
+                if not self.loosens(x[0], new_bound[0])
+                and not self.equals(x[0], new_bound[0])
+            ] + [new_bound]
+        return bounds if merged is None else merged
+
+    def review_node_shape(
+        self, node_shape_id: int, inherited_bounds: Bounds
+    ) -> typing.Iterator[ResultRow]:
+        """
+        Yield a row for each of the node shape's property shapes that loosens an inherited bound, naming the binding ancestor.
+        """
+        hierarchy_index = self.hierarchy_index
+        if len(inherited_bounds) == 0:
+            return
+        for (property_shape_id, path_id) in zip(
+            hierarchy_index.property_shape_ids[node_shape_id],
+            hierarchy_index.property_shape_path_ids[node_shape_id],
+        ):
+            value_ids = self.values[property_shape_id]
+            if len(value_ids) == 0:
+                continue
+            loosened_bounds = [
+                x
+                for bound_path_id in hierarchy_index.equivalent_property_ids(path_id)
+                + list(hierarchy_index.property_ancestor_ids[path_id])
+                for x in inherited_bounds.get(bound_path_id, [])
+                if any(self.loosens(y, x[0]) for y in value_ids)
+            ]
+            if len(loosened_bounds) == 0:
+                continue
+            # Bounds on different paths can loosen one another.
+            binding_bound = next(
+                (
+                    x
+                    for x in loosened_bounds
+                    if not any(self.loosens(x[0], y[0]) for y in loosened_bounds)
+                ),
+                loosened_bounds[0],
+            )
+            yield hierarchy_index.to_row(
+                (
+                    node_shape_id,
+                    property_shape_id,
+                    path_id,
+                    binding_bound[1],
+                    binding_bound[2],
+                    binding_bound[3],
+                )
+            )
+
+
+def walk_order(
+    hierarchy_index: HierarchyIndex,
+) -> typing.Tuple[typing.List[int], typing.List[int]]:
+    """
+    Return the IDs of the classes in the rdfs:subClassOf hierarchy, as two lists.  The first is in an order where each class follows its parents.  The second is the classes that cannot be put in that order, being on or below a cycle.
+    """
+    parent_ids = hierarchy_index.class_parent_ids
+    # Key: Class ID.
+    # Value: Child class IDs.
+    children: typing.DefaultDict[int, typing.List[int]] = collections.defaultdict(list)
+    # Key: Class ID.
+    # Value: Number of parents not yet visited.
+    pending_parents: typing.Dict[int, int] = dict()
+    for class_id in range(len(parent_ids)):
+        class_parent_ids = parent_ids[class_id]
+        if len(class_parent_ids) == 0:
+            continue
+        pending_parents[class_id] = len(class_parent_ids)
+        for parent_id in class_parent_ids:
+            children[parent_id].append(class_id)
+            pending_parents.setdefault(parent_id, 0)
+
+    ordered_ids = sorted(x for (x, y) in pending_parents.items() if y == 0)
+    position = 0
+    while position < len(ordered_ids):
+        for child_id in children.get(ordered_ids[position], []):
+            pending_parents[child_id] -= 1
+            if pending_parents[child_id] == 0:
+                ordered_ids.append(child_id)
+        position += 1
+    unordered_ids = sorted(x for (x, y) in pending_parents.items() if y > 0)
+    return (ordered_ids, unordered_ids)
+
+
+def review_bounds(
+    hierarchy_index: HierarchyIndex, error_class_iris: typing.Iterable[str]
+) -> typing.Iterator[typing.Tuple[str, ResultRow]]:
+    """
+    Yield (error class IRI, row) pairs for the requested count error classes, one per property shape that loosens an inherited bound, against its binding ancestor.
+    """
+    reviews = []
+    for error_class_iri in error_class_iris:
+        if error_class_iri not in BOUND_ERROR_CLASS_IRI_TO_PARAMETER_AND_COMPARE:
+            raise ValueError(
+                UNKNOWN_ERROR_CLASS_MESSAGE % ("bounds review", error_class_iri)
+            )
+        reviews.append(_BoundReview(hierarchy_index, error_class_iri))
+    if len(reviews) == 0:
+        return
+
+    (ordered_ids, unordered_ids) = walk_order(hierarchy_index)
+    _logger.debug(
+        "Walking %d classes in order, and %d classes on or below cycles.",
+        len(ordered_ids),
+        len(unordered_ids),
+    )
+    for review in reviews:
+        # Key: Class ID.
+        # Value: Bounds the class passes to its children, being its inherited bounds and its own.  Classes without bounds are not keys.
+        passed_bounds: typing.Dict[int, Bounds] = dict()
+        for class_id in ordered_ids:
+            inherited_bounds: Bounds = dict()
+            for parent_id in hierarchy_index.class_parent_ids[class_id]:
+                parent_bounds = passed_bounds.get(parent_id)
+                if parent_bounds is None:
+                    continue
+                if len(inherited_bounds) == 0:
+                    # Shared, as bounds are not changed once passed.
+                    inherited_bounds = parent_bounds
+                    continue
+                inherited_bounds = review.merge(
+                    inherited_bounds,
+                    (y for x in parent_bounds.values() for y in x),
+                )
+            if hierarchy_index.is_node_shape_id(class_id):
+                for row in review.review_node_shape(class_id, inherited_bounds):
+                    yield (review.error_class_iri, row)
+            # In condensed hierarchies, a class passes the bounds of its whole component.
+            class_bounds = review.merge(
+                inherited_bounds,
+                (
+                    x
+                    for equivalent_class_id in hierarchy_index.equivalent_class_ids(
+                        class_id
+                    )
+                    for x in review.own_bounds(equivalent_class_id)
+                ),
+            )
+            if len(class_bounds) > 0:
+                passed_bounds[class_id] = class_bounds
+        for class_id in unordered_ids:
+            if not hierarchy_index.is_node_shape_id(class_id):
+                continue
+            inherited_bounds = review.merge(
+                dict(),
+                (
+                    x
+                    for ancestor_id in hierarchy_index.class_ancestor_ids[class_id]
+                    for x in review.own_bounds(ancestor_id)
+                ),
+            )
+            for row in review.review_node_shape(class_id, inherited_bounds):
+                yield (review.error_class_iri, row)
@@ -0,0 +1,142 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module implements an on-disk cache of parsed input graph files, and of compiled check queries.
+
+Each entry holds the triples and namespace bindings parsed from one file, pickled, and keyed by a hash of the file's content and the settings that affect parsing.  Unchanged files therefore skip rdflib's parsers on later runs.  Compiled queries are keyed by a hash of the query and its settings (see case_shacl_inheritance_reviewer.queries).  The cache directory is bounded in size by evicting least-recently-used entries.
+
+Entries are loaded with pickle, so the cache directory should only be writable by trusted users.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import typing
+
+import rdflib
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Increment when the layout of a cache entry changes.
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+ENTRY_SUFFIX = ".pickle"
+
+
+class GraphCache:
+    """
+    A directory of pickled parse results and compiled queries.  Values are opaque to this class, but are expected to be the parse results made by case_shacl_inheritance_reviewer.load, or the serialized queries made by case_shacl_inheritance_reviewer.queries.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _entry_filepath(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def _entry_filepaths(self) -> typing.List[str]:
+        return [
+            os.path.join(self.directory, x)
+            for x in os.listdir(self.directory)
+            if x.endswith(ENTRY_SUFFIX)
+        ]
+
+    @staticmethod
+    def _hasher(settings: typing.Tuple[str, ...]) -> "hashlib._Hash":
+        hasher = hashlib.sha256()
+        for setting in (str(CACHE_FORMAT_VERSION), rdflib.__version__) + settings:
+            hasher.update(setting.encode("utf-8"))
+            hasher.update(b"\0")
+        return hasher
+
+    def key(self, in_graph_filepath: str, *settings: str) -> str:
+        """
+        Compute the cache key of a file.  The key covers the file's content, the rdflib version, the cache format version, and any further settings that change what is parsed from the file (e.g. its format).
+        """
+        hasher = self._hasher(settings)
+        with open(in_graph_filepath, "rb") as in_fh:
+            for chunk in iter(lambda: in_fh.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def settings_key(self, *settings: str) -> str:
+        """
+        Compute the cache key of a value that is not read from a file, such as a compiled query.  The key covers the rdflib version, the cache format version, and the settings, which should include a name for the kind of value.
+        """
+        return self._hasher(settings).hexdigest()
+
+    def get(self, key: str) -> typing.Optional[typing.Any]:
+        entry_filepath = self._entry_filepath(key)
+        try:
+            with open(entry_filepath, "rb") as entry_fh:
+                value = pickle.load(entry_fh)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            _logger.warning("Discarding unreadable cache entry %r.", entry_filepath)
+            self._remove(entry_filepath)
+            return None
+        # Record the use, for least-recently-used eviction.
+        os.utime(entry_filepath)
+        return value
+
+    def put(self, key: str, value: typing.Any) -> None:
+        # Write to a temporary file first, so concurrent runs never read a partial entry.
+        (tmp_fd, tmp_filepath) = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp", prefix=key
+        )
+        try:
+            with os.fdopen(tmp_fd, "wb") as tmp_fh:
+                pickle.dump(value, tmp_fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_filepath, self._entry_filepath(key))
+        except BaseException:
+            self._remove(tmp_filepath)
+            raise
+
+    def evict(self) -> None:
+        """
+        Remove least-recently-used entries until the cache fits within max_bytes.
+        """
+        entries = []
+        total_bytes = 0
+        for entry_filepath in self._entry_filepaths():
+            try:
+                stat_result = os.stat(entry_filepath)
+            except FileNotFoundError:
+                continue
+            entries.append((stat_result.st_mtime, stat_result.st_size, entry_filepath))
+            total_bytes += stat_result.st_size
+        for (_, entry_bytes, entry_filepath) in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            _logger.debug("Evicting cache entry %r.", entry_filepath)
+            self._remove(entry_filepath)
+            total_bytes -= entry_bytes
+
+    def clear(self) -> None:
+        for entry_filepath in self._entry_filepaths():
+            self._remove(entry_filepath)
+
+    @staticmethod
+    def _remove(filepath: str) -> None:
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,146 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module reads OASIS XML catalogs, such as the catalog-v001.xml files Protégé writes, to map ontology IRIs to local files.  These catalog entries are read:
+
+* uri - Maps the IRI in its name attribute to the file in its uri attribute.
+* rewriteURI - Maps IRIs starting with its uriStartString attribute to files, replacing that start with its rewritePrefix attribute.
+* group - Holds other entries.  Its xml:base attribute, if any, is the base of its entries' relative file references.
+* nextCatalog - Names another catalog file, read after this one.
+
+Relative file references are resolved against the catalog file's directory, or the nearest xml:base.  As in OASIS catalog resolution, the first matching uri entry is used; otherwise, the rewriteURI entry with the longest matching start is used.  No network access is made.
+"""
+
+import logging
+import os
+import typing
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+NS_CATALOG = "urn:oasis:names:tc:entity:xmlns:xml:catalog"
+
+XML_BASE = "{http://www.w3.org/XML/1998/namespace}base"
+
+
+def _file_reference_to_filepath(base_dirpath: str, file_reference: str) -> str:
+    """
+    Resolve a catalog file reference, a relative or file: URI reference, against base_dirpath.
+    """
+    parsed = urllib.parse.urlparse(file_reference)
+    if parsed.scheme == "file":
+        return urllib.request.url2pathname(parsed.path)
+    return os.path.normpath(
+        os.path.join(
+            base_dirpath,
+            urllib.request.url2pathname(file_reference),
+        )
+    )
+
+
+class Catalog:
+    """
+    IRI to file mappings read from one or more catalog files.  Files read earlier take precedence.
+    """
+
+    __slots__ = ("_uris", "_rewrites", "_read_filepaths")
+
+    def __init__(self) -> None:
+        # Key: IRI.
+        # Value: File path.
+        self._uris: typing.Dict[str, str] = dict()
+        # Members: Tuples.
+        #   0: IRI start.
+        #   1: File path prefix.
+        self._rewrites: typing.List[typing.Tuple[str, str]] = []
+        self._read_filepaths: typing.Set[str] = set()
+
+    def read(self, catalog_filepath: str) -> None:
+        """
+        Read the entries of catalog_filepath, and of the catalogs it chains to with nextCatalog.  A catalog file already read is not read again.
+        """
+        realpath = os.path.realpath(catalog_filepath)
+        if realpath in self._read_filepaths:
+            return
+        self._read_filepaths.add(realpath)
+        _logger.debug("Reading catalog %r...", catalog_filepath)
+
+        # Members: Catalog files named by nextCatalog entries.
+        next_catalog_filepaths: typing.List[str] = []
+
+        def _read_entries(element: xml.etree.ElementTree.Element, base: str) -> None:
+            for child in element:
+                if child.tag == "{%s}group" % NS_CATALOG:
+                    group_base = child.get(XML_BASE)
+                    _read_entries(
+                        child,
+                        _file_reference_to_filepath(base, group_base)
+                        if group_base
+                        else base,
+                    )
+                elif child.tag == "{%s}uri" % NS_CATALOG:
+                    (name, uri) = (child.get("name"), child.get("uri"))
+                    if name is None or uri is None:
+                        _logger.warning(
+                            "Skipping incomplete uri entry in catalog %r.",
+                            catalog_filepath,
+                        )
+                        continue
+                    self._uris.setdefault(name, _file_reference_to_filepath(base, uri))
+                elif child.tag == "{%s}rewriteURI" % NS_CATALOG:
+                    (start, prefix) = (
+                        child.get("uriStartString"),
+                        child.get("rewritePrefix"),
+                    )
+                    if start is None or prefix is None:
+                        _logger.warning(
+                            "Skipping incomplete rewriteURI entry in catalog %r.",
+                            catalog_filepath,
+                        )
+                        continue
+                    self._rewrites.append(
+                        (
+                            start,
+                            _file_reference_to_filepath(base, prefix)
+                            + ("/" if prefix.endswith("/") else ""),
+                        )
+                    )
+                elif child.tag == "{%s}nextCatalog" % NS_CATALOG:
+                    next_catalog = child.get("catalog")
+                    if next_catalog is not None:
+                        next_catalog_filepaths.append(
+                            _file_reference_to_filepath(base, next_catalog)
+                        )
+
+        root = xml.etree.ElementTree.parse(catalog_filepath).getroot()
+        if root.tag != "{%s}catalog" % NS_CATALOG:
+            raise ValueError("File %r is not an OASIS XML catalog." % catalog_filepath)
+        _read_entries(root, os.path.dirname(os.path.abspath(catalog_filepath)))
+        for next_catalog_filepath in next_catalog_filepaths:
+            self.read(next_catalog_filepath)
+
+    def resolve(self, iri: str) -> typing.Optional[str]:
+        """
+        The file path iri maps to, or None if no entry maps it.
+        """
+        if iri in self._uris:
+            return self._uris[iri]
+        matches = [x for x in self._rewrites if iri.startswith(x[0])]
+        if len(matches) == 0:
+            return None
+        # The stable sort keeps the earliest of equally long starts.
+        (start, prefix) = sorted(matches, key=lambda x: -len(x[0]))[0]
+        return prefix + urllib.request.url2pathname(iri[len(start) :])
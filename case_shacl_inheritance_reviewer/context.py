@@ -0,0 +1,77 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module copies the context of reported shapes into a report: the sh:property link from each reported node shape to its property shape, and the concise bounded description of the property shape.
+
+The concise bounded description of a node is every triple with the node as subject, along with, recursively, the concise bounded description of every blank node object of those triples.  So, nested blank nodes, such as the members of sh:or and sh:in lists, and qualified value shapes, are copied with the property shape that references them.
+"""
+
+import typing
+
+import rdflib
+
+NS_SH = rdflib.SH
+
+Triple = typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node]
+
+
+class ContextExtractor:
+    """
+    Reads report context from one graph.  Descriptions are memoized per node, so a shape referenced by many results is read from the graph once.  If the graph is modified, use a new ContextExtractor.
+    """
+
+    __slots__ = ("graph", "_descriptions")
+
+    def __init__(self, graph: rdflib.Graph) -> None:
+        self.graph = graph
+        # Key: Node.
+        # Value: The node's concise bounded description.
+        self._descriptions: typing.Dict[
+            rdflib.term.Node, typing.Tuple[Triple, ...]
+        ] = dict()
+
+    def description(self, n_node: rdflib.term.Node) -> typing.Tuple[Triple, ...]:
+        """
+        The concise bounded description of n_node.  Blank node cycles are permitted.
+        """
+        if n_node in self._descriptions:
+            return self._descriptions[n_node]
+        triples: typing.List[Triple] = []
+        visited: typing.Set[rdflib.term.Node] = {n_node}
+        stack = [n_node]
+        while stack:
+            n_subject = stack.pop()
+            # A blank node already described, such as a list shared between shapes, contributes its memoized description.
+            if n_subject != n_node and n_subject in self._descriptions:
+                triples.extend(self._descriptions[n_subject])
+                continue
+            for (n_predicate, n_object) in self.graph.predicate_objects(n_subject):
+                triples.append((n_subject, n_predicate, n_object))
+                if isinstance(n_object, rdflib.BNode) and n_object not in visited:
+                    visited.add(n_object)
+                    stack.append(n_object)
+        description = tuple(triples)
+        self._descriptions[n_node] = description
+        return description
+
+    def link(
+        self, n_node_shape: rdflib.term.Node, n_property_shape: rdflib.term.Node
+    ) -> typing.Iterator[Triple]:
+        """
+        Yield the sh:property triple linking n_node_shape to n_property_shape, if the graph has it, and the description of n_property_shape.
+        """
+        triple = (n_node_shape, NS_SH.property, n_property_shape)
+        if triple in self.graph:
+            yield triple
+        yield from self.description(n_property_shape)
@@ -0,0 +1,785 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module implements the "sqlite" review engine, which holds the reviewed graph in a SQLite database file rather than in memory.
+
+SQLiteStore is an rdflib store keeping triples in the database.  It keeps only schema triples (see case_shacl_inheritance_reviewer.load.is_schema_triple), so an input bundling an ontology with instance data takes disk space for the ontology alone.  Terms are interned as integer IDs in a terms table, and each triple is a row of three IDs.  Triples are inserted in batches, and the indexes other than the (subject, predicate, object) key are built once, at the first read after loading.
+
+DatabaseIndex computes the rdfs:subClassOf+ and rdfs:subPropertyOf+ closures with recursive common table expressions, and stores them as indexed tables.  Each error class is then one SQL join, yielding the same rows, including multiplicity, as the SPARQL query of the same error class.  sh:minCount and sh:maxCount values that are valid XSD integers are compared in SQL.  Other values are compared one pair at a time, with the same SPARQL FILTER semantics as the index engine.
+
+A database records the files it was loaded from, and keeps the closures computed from them, so a later review of unchanged files can reuse the database without parsing.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import typing
+
+import rdflib.plugins.stores.memory
+
+import case_shacl_inheritance_reviewer.datatypes
+from case_shacl_inheritance_reviewer import (
+    NS_RDF,
+    NS_RDFS,
+    NS_SH,
+    NS_SHIR,
+    UNKNOWN_ERROR_CLASS_MESSAGE,
+)
+from case_shacl_inheritance_reviewer.index import N_SH_CLASS, ResultRow, literal_compare
+from case_shacl_inheritance_reviewer.load import is_schema_triple
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+NS_OWL = rdflib.OWL
+
+# Increment when the tables of a database change.
+DATABASE_FORMAT_VERSION = 1
+
+# Number of triples inserted by one statement while loading.
+INSERT_BATCH = 10000
+
+# Bound of the store's term-to-ID and ID-to-term caches.
+MAX_CACHED_TERMS = 1 << 16
+
+# Values of the terms table's kind column.
+TERM_IRI = 0
+TERM_BLANK_NODE = 1
+TERM_LITERAL = 2
+
+# 0: Kind.
+# 1: Lexical form, IRI, or blank node identifier.
+# 2: Datatype IRI of a literal, or "".
+# 3: Language tag of a literal, or "".
+TermKey = typing.Tuple[int, str, str, str]
+
+TABLES = [
+    """\
+CREATE TABLE IF NOT EXISTS settings (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+)""",
+    """\
+CREATE TABLE IF NOT EXISTS inputs (
+  position INTEGER PRIMARY KEY,
+  filepath TEXT NOT NULL,
+  digest TEXT NOT NULL
+)""",
+    """\
+CREATE TABLE IF NOT EXISTS namespaces (
+  position INTEGER PRIMARY KEY,
+  prefix TEXT NOT NULL,
+  namespace TEXT NOT NULL
+)""",
+    # int64_value is the value of a valid XSD integer literal in the range of int64, otherwise NULL.
+    """\
+CREATE TABLE IF NOT EXISTS terms (
+  id INTEGER PRIMARY KEY,
+  kind INTEGER NOT NULL,
+  lexical TEXT NOT NULL,
+  datatype TEXT NOT NULL,
+  language TEXT NOT NULL,
+  int64_value INTEGER,
+  UNIQUE (kind, lexical, datatype, language)
+)""",
+    """\
+CREATE TABLE IF NOT EXISTS triples (
+  subject INTEGER NOT NULL,
+  predicate INTEGER NOT NULL,
+  object INTEGER NOT NULL,
+  PRIMARY KEY (subject, predicate, object)
+) WITHOUT ROWID""",
+]
+
+# Built after loading, as maintaining them while inserting is slower than building them once.
+TRIPLE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS triples_pos ON triples (predicate, object, subject)",
+    "CREATE INDEX IF NOT EXISTS triples_osp ON triples (object, subject, predicate)",
+]
+
+# Tables DatabaseIndex derives from the triples.  They are dropped when the triples change.
+DERIVED_TABLES = [
+    "class_closure",
+    "datatype_broadening",
+    "property_closure",
+    "shape_paths",
+]
+
+
+def _term_key(term: rdflib.term.Node) -> TermKey:
+    if isinstance(term, rdflib.Literal):
+        return (
+            TERM_LITERAL,
+            str(term),
+            "" if term.datatype is None else str(term.datatype),
+            term.language or "",
+        )
+    elif isinstance(term, rdflib.BNode):
+        return (TERM_BLANK_NODE, str(term), "", "")
+    elif isinstance(term, rdflib.URIRef):
+        return (TERM_IRI, str(term), "", "")
+    raise TypeError("The SQLite store cannot hold term %r." % term)
+
+
+def _key_term(key: TermKey) -> rdflib.term.Node:
+    (kind, lexical, datatype, language) = key
+    if kind == TERM_IRI:
+        return rdflib.URIRef(lexical)
+    elif kind == TERM_BLANK_NODE:
+        return rdflib.BNode(lexical)
+    return rdflib.Literal(
+        lexical,
+        datatype=rdflib.URIRef(datatype) if datatype else None,
+        lang=language or None,
+    )
+
+
+def file_digest(filepath: str) -> str:
+    hasher = hashlib.sha256()
+    with open(filepath, "rb") as in_fh:
+        for chunk in iter(lambda: in_fh.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class SQLiteStore(rdflib.plugins.stores.memory.SimpleMemory):
+    """
+    An rdflib store keeping schema triples in a SQLite database file.  Triples that are not schema triples are dropped as they are added.  Namespace bindings are held as rdflib's in-memory stores hold them, and are saved to the database by commit().
+
+    If filepath is not provided, the database is a temporary file, removed by close().  Written triples are only kept in the database file once commit() is called.
+    """
+
+    # Whether the store drops non-schema triples itself.
+    schema_only = True
+
+    def __init__(self, filepath: typing.Optional[str] = None) -> None:
+        super().__init__()
+        self._temporary_directory: typing.Optional[tempfile.TemporaryDirectory] = None  # type: ignore[type-arg]
+        if filepath is None:
+            self._temporary_directory = tempfile.TemporaryDirectory()
+            filepath = os.path.join(self._temporary_directory.name, "review.sqlite")
+        self.filepath = filepath
+        self.connection = sqlite3.connect(filepath)
+        for table in TABLES:
+            self.connection.execute(table)
+
+        # Key: Term.
+        # Value: ID.
+        self._term_ids: typing.Dict[rdflib.term.Node, int] = dict()
+        # Key: ID.
+        # Value: Term.
+        self._id_terms: typing.Dict[int, rdflib.term.Node] = dict()
+        # Members: Triples of IDs not yet inserted.
+        self._pending: typing.List[typing.Tuple[int, int, int]] = []
+
+        if self.setting("format") != self._format():
+            self.clear()
+        self._indexed = (
+            self.connection.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = 'triples_pos'"
+            ).fetchone()[0]
+            > 0
+        )
+        self.derived = self.setting("derived") is not None
+        for (prefix, namespace) in self.connection.execute(
+            "SELECT prefix, namespace FROM namespaces ORDER BY position"
+        ).fetchall():
+            super().bind(prefix, rdflib.URIRef(namespace))
+
+    @staticmethod
+    def _format() -> str:
+        # Literals are stored by lexical form, which rdflib's normalization can change between versions.
+        return "%d %s" % (DATABASE_FORMAT_VERSION, rdflib.__version__)
+
+    def setting(self, key: str) -> typing.Optional[str]:
+        row = self.connection.execute(
+            "SELECT value FROM settings WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else str(row[0])
+
+    def set_setting(self, key: str, value: typing.Optional[str]) -> None:
+        """
+        Set, or if value is None, remove, a setting.
+        """
+        if value is None:
+            self.connection.execute("DELETE FROM settings WHERE key = ?", (key,))
+        else:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    def clear(self) -> None:
+        """
+        Remove all triples, terms, namespace bindings and derived tables.  A graph of this store is expected to be made after clearing, as it binds rdflib's default namespaces when made.
+        """
+        self._pending = []
+        self._term_ids.clear()
+        self._id_terms.clear()
+        self.drop_derived()
+        self.connection.execute("DROP INDEX IF EXISTS triples_pos")
+        self.connection.execute("DROP INDEX IF EXISTS triples_osp")
+        self._indexed = False
+        for table in ["inputs", "namespaces", "settings", "terms", "triples"]:
+            self.connection.execute("DELETE FROM %s" % table)
+        self.set_setting("format", self._format())
+        # Forget namespace bindings.
+        rdflib.plugins.stores.memory.SimpleMemory.__init__(self)
+        self.connection.commit()
+
+    def drop_derived(self) -> None:
+        for table in DERIVED_TABLES:
+            self.connection.execute("DROP TABLE IF EXISTS %s" % table)
+        self.set_setting("derived", None)
+        self.derived = False
+
+    def mark_derived(self) -> None:
+        """
+        Record that the derived tables are built from the current triples.
+        """
+        self.set_setting("derived", "1")
+        self.derived = True
+
+    def is_loaded(self, load_settings: str) -> bool:
+        """
+        True if the store was loaded with the same load_settings, from files that are unchanged since.  load_settings is expected to cover what determines the loaded files, such as the input file paths.
+        """
+        if self.setting("load") != load_settings:
+            return False
+        for (filepath, digest) in self.connection.execute(
+            "SELECT filepath, digest FROM inputs ORDER BY position"
+        ).fetchall():
+            if not os.path.exists(filepath) or file_digest(filepath) != digest:
+                _logger.debug("Database input %r has changed.", filepath)
+                return False
+        return True
+
+    def record_load(self, load_settings: str, filepaths: typing.Iterable[str]) -> None:
+        """
+        Record the files the store was loaded from, with their digests, and commit.
+        """
+        self.connection.execute("DELETE FROM inputs")
+        self.connection.executemany(
+            "INSERT INTO inputs (position, filepath, digest) VALUES (?, ?, ?)",
+            [
+                (position, os.path.abspath(filepath), file_digest(filepath))
+                for (position, filepath) in enumerate(filepaths)
+            ],
+        )
+        self.set_setting("load", load_settings)
+        self.commit()
+
+    def _cache_term(self, term: rdflib.term.Node, term_id: int) -> None:
+        if len(self._term_ids) >= MAX_CACHED_TERMS:
+            self._term_ids.clear()
+            self._id_terms.clear()
+        self._term_ids[term] = term_id
+        self._id_terms[term_id] = term
+
+    def lookup(self, term: rdflib.term.Node) -> typing.Optional[int]:
+        """
+        Return the ID of term, or None if the store has no such term.
+        """
+        term_id = self._term_ids.get(term)
+        if term_id is not None:
+            return term_id
+        try:
+            key = _term_key(term)
+        except TypeError:
+            return None
+        row = self.connection.execute(
+            "SELECT id FROM terms WHERE kind = ? AND lexical = ? AND datatype = ? AND language = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        self._cache_term(term, row[0])
+        return int(row[0])
+
+    def intern(self, term: rdflib.term.Node) -> int:
+        term_id = self.lookup(term)
+        if term_id is None:
+            term_id = self.connection.execute(
+                "INSERT INTO terms (kind, lexical, datatype, language, int64_value) VALUES (?, ?, ?, ?, ?)",
+                _term_key(term)
+                + (case_shacl_inheritance_reviewer.datatypes.int64_value(term),),
+            ).lastrowid
+            assert term_id is not None
+            self._cache_term(term, term_id)
+        return term_id
+
+    def term(self, term_id: int) -> rdflib.term.Node:
+        term = self._id_terms.get(term_id)
+        if term is None:
+            row = self.connection.execute(
+                "SELECT kind, lexical, datatype, language FROM terms WHERE id = ?",
+                (term_id,),
+            ).fetchone()
+            term = _key_term(row)
+            self._cache_term(term, term_id)
+        return term
+
+    def _flush(self) -> None:
+        if len(self._pending) == 0:
+            return
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO triples (subject, predicate, object) VALUES (?, ?, ?)",
+            self._pending,
+        )
+        self._pending = []
+
+    def prepare_read(self) -> None:
+        """
+        Insert pending triples, and build the triple indexes if they are not built.
+        """
+        self._flush()
+        if not self._indexed:
+            _logger.debug("Indexing triples...")
+            for index in TRIPLE_INDEXES:
+                self.connection.execute(index)
+            self._indexed = True
+
+    def _pattern_sql(
+        self,
+        triple_pattern: typing.Tuple[
+            typing.Optional[rdflib.term.Node],
+            typing.Optional[rdflib.term.Node],
+            typing.Optional[rdflib.term.Node],
+        ],
+    ) -> typing.Optional[typing.Tuple[str, typing.List[int]]]:
+        """
+        Return the WHERE clause and parameters matching triple_pattern, or None if no triple can match.
+        """
+        conditions: typing.List[str] = []
+        parameters: typing.List[int] = []
+        for (column, term) in zip(["subject", "predicate", "object"], triple_pattern):
+            if term is None:
+                continue
+            term_id = self.lookup(term)
+            if term_id is None:
+                return None
+            conditions.append("%s = ?" % column)
+            parameters.append(term_id)
+        if len(conditions) == 0:
+            return ("", parameters)
+        return (" WHERE " + " AND ".join(conditions), parameters)
+
+    def add(
+        self,
+        triple: typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node],
+        context: typing.Any,
+        quoted: bool = False,
+    ) -> None:
+        if not is_schema_triple(triple):
+            return
+        if self.derived:
+            self.drop_derived()
+        (subject, predicate, object_) = triple
+        self._pending.append(
+            (self.intern(subject), self.intern(predicate), self.intern(object_))
+        )
+        if len(self._pending) >= INSERT_BATCH:
+            self._flush()
+
+    def remove(
+        self,
+        triple_pattern: typing.Tuple[
+            typing.Optional[rdflib.term.Node],
+            typing.Optional[rdflib.term.Node],
+            typing.Optional[rdflib.term.Node],
+        ],
+        context: typing.Any = None,
+    ) -> None:
+        self.prepare_read()
+        pattern_sql = self._pattern_sql(triple_pattern)
+        if pattern_sql is None:
+            return
+        if self.derived:
+            self.drop_derived()
+        self.connection.execute("DELETE FROM triples" + pattern_sql[0], pattern_sql[1])
+
+    def triples(
+        self,
+        triple_pattern: typing.Tuple[
+            typing.Optional[rdflib.term.Node],
+            typing.Optional[rdflib.term.Node],
+            typing.Optional[rdflib.term.Node],
+        ],
+        context: typing.Any = None,
+    ) -> typing.Iterator[
+        typing.Tuple[
+            typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node],
+            typing.Iterator[typing.Any],
+        ]
+    ]:
+        self.prepare_read()
+        pattern_sql = self._pattern_sql(triple_pattern)
+        if pattern_sql is None:
+            return
+        for (subject_id, predicate_id, object_id) in self.connection.execute(
+            "SELECT subject, predicate, object FROM triples" + pattern_sql[0],
+            pattern_sql[1],
+        ):
+            yield (
+                (
+                    self.term(subject_id),
+                    self.term(predicate_id),
+                    self.term(object_id),
+                ),
+                iter(()),
+            )
+
+    def __len__(self, context: typing.Any = None) -> int:
+        self.prepare_read()
+        return int(
+            self.connection.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+        )
+
+    def commit(self) -> None:
+        """
+        Insert pending triples, save namespace bindings, and commit the database transaction.
+        """
+        self._flush()
+        self.connection.execute("DELETE FROM namespaces")
+        self.connection.executemany(
+            "INSERT INTO namespaces (position, prefix, namespace) VALUES (?, ?, ?)",
+            [
+                (position, prefix, str(namespace))
+                for (position, (prefix, namespace)) in enumerate(self.namespaces())
+            ],
+        )
+        self.connection.commit()
+
+    def close(self, commit_pending_transaction: bool = False) -> None:
+        if commit_pending_transaction:
+            self.commit()
+        self.connection.close()
+        if self._temporary_directory is not None:
+            self._temporary_directory.cleanup()
+            self._temporary_directory = None
+
+
+# Columns of a result row, in the order of the SPARQL queries' projection, from the candidate tables of _CANDIDATES.
+_RESULT_COLUMNS = """\
+  class.node_shape,
+  class.property_shape,
+  class.path,
+  superclass.node_shape,
+  superclass.property_shape,
+  superclass.path"""
+
+# Pairs of a subclass node shape's property shape, and an ancestor node shape's property shape.
+_CANDIDATES = """\
+FROM class_closure AS node_shapes
+JOIN shape_paths AS class
+  ON class.node_shape = node_shapes.descendant
+JOIN shape_paths AS superclass
+  ON superclass.node_shape = node_shapes.ancestor
+"""
+
+# Number of answers of the path rdfs:subPropertyOf* from the class path to the superclass path, counted as rdflib's SPARQL engine counts them.  (See HierarchyIndex._subproperty_or_self_multiplicity.)
+_PATH_MULTIPLICITY = """\
+(class.path = superclass.path) + EXISTS (
+    SELECT 1
+    FROM property_closure
+    WHERE descendant = class.path AND ancestor = superclass.path
+  )"""
+
+# Pairs of the constraint component parameter values of the candidates' property shapes.
+_PARAMETER_VALUES = """\
+JOIN triples AS class_value
+  ON class_value.subject = class.property_shape
+  AND class_value.predicate = :parameter
+JOIN triples AS superclass_value
+  ON superclass_value.subject = superclass.property_shape
+  AND superclass_value.predicate = :parameter
+"""
+
+
+def _count_query(sql_function: str, sql_operator: str) -> str:
+    return (
+        "SELECT\n"
+        + _RESULT_COLUMNS
+        + ",\n  "
+        + _PATH_MULTIPLICITY
+        + " AS multiplicity\n"
+        + _CANDIDATES
+        + _PARAMETER_VALUES
+        + """\
+JOIN terms AS class_count
+  ON class_count.id = class_value.object
+JOIN terms AS superclass_count
+  ON superclass_count.id = superclass_value.object
+WHERE multiplicity > 0
+  AND CASE
+    WHEN class_count.int64_value IS NOT NULL AND superclass_count.int64_value IS NOT NULL
+      THEN class_count.int64_value %s superclass_count.int64_value
+    ELSE %s(class_count.id, superclass_count.id)
+  END
+"""
+        % (sql_operator, sql_function)
+    )
+
+
+def _error_class_iri_to_sql() -> typing.Dict[
+    str, typing.Tuple[typing.Optional[rdflib.URIRef], str]
+]:
+    # Key: String of IRI of SHIR error class.
+    # Value: Tuple.
+    #   0: Constraint component parameter bound to :parameter, if the query has one.
+    #   1: SQL query yielding result rows, each with the number of times the SPARQL query would yield it.
+    error_class_iri_to_sql: typing.Dict[
+        str, typing.Tuple[typing.Optional[rdflib.URIRef], str]
+    ] = dict()
+
+    error_class_iri_to_sql[
+        str(NS_SHIR["PropertyShapeComponentBroadenedError-path"])
+    ] = (
+        None,
+        "SELECT\n"
+        + _RESULT_COLUMNS
+        + ",\n  1 AS multiplicity\n"
+        + _CANDIDATES
+        + """\
+JOIN property_closure AS paths
+  ON paths.descendant = superclass.path
+  AND paths.ancestor = class.path
+""",
+    )
+
+    error_class_iri_to_sql[
+        str(NS_SHIR["PropertyShapeComponentBroadenedError-class"])
+    ] = (
+        N_SH_CLASS,
+        "SELECT\n"
+        + _RESULT_COLUMNS
+        + ",\n  "
+        + _PATH_MULTIPLICITY
+        + " AS multiplicity\n"
+        + _CANDIDATES
+        + _PARAMETER_VALUES
+        + """\
+JOIN class_closure AS value_classes
+  ON value_classes.descendant = superclass_value.object
+  AND value_classes.ancestor = class_value.object
+WHERE multiplicity > 0
+""",
+    )
+
+    error_class_iri_to_sql[
+        str(NS_SHIR["PropertyShapeComponentBroadenedError-datatype"])
+    ] = (
+        NS_SH.datatype,
+        "SELECT\n"
+        + _RESULT_COLUMNS
+        + ",\n  "
+        + _PATH_MULTIPLICITY
+        + " AS multiplicity\n"
+        + _CANDIDATES
+        + _PARAMETER_VALUES
+        + """\
+JOIN datatype_broadening AS datatypes
+  ON datatypes.broader = class_value.object
+  AND datatypes.narrower = superclass_value.object
+WHERE multiplicity > 0
+""",
+    )
+
+    error_class_iri_to_sql[
+        str(NS_SHIR["PropertyShapeComponentBroadenedError-maxCount"])
+    ] = (NS_SH.maxCount, _count_query("literal_greater", ">"))
+
+    error_class_iri_to_sql[
+        str(NS_SHIR["PropertyShapeComponentBroadenedError-minCount"])
+    ] = (NS_SH.minCount, _count_query("literal_less", "<"))
+
+    return error_class_iri_to_sql
+
+
+# Key: String of IRI of SHIR error class.
+# Value: Tuple of constraint component parameter and SQL query.  See _error_class_iri_to_sql.
+ERROR_CLASS_IRI_TO_SQL = _error_class_iri_to_sql()
+
+# Closure of a hierarchy predicate bound to :predicate.  UNION, rather than UNION ALL, discards answers already found, so cycles terminate.
+_CLOSURE = """\
+INSERT INTO %s (descendant, ancestor)
+WITH RECURSIVE closure (descendant, ancestor) AS (
+  SELECT subject, object
+  FROM triples
+  WHERE predicate = :predicate
+  UNION
+  SELECT closure.descendant, triples.object
+  FROM closure
+  JOIN triples
+    ON triples.subject = closure.ancestor
+    AND triples.predicate = :predicate
+)
+SELECT descendant, ancestor FROM closure
+"""
+
+# Node shapes reviewed are only those that are also OWL classes.
+_SHAPE_PATHS = """\
+INSERT INTO shape_paths (node_shape, property_shape, path)
+SELECT node_shape.subject, property.object, path.object
+FROM triples AS node_shape
+JOIN triples AS owl_class
+  ON owl_class.subject = node_shape.subject
+  AND owl_class.predicate = :rdf_type
+  AND owl_class.object = :owl_class
+JOIN triples AS property
+  ON property.subject = node_shape.subject
+  AND property.predicate = :sh_property
+JOIN triples AS path
+  ON path.subject = property.object
+  AND path.predicate = :sh_path
+WHERE node_shape.predicate = :rdf_type
+  AND node_shape.object = :sh_node_shape
+"""
+
+
+class DatabaseIndex:
+    """
+    Tables derived from one graph held in a SQLiteStore, sufficient to evaluate every error class the SPARQL engine evaluates.
+
+    A graph held in another store is copied into a temporary SQLiteStore.  The derived tables are kept in the database, so a DatabaseIndex of a reused database file is built without recomputing them.
+    """
+
+    __slots__ = ("store",)
+
+    def __init__(self, graph: rdflib.Graph) -> None:
+        if isinstance(graph.store, SQLiteStore):
+            self.store = graph.store
+        else:
+            _logger.debug("Copying graph into a temporary database...")
+            self.store = SQLiteStore()
+            for triple in graph:
+                self.store.add(triple, None)
+        self.store.connection.create_function(
+            "literal_greater", 2, self._literal_greater
+        )
+        self.store.connection.create_function("literal_less", 2, self._literal_less)
+        self.store.prepare_read()
+        if self.store.derived:
+            _logger.debug("Reusing derived tables.")
+        else:
+            self._derive(graph)
+
+    def _derive(self, graph: rdflib.Graph) -> None:
+        _logger.debug("Building derived tables...")
+        store = self.store
+        connection = store.connection
+        for table in ["class_closure", "property_closure"]:
+            connection.execute(
+                "CREATE TABLE %s (descendant INTEGER NOT NULL, ancestor INTEGER NOT NULL, PRIMARY KEY (descendant, ancestor)) WITHOUT ROWID"
+                % table
+            )
+        connection.execute(
+            _CLOSURE % "class_closure", {"predicate": store.lookup(NS_RDFS.subClassOf)}
+        )
+        connection.execute(
+            _CLOSURE % "property_closure",
+            {"predicate": store.lookup(NS_RDFS.subPropertyOf)},
+        )
+        connection.execute(
+            "CREATE INDEX class_closure_ancestor ON class_closure (ancestor, descendant)"
+        )
+
+        connection.execute(
+            "CREATE TABLE shape_paths (node_shape INTEGER NOT NULL, property_shape INTEGER NOT NULL, path INTEGER NOT NULL)"
+        )
+        connection.execute(
+            _SHAPE_PATHS,
+            {
+                "owl_class": store.lookup(NS_OWL.Class),
+                "rdf_type": store.lookup(NS_RDF.type),
+                "sh_node_shape": store.lookup(NS_SH.NodeShape),
+                "sh_path": store.lookup(NS_SH.path),
+                "sh_property": store.lookup(NS_SH.property),
+            },
+        )
+        connection.execute(
+            "CREATE INDEX shape_paths_node_shape ON shape_paths (node_shape)"
+        )
+
+        # The sh:datatype check reads derivations from a table of the built-in datatypes, and from the graph's declarations of the datatypes in use, rather than from either closure.
+        connection.execute(
+            "CREATE TABLE datatype_broadening (broader INTEGER NOT NULL, narrower INTEGER NOT NULL, PRIMARY KEY (broader, narrower)) WITHOUT ROWID"
+        )
+        # Members: (Broader datatype ID, narrower datatype ID) pairs.  Datatypes not in the store cannot be in a result.
+        datatype_broadening_ids: typing.Set[typing.Tuple[int, int]] = set()
+        for (
+            n_broader_datatype,
+            n_narrower_datatype,
+        ) in case_shacl_inheritance_reviewer.datatypes.broadening_pairs(
+            case_shacl_inheritance_reviewer.datatypes.datatype_ancestors(graph)
+        ):
+            broader_datatype_id = store.lookup(n_broader_datatype)
+            narrower_datatype_id = store.lookup(n_narrower_datatype)
+            if broader_datatype_id is not None and narrower_datatype_id is not None:
+                datatype_broadening_ids.add((broader_datatype_id, narrower_datatype_id))
+        connection.executemany(
+            "INSERT INTO datatype_broadening (broader, narrower) VALUES (?, ?)",
+            sorted(datatype_broadening_ids),
+        )
+
+        # Table statistics let the query planner choose join orders.
+        connection.execute("ANALYZE")
+        store.mark_derived()
+        store.commit()
+        _logger.debug("Built.")
+
+    def _literal_greater(self, left_id: int, right_id: int) -> bool:
+        return literal_compare(
+            lambda x, y: x.__gt__(y),
+            self.store.term(left_id),
+            self.store.term(right_id),
+        )
+
+    def _literal_less(self, left_id: int, right_id: int) -> bool:
+        return literal_compare(
+            lambda x, y: x.__lt__(y),
+            self.store.term(left_id),
+            self.store.term(right_id),
+        )
+
+    def review(
+        self, error_class_iris: typing.Iterable[str]
+    ) -> typing.Iterator[typing.Tuple[str, ResultRow]]:
+        """
+        Yield the same (error class IRI, row) pairs as HierarchyIndex.review(), running one SQL query per error class.
+        """
+        error_class_iris = list(error_class_iris)
+        for error_class_iri in error_class_iris:
+            if error_class_iri not in ERROR_CLASS_IRI_TO_SQL:
+                raise ValueError(
+                    UNKNOWN_ERROR_CLASS_MESSAGE % ("sqlite engine", error_class_iri)
+                )
+        for error_class_iri in error_class_iris:
+            (n_parameter, sql) = ERROR_CLASS_IRI_TO_SQL[error_class_iri]
+            parameters: typing.Dict[str, typing.Optional[int]] = dict()
+            if n_parameter is not None:
+                parameters["parameter"] = self.store.lookup(n_parameter)
+            _logger.debug("Running query for %r...", error_class_iri)
+            for row in self.store.connection.execute(sql, parameters):
+                result = (
+                    self.store.term(row[0]),
+                    self.store.term(row[1]),
+                    self.store.term(row[2]),
+                    self.store.term(row[3]),
+                    self.store.term(row[4]),
+                    self.store.term(row[5]),
+                )
+                for _ in range(row[6]):
+                    yield (error_class_iri, result)
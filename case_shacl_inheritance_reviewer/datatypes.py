@@ -0,0 +1,257 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module computes which datatypes derive from which, for the sh:datatype check.  Derivations of the XSD and RDF built-in datatypes are looked up from a fixed table.  Derivations of user-declared datatypes are read from the graph:
+
+* D owl:onDatatype B - D derives from B.  (This is how OWL 2 datatype restrictions name their base datatype.)
+* D rdfs:subClassOf B - D derives from B.
+* D owl:equivalentClass E - D and E are two names for one datatype, and share their derivations.  Typically, E is a blank node datatype restriction.
+
+Only the datatypes used as sh:datatype values, and their bases, are visited, so no hierarchy of the graph is traversed in full.
+"""
+
+import typing
+
+import rdflib
+
+NS_OWL = rdflib.OWL
+NS_RDF = rdflib.RDF
+NS_RDFS = rdflib.RDFS
+NS_SH = rdflib.SH
+NS_XSD = rdflib.XSD
+
+# The XSD ur-types, spelled out because rdflib's XSD namespace does not define them.
+N_XSD_ANY_ATOMIC_TYPE = rdflib.URIRef(str(NS_XSD) + "anyAtomicType")
+N_XSD_ANY_SIMPLE_TYPE = rdflib.URIRef(str(NS_XSD) + "anySimpleType")
+
+
+def _builtin_derivations() -> typing.Dict[
+    rdflib.URIRef, typing.Tuple[rdflib.URIRef, ...]
+]:
+    # Key: Built-in datatype.
+    # Value: Datatypes it is directly derived from.
+    derivations: typing.Dict[rdflib.URIRef, typing.Tuple[rdflib.URIRef, ...]] = dict()
+
+    # XSD 1.1 Part 2, Section 3, "Built-in Datatypes and Their Definitions".
+    for n_primitive in [
+        NS_XSD.anyURI,
+        NS_XSD.base64Binary,
+        NS_XSD.boolean,
+        NS_XSD.date,
+        NS_XSD.dateTime,
+        NS_XSD.decimal,
+        NS_XSD.double,
+        NS_XSD.duration,
+        NS_XSD.float,
+        NS_XSD.gDay,
+        NS_XSD.gMonth,
+        NS_XSD.gMonthDay,
+        NS_XSD.gYear,
+        NS_XSD.gYearMonth,
+        NS_XSD.hexBinary,
+        NS_XSD.NOTATION,
+        NS_XSD.QName,
+        NS_XSD.string,
+        NS_XSD.time,
+    ]:
+        derivations[n_primitive] = (N_XSD_ANY_ATOMIC_TYPE,)
+    derivations[N_XSD_ANY_ATOMIC_TYPE] = (N_XSD_ANY_SIMPLE_TYPE,)
+    for n_list_datatype in [NS_XSD.ENTITIES, NS_XSD.IDREFS, NS_XSD.NMTOKENS]:
+        derivations[n_list_datatype] = (N_XSD_ANY_SIMPLE_TYPE,)
+
+    for (n_datatype, n_base) in [
+        (NS_XSD.integer, NS_XSD.decimal),
+        (NS_XSD.nonPositiveInteger, NS_XSD.integer),
+        (NS_XSD.negativeInteger, NS_XSD.nonPositiveInteger),
+        (NS_XSD.long, NS_XSD.integer),
+        (NS_XSD.int, NS_XSD.long),
+        (NS_XSD.short, NS_XSD.int),
+        (NS_XSD.byte, NS_XSD.short),
+        (NS_XSD.nonNegativeInteger, NS_XSD.integer),
+        (NS_XSD.unsignedLong, NS_XSD.nonNegativeInteger),
+        (NS_XSD.unsignedInt, NS_XSD.unsignedLong),
+        (NS_XSD.unsignedShort, NS_XSD.unsignedInt),
+        (NS_XSD.unsignedByte, NS_XSD.unsignedShort),
+        (NS_XSD.positiveInteger, NS_XSD.nonNegativeInteger),
+        (NS_XSD.normalizedString, NS_XSD.string),
+        (NS_XSD.token, NS_XSD.normalizedString),
+        (NS_XSD.language, NS_XSD.token),
+        (NS_XSD.NMTOKEN, NS_XSD.token),
+        (NS_XSD.Name, NS_XSD.token),
+        (NS_XSD.NCName, NS_XSD.Name),
+        (NS_XSD.ID, NS_XSD.NCName),
+        (NS_XSD.IDREF, NS_XSD.NCName),
+        (NS_XSD.ENTITY, NS_XSD.NCName),
+        (NS_XSD.dayTimeDuration, NS_XSD.duration),
+        (NS_XSD.yearMonthDuration, NS_XSD.duration),
+        (NS_XSD.dateTimeStamp, NS_XSD.dateTime),
+    ]:
+        derivations[n_datatype] = (n_base,)
+
+    # OWL 2 Structural Specification, Section 4, "Datatype Maps": the value space of xsd:decimal is within owl:rational, which is within owl:real.
+    derivations[NS_XSD.decimal] += (NS_OWL.rational,)
+    derivations[NS_OWL.rational] = (NS_OWL.real,)
+
+    # Every literal is an instance of rdfs:Literal.
+    for n_datatype in [
+        NS_OWL.real,
+        NS_RDF.HTML,
+        NS_RDF.JSON,
+        NS_RDF.PlainLiteral,
+        NS_RDF.XMLLiteral,
+        NS_RDF.langString,
+        N_XSD_ANY_SIMPLE_TYPE,
+    ]:
+        derivations[n_datatype] = (NS_RDFS.Literal,)
+
+    return derivations
+
+
+# Key: Built-in datatype.
+# Value: Datatypes it is directly derived from.
+BUILTIN_DERIVATIONS = _builtin_derivations()
+
+# Datatypes whose valid values rdflib compares as Python integers.
+XSD_INTEGER_DATATYPES = frozenset(
+    [
+        NS_XSD.byte,
+        NS_XSD.int,
+        NS_XSD.integer,
+        NS_XSD.long,
+        NS_XSD.negativeInteger,
+        NS_XSD.nonNegativeInteger,
+        NS_XSD.nonPositiveInteger,
+        NS_XSD.positiveInteger,
+        NS_XSD.short,
+        NS_XSD.unsignedByte,
+        NS_XSD.unsignedInt,
+        NS_XSD.unsignedLong,
+        NS_XSD.unsignedShort,
+    ]
+)
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+def int64_value(l_value: rdflib.term.Node) -> typing.Optional[int]:
+    """
+    The value of l_value, if it is a valid XSD integer literal in the range of a signed 64-bit integer, otherwise None.  Two such values compare as integers the same as rdflib compares the literals.
+    """
+    if (
+        isinstance(l_value, rdflib.Literal)
+        and l_value.datatype in XSD_INTEGER_DATATYPES
+        and not l_value.ill_typed
+        and type(l_value.value) is int
+        and INT64_MIN <= l_value.value <= INT64_MAX
+    ):
+        return l_value.value
+    return None
+
+
+def _bases(
+    graph: rdflib.Graph, n_datatype: rdflib.term.Node
+) -> typing.List[rdflib.term.Node]:
+    bases: typing.List[rdflib.term.Node] = list(
+        BUILTIN_DERIVATIONS.get(typing.cast(rdflib.URIRef, n_datatype), ())
+    )
+    bases.extend(graph.objects(n_datatype, NS_OWL.onDatatype))
+    bases.extend(graph.objects(n_datatype, NS_RDFS.subClassOf))
+    return bases
+
+
+def _names(
+    graph: rdflib.Graph, n_datatype: rdflib.term.Node
+) -> typing.Set[rdflib.term.Node]:
+    """
+    n_datatype, and the names it has by owl:equivalentClass, read in either direction.
+    """
+    names = {n_datatype}
+    stack = [n_datatype]
+    while stack:
+        n_current = stack.pop()
+        for n_equivalent in list(
+            graph.objects(n_current, NS_OWL.equivalentClass)
+        ) + list(graph.subjects(NS_OWL.equivalentClass, n_current)):
+            if n_equivalent not in names:
+                names.add(n_equivalent)
+                stack.append(n_equivalent)
+    return names
+
+
+def derivation_ancestors(
+    graph: rdflib.Graph, n_datatype: rdflib.term.Node
+) -> typing.Set[rdflib.term.Node]:
+    """
+    Datatypes n_datatype derives from, by one or more derivations.  (That is, the datatype analogue of the SPARQL path "rdfs:subClassOf+".)  Each datatype reached is included with all of its names.  Cycles are permitted, in which case a datatype can be its own ancestor.
+    """
+    ancestors: typing.Set[rdflib.term.Node] = set()
+    stack: typing.List[rdflib.term.Node] = []
+    for n_name in _names(graph, n_datatype):
+        stack.extend(_bases(graph, n_name))
+    while stack:
+        n_current = stack.pop()
+        if n_current in ancestors:
+            continue
+        for n_name in _names(graph, n_current):
+            if n_name in ancestors:
+                continue
+            ancestors.add(n_name)
+            stack.extend(_bases(graph, n_name))
+    return ancestors
+
+
+def datatype_ancestors(
+    graph: rdflib.Graph,
+) -> typing.Dict[rdflib.URIRef, typing.Set[rdflib.term.Node]]:
+    """
+    Map each datatype IRI used as a sh:datatype value in graph to its derivation ancestors.
+    """
+    return {
+        n_datatype: derivation_ancestors(graph, n_datatype)
+        for n_datatype in set(graph.objects(None, NS_SH.datatype))
+        if isinstance(n_datatype, rdflib.URIRef)
+    }
+
+
+def broadening_pairs(
+    ancestors: typing.Dict[rdflib.URIRef, typing.Set[rdflib.term.Node]]
+) -> typing.Set[typing.Tuple[rdflib.URIRef, rdflib.URIRef]]:
+    """
+    Return the (broader datatype, narrower datatype) pairs among the keys of ancestors, a map as returned by datatype_ancestors().  A subclass property shape with the broader sh:datatype, corresponding with an ancestor class property shape with the narrower sh:datatype, broadens the ancestor's shape.
+    """
+    return {
+        (n_ancestor, n_datatype)
+        for (n_datatype, n_ancestors) in ancestors.items()
+        for n_ancestor in n_ancestors
+        if isinstance(n_ancestor, rdflib.URIRef) and n_ancestor in ancestors
+    }
+
+
+def builtin_broadening_pairs() -> typing.Set[
+    typing.Tuple[rdflib.URIRef, rdflib.URIRef]
+]:
+    """
+    broadening_pairs() of all built-in datatypes, which is correct for any graph that declares no datatypes of its own.
+    """
+    graph = rdflib.Graph()
+    n_datatypes: typing.Set[rdflib.URIRef] = set(BUILTIN_DERIVATIONS.keys())
+    for n_bases in BUILTIN_DERIVATIONS.values():
+        n_datatypes.update(n_bases)
+    return broadening_pairs(
+        {
+            n_datatype: derivation_ancestors(graph, n_datatype)
+            for n_datatype in n_datatypes
+        }
+    )
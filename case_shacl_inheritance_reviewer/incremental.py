@@ -0,0 +1,249 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module implements incremental re-review.  Given the report of a previous review, and the files that changed since that review, only node shapes whose results could have changed are reviewed again.  The results of the previous report for all other node shapes are carried forward.
+
+Every check is a conjunction of graph patterns, so removing triples can only remove results.  New results therefore need at least one triple of a changed file, and the node shapes that could gain results are found from the terms the changed files describe.  Carried-forward results are each re-checked against the current graph, which drops results whose support was removed.
+"""
+
+import logging
+import os
+import typing
+
+import rdflib
+
+from case_shacl_inheritance_reviewer import NS_RDF, NS_RDFS, NS_SH
+from case_shacl_inheritance_reviewer.index import N_SH_CLASS, HierarchyIndex, ResultRow
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# 0: Error class IRI.
+# 1: sh:focusNode.
+# 2: sh:value.
+# 3: rdfs:seeAlso.
+# 4: sh:sourceShape.
+# 5: sh:resultPath.
+ResultKey = typing.Tuple[
+    str,
+    rdflib.term.Node,
+    rdflib.term.Node,
+    rdflib.term.Node,
+    rdflib.term.Node,
+    rdflib.term.Node,
+]
+
+
+def _touched_terms(delta_graph: rdflib.Graph) -> typing.Set[rdflib.term.Node]:
+    """
+    IRIs described by the changed files.  A blank node subject is attributed to the IRIs that reference it, directly or through other blank nodes (e.g. a property shape, or a member of its sh:or list).
+    """
+    touched: typing.Set[rdflib.term.Node] = set()
+    visited: typing.Set[rdflib.term.Node] = set()
+    for n_subject in set(delta_graph.subjects()):
+        if not isinstance(n_subject, rdflib.BNode):
+            touched.add(n_subject)
+            continue
+        stack = [n_subject]
+        while stack:
+            n_current = stack.pop()
+            if n_current in visited:
+                continue
+            visited.add(n_current)
+            for n_referrer in delta_graph.subjects(None, n_current):
+                if isinstance(n_referrer, rdflib.BNode):
+                    stack.append(n_referrer)
+                else:
+                    touched.add(n_referrer)
+    return touched
+
+
+def affected_node_shapes(
+    hierarchy_index: HierarchyIndex,
+    graph: rdflib.Graph,
+    touched: typing.Set[rdflib.term.Node],
+) -> typing.Set[rdflib.term.Node]:
+    """
+    Node shapes whose results could differ from the previous review, if the terms in touched were changed.
+    """
+    class_descendants = hierarchy_index.class_descendants()
+    property_descendants = hierarchy_index.property_descendants()
+    datatype_descendants = hierarchy_index.datatype_descendants()
+
+    # Terms whose hierarchy position may have changed, along with all terms below them.
+    lowered: typing.Set[rdflib.term.Node] = set(touched)
+    for n_term in touched:
+        lowered |= class_descendants.get(n_term, set())
+        lowered |= property_descendants.get(n_term, set())
+        lowered |= datatype_descendants.get(n_term, set())
+
+    # Members: Property shapes the changes could reach.
+    property_shapes: typing.Set[rdflib.term.Node] = set(touched)
+    for n_term in lowered:
+        property_shapes.update(graph.subjects(NS_SH.path, n_term))
+        property_shapes.update(graph.subjects(N_SH_CLASS, n_term))
+        property_shapes.update(graph.subjects(NS_SH.datatype, n_term))
+
+    seeds: typing.Set[rdflib.term.Node] = set(touched)
+    for n_property_shape in property_shapes:
+        seeds.update(graph.subjects(NS_SH.property, n_property_shape))
+
+    affected: typing.Set[rdflib.term.Node] = set(seeds)
+    for n_seed in seeds:
+        affected |= class_descendants.get(n_seed, set())
+    return affected & hierarchy_index.node_shapes
+
+
+def _previous_result_keys(
+    previous_report_graph: rdflib.Graph, error_class_iris: typing.Set[str]
+) -> typing.Iterator[ResultKey]:
+    for n_result in previous_report_graph.objects(None, NS_SH.result):
+        for n_error_class in previous_report_graph.objects(n_result, NS_RDF.type):
+            if str(n_error_class) not in error_class_iris:
+                continue
+            terms = [
+                x
+                for x in [
+                    previous_report_graph.value(n_result, n_predicate)
+                    for n_predicate in [
+                        NS_SH.focusNode,
+                        NS_SH.value,
+                        NS_RDFS.seeAlso,
+                        NS_SH.sourceShape,
+                        NS_SH.resultPath,
+                    ]
+                ]
+                if x is not None
+            ]
+            if len(terms) < 5:
+                _logger.debug("Skipping incomplete previous result %r.", n_result)
+                continue
+            yield (
+                str(n_error_class),
+                terms[0],
+                terms[1],
+                terms[2],
+                terms[3],
+                terms[4],
+            )
+
+
+def _map_property_shape(
+    previous_report_graph: rdflib.Graph,
+    graph: rdflib.Graph,
+    n_node_shape: rdflib.term.Node,
+    n_property_shape: rdflib.term.Node,
+) -> typing.Optional[rdflib.term.Node]:
+    """
+    Find the property shape of graph that a property shape of the previous report denotes.  IRIs denote themselves.  A blank node is matched by its node shape, and by the triples the previous report copied from it.  None is returned if there is not exactly one match.
+    """
+    if not isinstance(n_property_shape, rdflib.BNode):
+        return n_property_shape
+
+    def _description(
+        description_graph: rdflib.Graph, n_subject: rdflib.term.Node
+    ) -> typing.Set[typing.Tuple[rdflib.term.Node, rdflib.term.Node]]:
+        return {
+            (n_predicate, n_object)
+            for (n_predicate, n_object) in description_graph.predicate_objects(
+                n_subject
+            )
+            if not isinstance(n_object, rdflib.BNode)
+        }
+
+    previous_description = _description(previous_report_graph, n_property_shape)
+    matches = [
+        x
+        for x in graph.objects(n_node_shape, NS_SH.property)
+        if isinstance(x, rdflib.BNode)
+        and _description(graph, x) == previous_description
+    ]
+    if len(matches) != 1:
+        return None
+    return matches[0]
+
+
+def review_incremental(
+    hierarchy_index: HierarchyIndex,
+    graph: rdflib.Graph,
+    delta_graph: rdflib.Graph,
+    previous_report_graph: rdflib.Graph,
+    error_class_iris: typing.Iterable[str],
+) -> typing.Iterator[typing.Tuple[str, ResultRow]]:
+    """
+    Yield the (error class IRI, row) pairs a full review of graph would yield, given the report of a previous review, and delta_graph, holding the current content of the files changed since that review.
+    """
+    error_class_iris = sorted(error_class_iris)
+
+    affected = affected_node_shapes(hierarchy_index, graph, _touched_terms(delta_graph))
+
+    # Members: Previous results, with terms mapped to graph, to carry forward.
+    kept_keys: typing.Set[ResultKey] = set()
+    for result_key in _previous_result_keys(
+        previous_report_graph, set(error_class_iris)
+    ):
+        (
+            error_class_iri,
+            n_class_node_shape,
+            n_class_property_shape,
+            n_superclass_node_shape,
+            n_superclass_property_shape,
+            n_superclass_property_shape_path,
+        ) = result_key
+        if isinstance(n_class_node_shape, rdflib.BNode) or isinstance(
+            n_superclass_node_shape, rdflib.BNode
+        ):
+            _logger.warning(
+                "Previous report has a result on a blank-node node shape.  Reviewing all node shapes."
+            )
+            yield from hierarchy_index.review(error_class_iris)
+            return
+        if n_class_node_shape in affected:
+            continue
+        n_mapped_class_property_shape = _map_property_shape(
+            previous_report_graph, graph, n_class_node_shape, n_class_property_shape
+        )
+        n_mapped_superclass_property_shape = _map_property_shape(
+            previous_report_graph,
+            graph,
+            n_superclass_node_shape,
+            n_superclass_property_shape,
+        )
+        if (
+            n_mapped_class_property_shape is None
+            or n_mapped_superclass_property_shape is None
+        ):
+            affected.add(n_class_node_shape)
+            continue
+        kept_keys.add(
+            (
+                error_class_iri,
+                n_class_node_shape,
+                n_mapped_class_property_shape,
+                n_superclass_node_shape,
+                n_mapped_superclass_property_shape,
+                n_superclass_property_shape_path,
+            )
+        )
+
+    _logger.debug(
+        "Reviewing %d of %d node shapes.",
+        len(affected),
+        len(hierarchy_index.node_shapes),
+    )
+    yield from hierarchy_index.review(error_class_iris, focus_node_shapes=affected)
+
+    _logger.debug("Re-checking %d previous results.", len(kept_keys))
+    for result_key in kept_keys:
+        for result in hierarchy_index.review_result(*result_key):
+            yield (result_key[0], result)
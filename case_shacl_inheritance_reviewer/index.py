@@ -0,0 +1,863 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module implements the "index" review engine.  Instead of having the SPARQL engine re-walk rdfs:subClassOf+ and rdfs:subPropertyOf+ paths for each candidate binding, the ancestor closures of both hierarchies are computed once, and each error class's query is evaluated as lookups against those closures.
+
+The rows yielded by HierarchyIndex.review() are the same, including multiplicity, as the rows yielded by the SPARQL query of the same error class.  All error classes are evaluated as filters on one shared stream of candidate (subclass property shape, ancestor property shape) pairs.
+
+The indexes hold terms as integer IDs, with closures and edges in flat arrays (see case_shacl_inheritance_reviewer.terms).  IDs are converted back to rdflib terms only as rows are yielded.
+"""
+
+import array
+import collections
+import logging
+import os
+import typing
+
+import rdflib
+
+import case_shacl_inheritance_reviewer.datatypes
+from case_shacl_inheritance_reviewer import (
+    NS_RDF,
+    NS_RDFS,
+    NS_SH,
+    NS_SHIR,
+    UNKNOWN_ERROR_CLASS_MESSAGE,
+)
+from case_shacl_inheritance_reviewer.terms import ID_TYPECODE, IdLists, TermStore
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+NS_OWL = rdflib.OWL
+NS_XSD = rdflib.XSD
+
+# sh:class, spelled out because "class" is a Python keyword.
+N_SH_CLASS = rdflib.URIRef(str(NS_SH) + "class")
+
+# Matches the projection of the SPARQL queries:
+#   ?nClassNodeShape ?nClassPropertyShape ?nClassPropertyShapePath ?nSuperclassNodeShape ?nSuperclassPropertyShape ?nSuperclassPropertyShapePath
+ResultRow = typing.Tuple[
+    rdflib.term.Node,
+    rdflib.term.Node,
+    rdflib.term.Node,
+    rdflib.term.Node,
+    rdflib.term.Node,
+    rdflib.term.Node,
+]
+
+# ResultRow, with terms as IDs.
+IdRow = typing.Tuple[int, int, int, int, int, int]
+
+
+def _compute_closure(
+    parents: typing.Dict[int, typing.List[int]], n_terms: int
+) -> IdLists:
+    """
+    Compute, for each child in parents, the sorted IDs of the nodes reachable by one or more parent links.  (That is, the answers of the SPARQL path "predicate+", for the predicate parents was read from.)  Cycles are permitted, in which case a node can be its own ancestor.  Nodes that are not children have empty lists.
+    """
+    closure = IdLists(n_terms)
+    # Closures are completed in ascending ID order, as IdLists requires.
+    for start_id in sorted(parents.keys()):
+        ancestor_ids: typing.Set[int] = set()
+        stack = list(parents[start_id])
+        while stack:
+            current_id = stack.pop()
+            if current_id in ancestor_ids:
+                continue
+            ancestor_ids.add(current_id)
+            if current_id < start_id and current_id in parents:
+                # Ancestors of a completed node are already known.
+                ancestor_ids.update(closure[current_id])
+                continue
+            stack.extend(parents.get(current_id, ()))
+        closure.append(start_id, sorted(ancestor_ids))
+    return closure
+
+
+def strongly_connected_components(
+    parents: typing.Dict[int, typing.List[int]]
+) -> typing.List[typing.List[int]]:
+    """
+    Partition the nodes of parents (children and parents alike) into strongly connected components, with Tarjan's algorithm.  Each component's members are sorted.  Components are listed parents first: a component follows every component its members' parents are in.
+    """
+    # Key: Node ID.
+    # Value: Position of node in visit order.
+    visit_positions: typing.Dict[int, int] = dict()
+    # Key: Node ID.
+    # Value: Lowest visit position reachable from the node, within its component's subtree.
+    low_links: typing.Dict[int, int] = dict()
+    # Members: Visited nodes not yet assigned to a component.
+    stack: typing.List[int] = []
+    on_stack: typing.Set[int] = set()
+    components: typing.List[typing.List[int]] = []
+
+    nodes = set(parents.keys())
+    for node_parents in parents.values():
+        nodes.update(node_parents)
+    for start_id in sorted(nodes):
+        if start_id in visit_positions:
+            continue
+        # Iterative depth-first search.  Members: (Node ID, position of next parent to visit.)
+        work: typing.List[typing.Tuple[int, int]] = [(start_id, 0)]
+        while work:
+            (node_id, parent_position) = work.pop()
+            if parent_position == 0:
+                visit_positions[node_id] = len(visit_positions)
+                low_links[node_id] = visit_positions[node_id]
+                stack.append(node_id)
+                on_stack.add(node_id)
+            node_parents = parents.get(node_id, [])
+            if parent_position > 0:
+                # Returned from visiting the previous parent.
+                previous_id = node_parents[parent_position - 1]
+                if previous_id in on_stack:
+                    low_links[node_id] = min(low_links[node_id], low_links[previous_id])
+            while parent_position < len(node_parents):
+                parent_id = node_parents[parent_position]
+                parent_position += 1
+                if parent_id not in visit_positions:
+                    work.append((node_id, parent_position))
+                    work.append((parent_id, 0))
+                    break
+                if parent_id in on_stack:
+                    low_links[node_id] = min(
+                        low_links[node_id], visit_positions[parent_id]
+                    )
+            else:
+                if low_links[node_id] == visit_positions[node_id]:
+                    component: typing.List[int] = []
+                    while True:
+                        member_id = stack.pop()
+                        on_stack.discard(member_id)
+                        component.append(member_id)
+                        if member_id == node_id:
+                            break
+                    components.append(sorted(component))
+    return components
+
+
+def cycle_components(
+    parents: typing.Dict[int, typing.List[int]]
+) -> typing.List[typing.List[int]]:
+    """
+    The strongly connected components of parents that are cycles: those of more than one node, or of one node that is its own parent.
+    """
+    return [
+        x
+        for x in strongly_connected_components(parents)
+        if len(x) > 1 or x[0] in parents.get(x[0], [])
+    ]
+
+
+def _condense(
+    parents: typing.Dict[int, typing.List[int]], n_terms: int
+) -> typing.Tuple[IdLists, typing.Dict[int, typing.List[int]], "array.array[int]"]:
+    """
+    Condense the strongly connected components of parents, and return, as three values:
+
+    * For each node, the sorted IDs of the nodes in the components reachable from its own by one or more parent links.  Members of a node's own component are not included, so no node is its own ancestor.
+    * For each node, the parents of its component's members that are outside the component.
+    * The representative of each term: the lowest ID in its component.  Terms not in parents represent themselves.
+    """
+    components = strongly_connected_components(parents)
+    representative_ids = array.array(ID_TYPECODE, range(n_terms))
+    for component in components:
+        for member_id in component:
+            representative_ids[member_id] = component[0]
+
+    # Key: Node ID.
+    # Value: Parents outside the node's component.
+    component_parents: typing.Dict[int, typing.List[int]] = dict()
+    # Key: Representative ID.
+    # Value: IDs of members of ancestor components.
+    component_ancestors: typing.Dict[int, typing.Set[int]] = dict()
+    # Key: Representative ID.
+    # Value: Component members.
+    representative_members: typing.Dict[int, typing.List[int]] = dict()
+    # Components are listed parents first, so parent components' ancestors are complete.
+    for component in components:
+        representative_members[component[0]] = component
+        external_parent_ids = sorted(
+            {
+                parent_id
+                for member_id in component
+                for parent_id in parents.get(member_id, [])
+                if representative_ids[parent_id] != component[0]
+            }
+        )
+        ancestor_ids: typing.Set[int] = set()
+        for parent_representative_id in {
+            representative_ids[x] for x in external_parent_ids
+        }:
+            ancestor_ids.update(representative_members[parent_representative_id])
+            ancestor_ids.update(component_ancestors[parent_representative_id])
+        component_ancestors[component[0]] = ancestor_ids
+        if len(external_parent_ids) > 0:
+            for member_id in component:
+                component_parents[member_id] = external_parent_ids
+
+    closure = IdLists(n_terms)
+    # Closures are appended in ascending ID order, as IdLists requires.
+    for member_id in sorted(x for y in components for x in y):
+        closure.append(
+            member_id, sorted(component_ancestors[representative_ids[member_id]])
+        )
+    return (closure, component_parents, representative_ids)
+
+
+def _read_parents(
+    graph: rdflib.Graph, predicate: rdflib.URIRef, terms: TermStore
+) -> typing.Dict[int, typing.List[int]]:
+    # Key: Child ID.
+    # Value: Parent IDs.
+    parents: typing.DefaultDict[int, typing.List[int]] = collections.defaultdict(list)
+    for (n_child, n_parent) in graph.subject_objects(predicate):
+        parents[terms.intern(n_child)].append(terms.intern(n_parent))
+    return dict(parents)
+
+
+def _read_equivalents(
+    parents: typing.Dict[int, typing.List[int]],
+    graph: rdflib.Graph,
+    predicate: rdflib.URIRef,
+    terms: TermStore,
+) -> None:
+    """
+    Add each predicate link in graph to parents in both directions, as a cycle of two parent links.
+    """
+    for (n_left, n_right) in graph.subject_objects(predicate):
+        left_id = terms.intern(n_left)
+        right_id = terms.intern(n_right)
+        parents.setdefault(left_id, []).append(right_id)
+        parents.setdefault(right_id, []).append(left_id)
+
+
+def _invert(
+    closure: IdLists, terms: TermStore
+) -> typing.Dict[rdflib.term.Node, typing.Set[rdflib.term.Node]]:
+    inverse: typing.DefaultDict[
+        rdflib.term.Node, typing.Set[rdflib.term.Node]
+    ] = collections.defaultdict(set)
+    for descendant_id in range(len(closure)):
+        n_descendant = terms.term(descendant_id)
+        for ancestor_id in closure[descendant_id]:
+            inverse[terms.term(ancestor_id)].add(n_descendant)
+    return dict(inverse)
+
+
+def literal_compare(
+    compare: typing.Callable[[rdflib.Literal, rdflib.Literal], typing.Any],
+    l_left: rdflib.term.Node,
+    l_right: rdflib.term.Node,
+) -> bool:
+    """
+    Evaluate a relational comparison the way a SPARQL FILTER does, where an evaluation error excludes the binding.  compare is expected to call the rich-comparison method directly (e.g. x.__gt__(y)), as rdflib's SPARQL engine does, rather than through the operator module's reflected fallbacks.
+    """
+    if not isinstance(l_left, rdflib.Literal) or not isinstance(
+        l_right, rdflib.Literal
+    ):
+        return False
+    # SPARQL only permits = and != between two non-XSD typed literals.
+    if (
+        l_left.datatype is not None
+        and not str(l_left.datatype).startswith(str(NS_XSD))
+        and l_right.datatype is not None
+        and not str(l_right.datatype).startswith(str(NS_XSD))
+    ):
+        return False
+    try:
+        result = compare(l_left, l_right)
+    except TypeError:
+        return False
+    if result is NotImplemented:
+        return False
+    return bool(result)
+
+
+class HierarchyIndex:
+    """
+    In-memory indexes of one graph, sufficient to evaluate every error class the SPARQL engine evaluates.
+    """
+
+    __slots__ = (
+        "terms",
+        "node_shapes",
+        "class_ancestor_ids",
+        "_class_component_ids",
+        "class_parent_ids",
+        "_class_representative_ids",
+        "condensed",
+        "datatype_ancestors",
+        "datatype_broadening_ids",
+        "hierarchy_cycles",
+        "_is_node_shape",
+        "node_shape_ids",
+        "parameter_value_ids",
+        "property_ancestor_ids",
+        "_property_component_ids",
+        "_property_representative_ids",
+        "property_shape_path_ids",
+        "property_shape_ids",
+    )
+
+    def __init__(self, graph: rdflib.Graph, condense: bool = False) -> None:
+        """
+        If condense is true, the class and property hierarchies are condensed into their strongly connected components, after linking classes by owl:equivalentClass and properties by owl:equivalentProperty in both directions.  The members of a component are then reviewed as one class or property: each one's ancestors are the members of the components above its own, so it is neither its own ancestor nor an ancestor of the other members.  The cycles of rdfs:subClassOf and rdfs:subPropertyOf links found are kept in hierarchy_cycles.
+        """
+        _logger.debug("Building hierarchy indexes...")
+        self.terms = TermStore()
+        terms = self.terms
+        self.condensed = condense
+
+        class_parents = _read_parents(graph, NS_RDFS.subClassOf, terms)
+        property_parents = _read_parents(graph, NS_RDFS.subPropertyOf, terms)
+
+        # Members: Tuples.
+        #   0: Hierarchy predicate.
+        #   1: Members of a cycle of the predicate's links, sorted.
+        self.hierarchy_cycles: typing.List[
+            typing.Tuple[rdflib.URIRef, typing.List[rdflib.term.Node]]
+        ] = []
+        if condense:
+            for (n_predicate, parents) in [
+                (NS_RDFS.subClassOf, class_parents),
+                (NS_RDFS.subPropertyOf, property_parents),
+            ]:
+                for component in cycle_components(parents):
+                    self.hierarchy_cycles.append(
+                        (
+                            n_predicate,
+                            sorted((terms.term(x) for x in component), key=str),
+                        )
+                    )
+            _read_equivalents(class_parents, graph, NS_OWL.equivalentClass, terms)
+            _read_equivalents(property_parents, graph, NS_OWL.equivalentProperty, terms)
+
+        # Node shapes reviewed are only those that are also OWL classes.
+        node_shapes: typing.Set[rdflib.term.Node] = set()
+        for n_node_shape in graph.subjects(NS_RDF.type, NS_SH.NodeShape):
+            if (n_node_shape, NS_RDF.type, NS_OWL.Class) in graph:
+                node_shapes.add(n_node_shape)
+        self.node_shapes = frozenset(node_shapes)
+
+        # Key: Node shape ID.
+        # Value: Parallel lists of property shape IDs, and their path IDs.
+        node_shape_property_paths: typing.Dict[
+            int, typing.Tuple[typing.List[int], typing.List[int]]
+        ] = dict()
+        # Members: Property shapes of reviewed node shapes.
+        property_shapes: typing.Set[rdflib.term.Node] = set()
+        for n_node_shape in self.node_shapes:
+            property_paths: typing.Tuple[typing.List[int], typing.List[int]] = (
+                [],
+                [],
+            )
+            for n_property_shape in graph.objects(n_node_shape, NS_SH.property):
+                property_shapes.add(n_property_shape)
+                for n_path in graph.objects(n_property_shape, NS_SH.path):
+                    property_paths[0].append(terms.intern(n_property_shape))
+                    property_paths[1].append(terms.intern(n_path))
+            node_shape_property_paths[terms.intern(n_node_shape)] = property_paths
+
+        # Key: Constraint component parameter (sh:class, sh:datatype, sh:maxCount, sh:minCount).
+        # Value: Dict, mapping property shape ID to its parameter value IDs.
+        parameter_values: typing.Dict[
+            rdflib.URIRef, typing.Dict[int, typing.List[int]]
+        ] = dict()
+        for n_parameter in [N_SH_CLASS, NS_SH.datatype, NS_SH.maxCount, NS_SH.minCount]:
+            parameter_values[n_parameter] = dict()
+            for n_property_shape in property_shapes:
+                value_ids = [
+                    terms.intern(x)
+                    for x in graph.objects(n_property_shape, n_parameter)
+                ]
+                if len(value_ids) > 0:
+                    parameter_values[n_parameter][
+                        terms.intern(n_property_shape)
+                    ] = value_ids
+        del property_shapes
+
+        # The sh:datatype check reads derivations from a table of the built-in datatypes, and from the graph's declarations of the datatypes in use, rather than from either closure.
+        # Key: Datatype used as a sh:datatype value.
+        # Value: Datatypes it derives from.
+        self.datatype_ancestors = (
+            case_shacl_inheritance_reviewer.datatypes.datatype_ancestors(graph)
+        )
+        # Members: (Broader datatype ID, narrower datatype ID) pairs.  Datatypes not used by reviewed property shapes are not interned, and cannot be in a result.
+        datatype_broadening_ids: typing.Set[typing.Tuple[int, int]] = set()
+        for (
+            n_broader_datatype,
+            n_narrower_datatype,
+        ) in case_shacl_inheritance_reviewer.datatypes.broadening_pairs(
+            self.datatype_ancestors
+        ):
+            broader_datatype_id = terms.lookup(n_broader_datatype)
+            narrower_datatype_id = terms.lookup(n_narrower_datatype)
+            if broader_datatype_id is not None and narrower_datatype_id is not None:
+                datatype_broadening_ids.add((broader_datatype_id, narrower_datatype_id))
+        self.datatype_broadening_ids = frozenset(datatype_broadening_ids)
+
+        # All terms are interned, so the arrays can be sized.
+        n_terms = len(terms)
+        # Key: Representative property ID.
+        # Value: Members of its component, if it has more than one.
+        self._property_component_ids: typing.Dict[int, typing.List[int]] = dict()
+        self._property_representative_ids: typing.Optional["array.array[int]"] = None
+        # Key: Representative class ID.
+        # Value: Members of its component, if it has more than one.
+        self._class_component_ids: typing.Dict[int, typing.List[int]] = dict()
+        self._class_representative_ids: typing.Optional["array.array[int]"] = None
+        if condense:
+            (
+                self.class_ancestor_ids,
+                class_parents,
+                self._class_representative_ids,
+            ) = _condense(class_parents, n_terms)
+            (
+                self.property_ancestor_ids,
+                _,
+                self._property_representative_ids,
+            ) = _condense(property_parents, n_terms)
+            for (representative_ids, component_ids) in [
+                (self._class_representative_ids, self._class_component_ids),
+                (self._property_representative_ids, self._property_component_ids),
+            ]:
+                for (term_id, representative_id) in enumerate(representative_ids):
+                    if term_id != representative_id:
+                        component_ids.setdefault(
+                            representative_id, [representative_id]
+                        ).append(term_id)
+        else:
+            self.class_ancestor_ids = _compute_closure(class_parents, n_terms)
+            self.property_ancestor_ids = _compute_closure(property_parents, n_terms)
+        # Direct rdfs:subClassOf links, for walks of the class hierarchy.  In condensed hierarchies, these are the links out of each class's component, so a walk meets no cycles.
+        self.class_parent_ids = IdLists(n_terms)
+        for class_id in sorted(class_parents.keys()):
+            self.class_parent_ids.append(class_id, sorted(class_parents[class_id]))
+        del class_parents
+        del property_parents
+
+        # Member at position i: 1 if ID i is a reviewed node shape.
+        self._is_node_shape = bytearray(n_terms)
+        for node_shape_id in node_shape_property_paths:
+            self._is_node_shape[node_shape_id] = 1
+        self.node_shape_ids = array.array(
+            ID_TYPECODE, sorted(node_shape_property_paths.keys())
+        )
+
+        # Parallel lists of each node shape's property shapes and their paths.
+        self.property_shape_ids = IdLists(n_terms)
+        self.property_shape_path_ids = IdLists(n_terms)
+        for node_shape_id in self.node_shape_ids:
+            (property_shape_ids, path_ids) = node_shape_property_paths.pop(
+                node_shape_id
+            )
+            self.property_shape_ids.append(node_shape_id, property_shape_ids)
+            self.property_shape_path_ids.append(node_shape_id, path_ids)
+
+        # Key: Constraint component parameter.
+        # Value: Each property shape's parameter values.
+        self.parameter_value_ids: typing.Dict[rdflib.URIRef, IdLists] = dict()
+        for (n_parameter, values) in parameter_values.items():
+            self.parameter_value_ids[n_parameter] = IdLists(n_terms)
+            for property_shape_id in sorted(values.keys()):
+                self.parameter_value_ids[n_parameter].append(
+                    property_shape_id, values[property_shape_id]
+                )
+        del parameter_values
+        _logger.debug(
+            "Built, with %d terms and %d closure members.",
+            n_terms,
+            self.class_ancestor_ids.total_size()
+            + self.property_ancestor_ids.total_size(),
+        )
+
+    def to_row(self, candidate: IdRow) -> ResultRow:
+        terms = self.terms.terms
+        return (
+            terms[candidate[0]],
+            terms[candidate[1]],
+            terms[candidate[2]],
+            terms[candidate[3]],
+            terms[candidate[4]],
+            terms[candidate[5]],
+        )
+
+    def is_node_shape_id(self, term_id: int) -> bool:
+        """
+        True if term_id is the ID of a reviewed node shape.
+        """
+        return bool(self._is_node_shape[term_id])
+
+    def equivalent_class_ids(self, class_id: int) -> typing.List[int]:
+        """
+        IDs of the classes reviewed as one class with class_id, including class_id.  Only condensed hierarchies have others.
+        """
+        if self._class_representative_ids is None:
+            return [class_id]
+        return self._class_component_ids.get(
+            self._class_representative_ids[class_id], [class_id]
+        )
+
+    def equivalent_property_ids(self, property_id: int) -> typing.List[int]:
+        """
+        IDs of the properties reviewed as one property with property_id, including property_id.  Only condensed hierarchies have others.
+        """
+        if self._property_representative_ids is None:
+            return [property_id]
+        return self._property_component_ids.get(
+            self._property_representative_ids[property_id], [property_id]
+        )
+
+    def is_subclass(
+        self, n_class: rdflib.term.Node, n_ancestor: rdflib.term.Node
+    ) -> bool:
+        """
+        rdfs:subClassOf+
+        """
+        class_id = self.terms.lookup(n_class)
+        ancestor_id = self.terms.lookup(n_ancestor)
+        if class_id is None or ancestor_id is None:
+            return False
+        return self.class_ancestor_ids.contains(class_id, ancestor_id)
+
+    def is_subproperty(
+        self, n_property: rdflib.term.Node, n_ancestor: rdflib.term.Node
+    ) -> bool:
+        """
+        rdfs:subPropertyOf+
+        """
+        property_id = self.terms.lookup(n_property)
+        ancestor_id = self.terms.lookup(n_ancestor)
+        if property_id is None or ancestor_id is None:
+            return False
+        return self.property_ancestor_ids.contains(property_id, ancestor_id)
+
+    def class_ancestors(
+        self, n_class: rdflib.term.Node
+    ) -> typing.List[rdflib.term.Node]:
+        """
+        rdfs:subClassOf+ answers for n_class.
+        """
+        class_id = self.terms.lookup(n_class)
+        if class_id is None:
+            return []
+        return [self.terms.term(x) for x in self.class_ancestor_ids[class_id]]
+
+    def _subproperty_or_self_multiplicity(
+        self, property_id: int, ancestor_id: int
+    ) -> int:
+        """
+        Number of solutions rdflib's SPARQL engine yields for the path rdfs:subPropertyOf* between two bound terms.  rdflib yields the zero-length solution separately from its de-duplicated rdfs:subPropertyOf+ solutions, so a property on an rdfs:subPropertyOf cycle is its own subproperty twice.
+        """
+        multiplicity = 0
+        if self._property_representative_ids is None:
+            if property_id == ancestor_id:
+                multiplicity += 1
+        elif (
+            self._property_representative_ids[property_id]
+            == self._property_representative_ids[ancestor_id]
+        ):
+            # Properties of one component are one property.
+            multiplicity += 1
+        if self.property_ancestor_ids.contains(property_id, ancestor_id):
+            multiplicity += 1
+        return multiplicity
+
+    def _focus_node_shape_ids(
+        self, focus_node_shapes: typing.Optional[typing.Iterable[rdflib.term.Node]]
+    ) -> typing.Iterator[int]:
+        if focus_node_shapes is None:
+            yield from self.node_shape_ids
+            return
+        for n_focus_node_shape in focus_node_shapes:
+            node_shape_id = self.terms.lookup(n_focus_node_shape)
+            if node_shape_id is not None and self._is_node_shape[node_shape_id]:
+                yield node_shape_id
+
+    def _candidates(
+        self,
+        focus_node_shapes: typing.Optional[typing.Iterable[rdflib.term.Node]] = None,
+    ) -> typing.Iterator[IdRow]:
+        """
+        Yield all (class node shape, class property shape, class path, superclass node shape, superclass property shape, superclass path) combinations, where the class node shape is a subclass of the superclass node shape.
+
+        If focus_node_shapes is provided, only combinations with those class node shapes are yielded.
+        """
+        for class_node_shape_id in self._focus_node_shape_ids(focus_node_shapes):
+            class_property_paths = list(
+                zip(
+                    self.property_shape_ids[class_node_shape_id],
+                    self.property_shape_path_ids[class_node_shape_id],
+                )
+            )
+            if len(class_property_paths) == 0:
+                continue
+            for superclass_node_shape_id in self.class_ancestor_ids[
+                class_node_shape_id
+            ]:
+                if not self._is_node_shape[superclass_node_shape_id]:
+                    continue
+                for (
+                    superclass_property_shape_id,
+                    superclass_property_shape_path_id,
+                ) in zip(
+                    self.property_shape_ids[superclass_node_shape_id],
+                    self.property_shape_path_ids[superclass_node_shape_id],
+                ):
+                    for (
+                        class_property_shape_id,
+                        class_property_shape_path_id,
+                    ) in class_property_paths:
+                        yield (
+                            class_node_shape_id,
+                            class_property_shape_id,
+                            class_property_shape_path_id,
+                            superclass_node_shape_id,
+                            superclass_property_shape_id,
+                            superclass_property_shape_path_id,
+                        )
+
+    def _filter_path(self, candidate: IdRow, path_multiplicity: int) -> int:
+        if self.property_ancestor_ids.contains(candidate[5], candidate[2]):
+            return 1
+        return 0
+
+    def _filter_class(self, candidate: IdRow, path_multiplicity: int) -> int:
+        if path_multiplicity == 0:
+            return 0
+        classes = self.parameter_value_ids[N_SH_CLASS]
+        tally = 0
+        for superclass_property_shape_class_id in classes[candidate[4]]:
+            for class_property_shape_class_id in classes[candidate[1]]:
+                if self.class_ancestor_ids.contains(
+                    superclass_property_shape_class_id, class_property_shape_class_id
+                ):
+                    tally += path_multiplicity
+        return tally
+
+    def _filter_datatype(self, candidate: IdRow, path_multiplicity: int) -> int:
+        if path_multiplicity == 0:
+            return 0
+        datatypes = self.parameter_value_ids[NS_SH.datatype]
+        tally = 0
+        for superclass_property_shape_datatype_id in datatypes[candidate[4]]:
+            for class_property_shape_datatype_id in datatypes[candidate[1]]:
+                if (
+                    class_property_shape_datatype_id,
+                    superclass_property_shape_datatype_id,
+                ) in self.datatype_broadening_ids:
+                    tally += path_multiplicity
+        return tally
+
+    def _filter_count(
+        self,
+        n_parameter: rdflib.URIRef,
+        compare: typing.Callable[[rdflib.Literal, rdflib.Literal], typing.Any],
+        candidate: IdRow,
+        path_multiplicity: int,
+    ) -> int:
+        if path_multiplicity == 0:
+            return 0
+        counts = self.parameter_value_ids[n_parameter]
+        terms = self.terms.terms
+        tally = 0
+        for superclass_count_id in counts[candidate[4]]:
+            for class_count_id in counts[candidate[1]]:
+                if literal_compare(
+                    compare, terms[class_count_id], terms[superclass_count_id]
+                ):
+                    tally += path_multiplicity
+        return tally
+
+    def _filter_max_count(self, candidate: IdRow, path_multiplicity: int) -> int:
+        return self._filter_count(
+            NS_SH.maxCount, lambda x, y: x.__gt__(y), candidate, path_multiplicity
+        )
+
+    def _filter_min_count(self, candidate: IdRow, path_multiplicity: int) -> int:
+        return self._filter_count(
+            NS_SH.minCount, lambda x, y: x.__lt__(y), candidate, path_multiplicity
+        )
+
+    def _filters(
+        self, error_class_iris: typing.Iterable[str]
+    ) -> typing.List[typing.Tuple[str, typing.Callable[[IdRow, int], int]]]:
+        # Key: String of IRI of SHIR error class.
+        # Value: Filter function, taking a candidate row and its rdfs:subPropertyOf* multiplicity, and returning how many rows the SPARQL query would have yielded for the candidate.
+        error_class_iri_to_filter: typing.Dict[
+            str, typing.Callable[[IdRow, int], int]
+        ] = {
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-class"]
+            ): self._filter_class,
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-datatype"]
+            ): self._filter_datatype,
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-maxCount"]
+            ): self._filter_max_count,
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-minCount"]
+            ): self._filter_min_count,
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-path"]
+            ): self._filter_path,
+        }
+        filters = []
+        for error_class_iri in error_class_iris:
+            if error_class_iri not in error_class_iri_to_filter:
+                raise ValueError(
+                    UNKNOWN_ERROR_CLASS_MESSAGE % ("index engine", error_class_iri)
+                )
+            filters.append(
+                (error_class_iri, error_class_iri_to_filter[error_class_iri])
+            )
+        return filters
+
+    def _evaluate(
+        self,
+        candidates: typing.Iterable[IdRow],
+        filters: typing.List[typing.Tuple[str, typing.Callable[[IdRow, int], int]]],
+    ) -> typing.Iterator[typing.Tuple[str, ResultRow]]:
+        for candidate in candidates:
+            # The class, datatype, maxCount and minCount checks share this path test.
+            path_multiplicity = self._subproperty_or_self_multiplicity(
+                candidate[2], candidate[5]
+            )
+            for (error_class_iri, filter_function) in filters:
+                tally = filter_function(candidate, path_multiplicity)
+                if tally == 0:
+                    continue
+                row = self.to_row(candidate)
+                for _ in range(tally):
+                    yield (error_class_iri, row)
+
+    def review(
+        self,
+        error_class_iris: typing.Iterable[str],
+        focus_node_shapes: typing.Optional[typing.Iterable[rdflib.term.Node]] = None,
+    ) -> typing.Iterator[typing.Tuple[str, ResultRow]]:
+        """
+        Yield (error class IRI, row) pairs for each of the requested error classes.
+
+        The candidate join of subclass property shapes against ancestor property shapes is enumerated once, no matter how many error classes are requested.  Each error class is a filter on that stream.
+
+        If focus_node_shapes is provided, only results with those class node shapes (sh:focusNode) are yielded.
+        """
+        return self._evaluate(
+            self._candidates(focus_node_shapes), self._filters(error_class_iris)
+        )
+
+    def review_result(
+        self,
+        error_class_iri: str,
+        n_class_node_shape: rdflib.term.Node,
+        n_class_property_shape: rdflib.term.Node,
+        n_superclass_node_shape: rdflib.term.Node,
+        n_superclass_property_shape: rdflib.term.Node,
+        n_superclass_property_shape_path: rdflib.term.Node,
+    ) -> typing.Iterator[ResultRow]:
+        """
+        Re-check one reported result (identified by its sh:focusNode, sh:value, rdfs:seeAlso, sh:sourceShape and sh:resultPath), yielding the rows, if any, that still support it.
+        """
+        term_ids = [
+            self.terms.lookup(x)
+            for x in [
+                n_class_node_shape,
+                n_class_property_shape,
+                n_superclass_node_shape,
+                n_superclass_property_shape,
+                n_superclass_property_shape_path,
+            ]
+        ]
+        if None in term_ids:
+            return
+        (
+            class_node_shape_id,
+            class_property_shape_id,
+            superclass_node_shape_id,
+            superclass_property_shape_id,
+            superclass_property_shape_path_id,
+        ) = typing.cast(typing.List[int], term_ids)
+        if not self._is_node_shape[class_node_shape_id]:
+            return
+        if not self._is_node_shape[superclass_node_shape_id]:
+            return
+        if not self.class_ancestor_ids.contains(
+            class_node_shape_id, superclass_node_shape_id
+        ):
+            return
+        if (
+            superclass_property_shape_id,
+            superclass_property_shape_path_id,
+        ) not in zip(
+            self.property_shape_ids[superclass_node_shape_id],
+            self.property_shape_path_ids[superclass_node_shape_id],
+        ):
+            return
+        candidates = [
+            (
+                class_node_shape_id,
+                class_property_shape_id,
+                class_property_shape_path_id,
+                superclass_node_shape_id,
+                superclass_property_shape_id,
+                superclass_property_shape_path_id,
+            )
+            for (candidate_property_shape_id, class_property_shape_path_id) in zip(
+                self.property_shape_ids[class_node_shape_id],
+                self.property_shape_path_ids[class_node_shape_id],
+            )
+            if candidate_property_shape_id == class_property_shape_id
+        ]
+        for (_, result) in self._evaluate(candidates, self._filters([error_class_iri])):
+            yield result
+
+    def results(self, error_class_iri: str) -> typing.Iterator[ResultRow]:
+        """
+        Yield the rows the SPARQL query for error_class_iri would yield.
+        """
+        for (_, result) in self.review([error_class_iri]):
+            yield result
+
+    def class_descendants(
+        self,
+    ) -> typing.Dict[rdflib.term.Node, typing.Set[rdflib.term.Node]]:
+        """
+        Inverse of rdfs:subClassOf+.
+        """
+        return _invert(self.class_ancestor_ids, self.terms)
+
+    def datatype_descendants(
+        self,
+    ) -> typing.Dict[rdflib.term.Node, typing.Set[rdflib.term.Node]]:
+        """
+        Map each datatype that a datatype used as a sh:datatype value derives from, to those used datatypes.
+        """
+        descendants: typing.DefaultDict[
+            rdflib.term.Node, typing.Set[rdflib.term.Node]
+        ] = collections.defaultdict(set)
+        for (n_datatype, n_ancestors) in self.datatype_ancestors.items():
+            for n_ancestor in n_ancestors:
+                descendants[n_ancestor].add(n_datatype)
+        return dict(descendants)
+
+    def property_descendants(
+        self,
+    ) -> typing.Dict[rdflib.term.Node, typing.Set[rdflib.term.Node]]:
+        """
+        Inverse of rdfs:subPropertyOf+.
+        """
+        return _invert(self.property_ancestor_ids, self.terms)
@@ -0,0 +1,642 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module loads the input graph files of a review, optionally parsing them in parallel worker processes, and optionally reusing parse results from an on-disk cache.
+
+Loading can follow owl:imports, mapping imported ontology IRIs to local files with a catalog (see case_shacl_inheritance_reviewer.catalog), so the modules an ontology imports need not be listed as input files.
+
+Loading can be limited to schema triples, those the checks and context linking read (see is_schema_triple).  Other triples, such as instance data and most annotations, are dropped by the store as the parser emits them, so they never reach a graph index.
+
+Files compressed with gzip, bzip2 or xz (named with a .gz, .bz2 or .xz suffix after the RDF format's extension, such as ontology.ttl.gz) are decompressed as they are read, without temporary files.  N-Triples and N-Quads files are read a chunk of lines at a time by parse_lines, rather than by rdflib's parser plugins.
+"""
+
+import bz2
+import collections
+import concurrent.futures
+import gzip
+import logging
+import lzma
+import os
+import pathlib
+import re
+import time
+import typing
+
+import rdflib.exceptions
+import rdflib.plugins.parsers.ntriples
+import rdflib.plugins.stores.memory
+import rdflib.util
+
+from case_shacl_inheritance_reviewer.cache import GraphCache
+from case_shacl_inheritance_reviewer.catalog import Catalog
+from case_shacl_inheritance_reviewer.profiling import PhaseProfiler
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Members: Tuples of positional and keyword arguments of one rdflib.Graph.bind() call.
+BindCalls = typing.List[
+    typing.Tuple[typing.Tuple[typing.Any, ...], typing.Dict[str, typing.Any]]
+]
+
+# 0: Triples parsed from one file.
+# 1: Namespace bindings the parser made.
+ParseResult = typing.Tuple[
+    typing.List[typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node]],
+    BindCalls,
+]
+
+
+# Predicates of schema triples, whatever their subject and object.
+SCHEMA_PREDICATES = frozenset(
+    [
+        rdflib.RDF.first,
+        rdflib.RDF.rest,
+        rdflib.RDFS.subClassOf,
+        rdflib.RDFS.subPropertyOf,
+    ]
+)
+
+# Namespaces whose every predicate makes a schema triple.
+SCHEMA_PREDICATE_NAMESPACES = (str(rdflib.OWL), str(rdflib.SH))
+
+# Namespaces of the classes whose rdf:type triples are schema triples.
+SCHEMA_CLASS_NAMESPACES = (
+    str(rdflib.OWL),
+    str(rdflib.RDF),
+    str(rdflib.RDFS),
+    str(rdflib.SH),
+)
+
+
+def is_schema_triple(
+    triple: typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node]
+) -> bool:
+    """
+    True for the triples the checks and context linking read: the class and property hierarchies, every SHACL and OWL predicate (covering shapes and their constraints), RDF list structure (for constraints such as sh:or), and rdf:type triples typing nodes as SHACL, OWL, RDF or RDFS classes.
+
+    Property shapes' triples are copied into reports as context, so in schema-only loading, triples about property shapes that use other predicates (such as rdfs:comment) are not in the report.
+    """
+    (_, predicate, object_) = triple
+    if predicate == rdflib.RDF.type:
+        return isinstance(object_, rdflib.URIRef) and str(object_).startswith(
+            SCHEMA_CLASS_NAMESPACES
+        )
+    return predicate in SCHEMA_PREDICATES or str(predicate).startswith(
+        SCHEMA_PREDICATE_NAMESPACES
+    )
+
+
+# Key: File name suffix of a compression format.
+# Value: Function opening a compressed file for reading its decompressed bytes.
+DECOMPRESSORS: typing.Dict[str, typing.Callable[[str], typing.IO[bytes]]] = {
+    ".bz2": lambda x: bz2.open(x, "rb"),
+    # gzip.open is typed as returning a GzipFile, which the type stubs do not count as an IO.
+    ".gz": lambda x: typing.cast(typing.IO[bytes], gzip.open(x, "rb")),
+    ".xz": lambda x: lzma.open(x, "rb"),
+}
+
+# Formats read by parse_lines.
+LINE_FORMATS = frozenset(["nquads", "nt", "nt11", "ntriples"])
+
+# Size hint of the chunks of lines parse_lines reads.
+LINE_CHUNK_BYTES = 1024 * 1024
+
+# Matches the subject and predicate IRI of an N-Triples or N-Quads line, and the rest of the line.
+_R_LINE_PREDICATE = re.compile(rb"[ \t]*(?:<[^>]*>|_:[^ \t]+)[ \t]*<([^>]*)>[ \t]*(.*)")
+
+_SCHEMA_PREDICATES_BYTES = frozenset(str(x).encode("utf-8") for x in SCHEMA_PREDICATES)
+
+_SCHEMA_PREDICATE_NAMESPACES_BYTES = tuple(
+    x.encode("utf-8") for x in SCHEMA_PREDICATE_NAMESPACES
+)
+
+# Starts of the objects of schema rdf:type lines.
+_SCHEMA_CLASS_STARTS_BYTES = tuple(
+    ("<" + x).encode("utf-8") for x in SCHEMA_CLASS_NAMESPACES
+)
+
+_RDF_TYPE_BYTES = str(rdflib.RDF.type).encode("utf-8")
+
+
+def _is_schema_line(line: bytes) -> bool:
+    """
+    False if the N-Triples or N-Quads line can be seen, without parsing its terms, to not state a schema triple.  Lines that cannot be told apart this way, such as lines with escaped IRIs, are True, and are left to be parsed and filtered.
+    """
+    match = _R_LINE_PREDICATE.match(line)
+    if match is None:
+        return True
+    (predicate, rest) = match.groups()
+    if b"\\" in predicate:
+        return True
+    if predicate == _RDF_TYPE_BYTES:
+        if not rest.startswith(b"<"):
+            return False
+        return b"\\" in rest[: rest.find(b">")] or rest.startswith(
+            _SCHEMA_CLASS_STARTS_BYTES
+        )
+    return predicate in _SCHEMA_PREDICATES_BYTES or predicate.startswith(
+        _SCHEMA_PREDICATE_NAMESPACES_BYTES
+    )
+
+
+def input_format(in_graph_filepath: str) -> typing.Optional[str]:
+    """
+    The RDF format of in_graph_filepath, guessed from its name, ignoring any compression suffix.
+    """
+    (root, extension) = os.path.splitext(in_graph_filepath)
+    if extension in DECOMPRESSORS:
+        return rdflib.util.guess_format(root)
+    return rdflib.util.guess_format(in_graph_filepath)
+
+
+def open_input(in_graph_filepath: str) -> typing.IO[bytes]:
+    """
+    Open in_graph_filepath for reading bytes, decompressing them as they are read if the file name has a compression suffix.
+    """
+    extension = os.path.splitext(in_graph_filepath)[1]
+    if extension in DECOMPRESSORS:
+        return DECOMPRESSORS[extension](in_graph_filepath)
+    return open(in_graph_filepath, "rb")
+
+
+def parse_lines(
+    graph: rdflib.Graph,
+    in_fh: typing.IO[bytes],
+    quads: bool = False,
+    schema_only: bool = False,
+) -> None:
+    """
+    Parse N-Triples lines from in_fh into graph, reading a chunk of lines at a time.  Terms are parsed by rdflib's N-Triples parser, so triples are as rdflib's N-Triples parser plugin makes them.  Blank node labels are scoped to in_fh.
+
+    If quads is true, lines are N-Quads, and their graph labels are ignored: every quad is added to graph.  If schema_only is true, lines whose predicate shows they are not schema triples are skipped before their terms are parsed.  graph is still expected to drop any other non-schema triples, as a SchemaStore does.
+    """
+    ntriples = rdflib.plugins.parsers.ntriples
+    parser = ntriples.W3CNTriplesParser()
+    # Key: Blank node label.
+    # Value: Blank node.
+    bnode_context: typing.Dict[str, rdflib.BNode] = dict()
+    for lines in iter(lambda: in_fh.readlines(LINE_CHUNK_BYTES), []):
+        triples: typing.List[
+            typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node]
+        ] = []
+        for line in lines:
+            if schema_only and not _is_schema_line(line):
+                continue
+            parser.line = line.decode("utf-8").rstrip("\r\n")
+            parser.eat(ntriples.r_wspace)
+            if not parser.line or parser.line.startswith("#"):
+                continue
+            subject = parser.subject(bnode_context)
+            parser.eat(ntriples.r_wspaces)
+            predicate = parser.predicate()
+            parser.eat(ntriples.r_wspaces)
+            object_ = parser.object(bnode_context)
+            parser.eat(ntriples.r_wspace)
+            if quads and parser.uriref() is False:
+                parser.nodeid(bnode_context)
+            parser.eat(ntriples.r_tail)
+            if parser.line:
+                raise rdflib.exceptions.ParserError(
+                    "Trailing garbage: %s" % parser.line
+                )
+            triples.append((subject, predicate, object_))
+        graph.addN((x, y, z, graph) for (x, y, z) in triples)
+
+
+def parse_into(
+    graph: rdflib.Graph, in_graph_filepath: str, schema_only: bool = False
+) -> None:
+    """
+    Parse in_graph_filepath into graph, decompressing it while reading if it is compressed.  N-Triples and N-Quads files are parsed by parse_lines; see there for schema_only.  Other formats are parsed by rdflib's parser plugins.
+    """
+    in_format = input_format(in_graph_filepath)
+    if in_format in LINE_FORMATS:
+        with open_input(in_graph_filepath) as in_fh:
+            parse_lines(
+                graph, in_fh, quads=in_format == "nquads", schema_only=schema_only
+            )
+    elif os.path.splitext(in_graph_filepath)[1] in DECOMPRESSORS:
+        with open_input(in_graph_filepath) as in_fh:
+            graph.parse(
+                source=in_fh,
+                format=in_format,
+                # The base IRI rdflib gives a file it opens itself.
+                publicID=pathlib.Path(in_graph_filepath).absolute().as_uri(),
+            )
+    else:
+        graph.parse(in_graph_filepath, format=in_format)
+
+
+class SchemaStore(rdflib.plugins.stores.memory.Memory):
+    """
+    An in-memory store that drops triples that are not schema triples as they are added.  Filtering in the store, rather than the graph, covers the parsers that add to a graph's store directly.
+    """
+
+    # Whether the store drops non-schema triples itself.
+    schema_only = True
+
+    def add(
+        self,
+        triple: typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node],
+        context: typing.Any,
+        quoted: bool = False,
+    ) -> None:
+        if is_schema_triple(triple):
+            super().add(triple, context, quoted)
+
+
+class _BindRecordingGraph(rdflib.Graph):
+    """
+    A graph that records the namespace bindings rdflib's parsers make, so the bindings can be replayed in the same order on another graph.
+    """
+
+    def __init__(self, schema_only: bool = False) -> None:
+        super().__init__(store=SchemaStore() if schema_only else "default")
+        self.bind_calls: BindCalls = []
+
+    def bind(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        self.bind_calls.append((args, kwargs))
+        super().bind(*args, **kwargs)
+
+
+def _remint_blank_nodes(
+    triples: typing.Iterable[
+        typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node]
+    ]
+) -> typing.Iterator[
+    typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node]
+]:
+    """
+    Replace each blank node in triples with a fresh one minted in this process.  Worker processes can mint colliding blank node identifiers, so each file's blank nodes are re-minted, as a sequential parse into one graph would have.
+    """
+    bnode_map: typing.Dict[rdflib.term.Node, rdflib.term.Node] = dict()
+    for triple in triples:
+        remapped = []
+        for node in triple:
+            if isinstance(node, rdflib.BNode):
+                if node not in bnode_map:
+                    bnode_map[node] = rdflib.BNode()
+                node = bnode_map[node]
+            remapped.append(node)
+        yield (remapped[0], remapped[1], remapped[2])
+
+
+def parse_file(in_graph_filepath: str, schema_only: bool = False) -> ParseResult:
+    """
+    Returns the triples parsed from in_graph_filepath, or only its schema triples if schema_only is true, and the namespace bindings the parser made while parsing them.
+    """
+    graph = _BindRecordingGraph(schema_only)
+    # The recording starts after rdflib binds its default namespaces.
+    graph.bind_calls = []
+    parse_into(graph, in_graph_filepath, schema_only)
+    return (list(graph.triples((None, None, None))), graph.bind_calls)
+
+
+def _cache_key(cache: GraphCache, in_graph_filepath: str, schema_only: bool) -> str:
+    return cache.key(
+        in_graph_filepath,
+        str(input_format(in_graph_filepath)),
+        *(["schema-only"] if schema_only else []),
+    )
+
+
+def load_parse_result(
+    in_graph_filepath: str,
+    cache: typing.Optional[GraphCache] = None,
+    schema_only: bool = False,
+) -> ParseResult:
+    """
+    Returns parse_file's result, from cache if it has the result, otherwise parsed and added to cache.
+    """
+    if cache is None:
+        return parse_file(in_graph_filepath, schema_only)
+    cache_key = _cache_key(cache, in_graph_filepath, schema_only)
+    parse_result: typing.Optional[ParseResult] = cache.get(cache_key)
+    if parse_result is None:
+        parse_result = parse_file(in_graph_filepath, schema_only)
+        cache.put(cache_key, parse_result)
+        cache.evict()
+    return parse_result
+
+
+def _timed_parse_file(
+    in_graph_filepath: str, schema_only: bool = False
+) -> typing.Tuple[ParseResult, float]:
+    """
+    Worker-process function.  Returns parse_file's result, and the seconds taken.
+    """
+    started = time.perf_counter()
+    parse_result = parse_file(in_graph_filepath, schema_only)
+    return (parse_result, time.perf_counter() - started)
+
+
+def merge(graph: rdflib.Graph, parse_result: ParseResult) -> None:
+    """
+    Add a parse result's namespace bindings and triples to graph, re-minting its blank nodes.
+    """
+    (triples, bind_calls) = parse_result
+    for (args, kwargs) in bind_calls:
+        graph.bind(*args, **kwargs)
+    for triple in _remint_blank_nodes(triples):
+        graph.add(triple)
+
+
+def load_graph(
+    graph: rdflib.Graph,
+    in_graph_filepaths: typing.Sequence[str],
+    jobs: int = 1,
+    cache: typing.Optional[GraphCache] = None,
+    profiler: typing.Optional[PhaseProfiler] = None,
+    schema_only: bool = False,
+) -> None:
+    """
+    Parse each file of in_graph_filepaths into graph.  If schema_only is true, only schema triples are kept.  Schema-only loading without a cache or worker processes is fastest into a graph backed by a SchemaStore, which files are parsed straight into.
+
+    If jobs is greater than 1, files are parsed in a pool of that many processes, and merged into graph in the order given.  Namespace bindings are replayed in the order the parser made them, so the result is the same as loading sequentially.
+
+    If cache is provided, files whose parse results are already cached are not parsed, and newly parsed files are added to the cache.
+
+    If profiler is provided, a "parse-file" phase is recorded for each file.  A file's time covers its parse (or cache lookup) and its merge into graph.
+    """
+    if profiler is None:
+        profiler = PhaseProfiler()
+
+    # Files are parsed straight into graph only if graph's store does any schema-only filtering itself.
+    if (
+        cache is None
+        and (not schema_only or getattr(graph.store, "schema_only", False))
+        and (jobs <= 1 or len(in_graph_filepaths) <= 1)
+    ):
+        for in_graph_filepath in in_graph_filepaths:
+            _logger.debug("Loading graph in %r...", in_graph_filepath)
+            with profiler.phase("parse-file", file=in_graph_filepath):
+                parse_into(graph, in_graph_filepath, schema_only)
+            _logger.debug("Loaded.")
+        return
+
+    # Key: Position of file in in_graph_filepaths.
+    # Value: Seconds spent parsing or looking up the file.
+    load_seconds: typing.Dict[int, float] = dict()
+
+    # Key: Position of file in in_graph_filepaths.
+    # Value: Parse result.
+    parse_results: typing.Dict[int, ParseResult] = dict()
+
+    # Key: Position of file in in_graph_filepaths.
+    # Value: Cache key.
+    cache_keys: typing.Dict[int, str] = dict()
+    if cache is not None:
+        for (position, in_graph_filepath) in enumerate(in_graph_filepaths):
+            started = time.perf_counter()
+            cache_keys[position] = _cache_key(cache, in_graph_filepath, schema_only)
+            cached = cache.get(cache_keys[position])
+            load_seconds[position] = time.perf_counter() - started
+            if cached is not None:
+                _logger.debug("Loaded graph in %r from cache.", in_graph_filepath)
+                parse_results[position] = cached
+
+    positions_to_parse = [
+        x for x in range(len(in_graph_filepaths)) if x not in parse_results
+    ]
+    if jobs > 1 and len(positions_to_parse) > 1:
+        _logger.debug(
+            "Loading %d graph files with %d processes...",
+            len(positions_to_parse),
+            jobs,
+        )
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(jobs, len(positions_to_parse))
+        ) as executor:
+            for (position, (parse_result, parse_seconds)) in zip(
+                positions_to_parse,
+                executor.map(
+                    _timed_parse_file,
+                    [in_graph_filepaths[x] for x in positions_to_parse],
+                    [schema_only] * len(positions_to_parse),
+                ),
+            ):
+                parse_results[position] = parse_result
+                load_seconds[position] = load_seconds.get(position, 0.0) + parse_seconds
+    else:
+        for position in positions_to_parse:
+            _logger.debug("Loading graph in %r...", in_graph_filepaths[position])
+            (parse_results[position], parse_seconds) = _timed_parse_file(
+                in_graph_filepaths[position], schema_only
+            )
+            load_seconds[position] = load_seconds.get(position, 0.0) + parse_seconds
+
+    if cache is not None:
+        for position in positions_to_parse:
+            cache.put(cache_keys[position], parse_results[position])
+        cache.evict()
+
+    for position in range(len(in_graph_filepaths)):
+        _logger.debug("Merging graph from %r...", in_graph_filepaths[position])
+        started = time.perf_counter()
+        merge(graph, parse_results.pop(position))
+        profiler.record(
+            "parse-file",
+            load_seconds.get(position, 0.0) + time.perf_counter() - started,
+            file=in_graph_filepaths[position],
+            cached=position not in positions_to_parse,
+        )
+    _logger.debug("Loaded.")
+
+
+def _imported_iris(parse_result: ParseResult) -> typing.List[str]:
+    return sorted(
+        {
+            str(n_object)
+            for (_, n_predicate, n_object) in parse_result[0]
+            if n_predicate == rdflib.OWL.imports and isinstance(n_object, rdflib.URIRef)
+        }
+    )
+
+
+def _ontology_iris(parse_result: ParseResult) -> typing.Set[str]:
+    """
+    IRIs a parse result declares as ontologies, or as ontology versions.
+    """
+    ontology_iris: typing.Set[str] = set()
+    for (n_subject, n_predicate, n_object) in parse_result[0]:
+        if (
+            n_predicate == rdflib.RDF.type
+            and n_object == rdflib.OWL.Ontology
+            and isinstance(n_subject, rdflib.URIRef)
+        ):
+            ontology_iris.add(str(n_subject))
+        elif n_predicate == rdflib.OWL.versionIRI and isinstance(
+            n_object, rdflib.URIRef
+        ):
+            ontology_iris.add(str(n_object))
+    return ontology_iris
+
+
+def load_import_closure(
+    graph: rdflib.Graph,
+    in_graph_filepaths: typing.Sequence[str],
+    catalog: Catalog,
+    jobs: int = 1,
+    cache: typing.Optional[GraphCache] = None,
+    profiler: typing.Optional[PhaseProfiler] = None,
+    schema_only: bool = False,
+) -> typing.List[str]:
+    """
+    Parse each file of in_graph_filepaths, and each module they import by owl:imports, directly or indirectly, into graph.  Imported IRIs are mapped to files by catalog.  Returns the paths of the files loaded, in the order they were merged.
+
+    Each file is parsed once, however many modules import it.  A file's imports are looked up as soon as it is parsed, so, if jobs is greater than 1, modules are parsed in a pool of that many processes as they are found, and independent modules are parsed at the same time.  Parse results are merged in a fixed order: in_graph_filepaths, then the modules they import, breadth-first, with each module's imports in IRI order.
+
+    An imported IRI that catalog does not map, and that no loaded file declares as an owl:Ontology, is not loaded, and is logged as a warning.  See load_graph for the other arguments.
+    """
+    if profiler is None:
+        profiler = PhaseProfiler()
+
+    # Key: Real path of file.
+    # Value: Path the file was first found by.
+    filepaths: typing.Dict[str, str] = dict()
+
+    # Key: Real path of file.
+    # Value: Parse result.
+    parse_results: typing.Dict[str, ParseResult] = dict()
+
+    # Key: Real path of file.
+    # Value: Seconds spent parsing or looking up the file.
+    load_seconds: typing.Dict[str, float] = dict()
+
+    # Key: Real path of file.
+    # Value: Cache key.
+    cache_keys: typing.Dict[str, str] = dict()
+
+    # Members: Real paths of files parsed, rather than found in the cache.
+    parsed_realpaths: typing.Set[str] = set()
+
+    # Key: Real path of file.
+    # Value: IRIs the file imports.
+    imported_iris: typing.Dict[str, typing.List[str]] = dict()
+
+    # Members: Paths of files found, not yet looked up or parsed.
+    found_filepaths: typing.Deque[str] = collections.deque(in_graph_filepaths)
+
+    # Key: Parse in a worker process.
+    # Value: Real path of file.
+    pending: typing.Dict[
+        "concurrent.futures.Future[typing.Tuple[ParseResult, float]]", str
+    ] = dict()
+
+    def _parsed(realpath: str, parse_result: ParseResult) -> None:
+        parse_results[realpath] = parse_result
+        imported_iris[realpath] = _imported_iris(parse_result)
+        for imported_iri in imported_iris[realpath]:
+            imported_filepath = catalog.resolve(imported_iri)
+            if imported_filepath is not None:
+                found_filepaths.append(imported_filepath)
+
+    executor: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
+    if jobs > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+    try:
+        while len(found_filepaths) > 0 or len(pending) > 0:
+            while len(found_filepaths) > 0:
+                in_graph_filepath = found_filepaths.popleft()
+                realpath = os.path.realpath(in_graph_filepath)
+                if realpath in filepaths:
+                    continue
+                filepaths[realpath] = in_graph_filepath
+                if cache is not None:
+                    started = time.perf_counter()
+                    cache_keys[realpath] = _cache_key(
+                        cache, in_graph_filepath, schema_only
+                    )
+                    cached = cache.get(cache_keys[realpath])
+                    load_seconds[realpath] = time.perf_counter() - started
+                    if cached is not None:
+                        _logger.debug(
+                            "Loaded graph in %r from cache.", in_graph_filepath
+                        )
+                        _parsed(realpath, cached)
+                        continue
+                parsed_realpaths.add(realpath)
+                _logger.debug("Loading graph in %r...", in_graph_filepath)
+                if executor is None:
+                    (parse_result, parse_seconds) = _timed_parse_file(
+                        in_graph_filepath, schema_only
+                    )
+                    load_seconds[realpath] = (
+                        load_seconds.get(realpath, 0.0) + parse_seconds
+                    )
+                    _parsed(realpath, parse_result)
+                else:
+                    pending[
+                        executor.submit(
+                            _timed_parse_file, in_graph_filepath, schema_only
+                        )
+                    ] = realpath
+            if len(pending) > 0:
+                (done, _) = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    realpath = pending.pop(future)
+                    (parse_result, parse_seconds) = future.result()
+                    load_seconds[realpath] = (
+                        load_seconds.get(realpath, 0.0) + parse_seconds
+                    )
+                    _parsed(realpath, parse_result)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if cache is not None:
+        for realpath in parsed_realpaths:
+            cache.put(cache_keys[realpath], parse_results[realpath])
+        cache.evict()
+
+    # Members: IRIs declared by loaded files.
+    ontology_iris: typing.Set[str] = set()
+    for parse_result in parse_results.values():
+        ontology_iris |= _ontology_iris(parse_result)
+    for imported_iri in sorted(set().union(*imported_iris.values())):
+        if catalog.resolve(imported_iri) is None and imported_iri not in ontology_iris:
+            _logger.warning(
+                "Imported ontology %r is not in the catalog, and was not loaded.",
+                imported_iri,
+            )
+
+    # Members: Real paths of files, in merge order.
+    merge_order: typing.List[str] = []
+    merge_order_set: typing.Set[str] = set()
+    merge_queue = collections.deque(os.path.realpath(x) for x in in_graph_filepaths)
+    while len(merge_queue) > 0:
+        realpath = merge_queue.popleft()
+        if realpath in merge_order_set:
+            continue
+        merge_order.append(realpath)
+        merge_order_set.add(realpath)
+        for imported_iri in imported_iris[realpath]:
+            imported_filepath = catalog.resolve(imported_iri)
+            if imported_filepath is not None:
+                merge_queue.append(os.path.realpath(imported_filepath))
+
+    for realpath in merge_order:
+        _logger.debug("Merging graph from %r...", filepaths[realpath])
+        started = time.perf_counter()
+        merge(graph, parse_results.pop(realpath))
+        profiler.record(
+            "parse-file",
+            load_seconds.get(realpath, 0.0) + time.perf_counter() - started,
+            file=filepaths[realpath],
+            cached=realpath not in parsed_realpaths,
+        )
+    _logger.debug("Loaded %d files.", len(merge_order))
+    return [filepaths[x] for x in merge_order]
@@ -0,0 +1,164 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module evaluates the index engine's checks in a pool of worker processes.
+
+Every result pairs a node shape (sh:focusNode) with one of its ancestor node shapes (rdfs:seeAlso).  So, node shapes in disconnected components of the class hierarchy never share results, and the review splits into independent work units of node shapes.  Components larger than a unit's share of the work are divided further by focus node shape.  Each unit evaluates all error classes against one shared candidate join, or one error class when a capped review needs them in order, and units' results are merged in a fixed order.
+"""
+
+import concurrent.futures
+import logging
+import os
+import typing
+
+import rdflib
+
+from case_shacl_inheritance_reviewer.index import HierarchyIndex, ResultRow
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Number of work units made per worker process, so a slow unit does not leave other workers idle.
+UNITS_PER_JOB = 4
+
+# The index each worker process evaluates units against, set by _initialize_worker.
+_worker_hierarchy_index: typing.Optional[HierarchyIndex] = None
+
+
+def _initialize_worker(hierarchy_index: HierarchyIndex) -> None:
+    global _worker_hierarchy_index
+    _worker_hierarchy_index = hierarchy_index
+
+
+def _review_unit(
+    unit: typing.Tuple[typing.List[str], typing.List[rdflib.term.Node]]
+) -> typing.List[typing.Tuple[str, ResultRow]]:
+    """
+    Worker-process function.  Returns the results of the given error classes for the given focus node shapes.
+    """
+    assert _worker_hierarchy_index is not None
+    (error_class_iris, focus_node_shapes) = unit
+    return list(
+        _worker_hierarchy_index.review(
+            error_class_iris, focus_node_shapes=focus_node_shapes
+        )
+    )
+
+
+def hierarchy_components(
+    hierarchy_index: HierarchyIndex,
+) -> typing.List[typing.List[rdflib.term.Node]]:
+    """
+    Partition the reviewed node shapes into components connected by rdfs:subClassOf+ links between node shapes.  Components and their members are sorted, largest component first.
+    """
+    # Key: Node shape.
+    # Value: Parent in union-find forest.
+    parents: typing.Dict[rdflib.term.Node, rdflib.term.Node] = {
+        x: x for x in hierarchy_index.node_shapes
+    }
+
+    def _find(n_node_shape: rdflib.term.Node) -> rdflib.term.Node:
+        while parents[n_node_shape] != n_node_shape:
+            parents[n_node_shape] = parents[parents[n_node_shape]]
+            n_node_shape = parents[n_node_shape]
+        return n_node_shape
+
+    for n_node_shape in hierarchy_index.node_shapes:
+        for n_ancestor in hierarchy_index.class_ancestors(n_node_shape):
+            if n_ancestor in parents:
+                parents[_find(n_node_shape)] = _find(n_ancestor)
+
+    # Key: Root node shape of component.
+    # Value: Members of component.
+    components: typing.Dict[rdflib.term.Node, typing.List[rdflib.term.Node]] = dict()
+    for n_node_shape in hierarchy_index.node_shapes:
+        components.setdefault(_find(n_node_shape), []).append(n_node_shape)
+    return sorted(
+        (sorted(x, key=str) for x in components.values()),
+        key=lambda x: (-len(x), str(x[0])),
+    )
+
+
+def work_units(
+    hierarchy_index: HierarchyIndex, n_units: int
+) -> typing.List[typing.List[rdflib.term.Node]]:
+    """
+    Group the reviewed node shapes into about n_units lists of focus node shapes.  Small components are packed together, and components larger than the target unit size are divided.
+    """
+    components = hierarchy_components(hierarchy_index)
+    unit_size = max(1, -(-len(hierarchy_index.node_shapes) // max(1, n_units)))
+
+    units: typing.List[typing.List[rdflib.term.Node]] = []
+    current_unit: typing.List[rdflib.term.Node] = []
+    for component in components:
+        # Node shapes without ancestor node shapes have no results.
+        if len(component) == 1 and not any(
+            x in hierarchy_index.node_shapes
+            for x in hierarchy_index.class_ancestors(component[0])
+        ):
+            continue
+        for offset in range(0, len(component), unit_size):
+            current_unit.extend(component[offset : offset + unit_size])
+            if len(current_unit) >= unit_size:
+                units.append(current_unit)
+                current_unit = []
+    if len(current_unit) > 0:
+        units.append(current_unit)
+    return units
+
+
+def review_parallel(
+    hierarchy_index: HierarchyIndex,
+    error_class_iris: typing.Iterable[str],
+    jobs: int,
+    per_error_class: bool = False,
+) -> typing.Iterator[typing.Tuple[str, ResultRow]]:
+    """
+    Yield the same (error class IRI, row) pairs as hierarchy_index.review(error_class_iris), evaluated with jobs worker processes.
+
+    If per_error_class is True, each error class is evaluated in its own work units, in the order of error_class_iris, and all of an error class's results are yielded before the next error class's.  Units of later error classes are not started until a worker process is free, so a caller that stops early does not evaluate them.
+    """
+    error_class_iris = list(error_class_iris)
+    units = work_units(hierarchy_index, jobs * UNITS_PER_JOB)
+    if jobs <= 1 or len(units) <= 1:
+        if per_error_class:
+            for error_class_iri in error_class_iris:
+                yield from hierarchy_index.review([error_class_iri])
+        else:
+            yield from hierarchy_index.review(error_class_iris)
+        return
+
+    _logger.debug("Reviewing %d work units with %d processes...", len(units), jobs)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(jobs, len(units)),
+        initializer=_initialize_worker,
+        initargs=(hierarchy_index,),
+    ) as executor:
+        if per_error_class:
+            futures = [
+                executor.submit(_review_unit, ([x], y))
+                for x in error_class_iris
+                for y in units
+            ]
+        else:
+            futures = [
+                executor.submit(_review_unit, (error_class_iris, x)) for x in units
+            ]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            # If the caller stops early, such as at a result cap, units not yet started are not run.
+            for future in futures:
+                future.cancel()
+    _logger.debug("Reviewed.")
@@ -0,0 +1,198 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module records wall time, result counts and memory use of the phases of a review.  The records can be written to a JSON file, and added to the report as annotations of the report node.
+
+The memory use of each phase is the change in the process's resident set size from the start to the end of the phase, where the platform reports it (Linux).  Memory a phase allocates and frees before it ends is not counted, and memory it frees can make the change negative.  The process's resident set size high-water mark is also recorded, as of the end of each phase, so it only grows from phase to phase and is not a figure of the phase itself.  If tracemalloc is tracing (e.g. with the environment variable PYTHONTRACEMALLOC=1), the peak of traced Python allocations within each phase is also recorded.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import typing
+
+import rdflib
+
+from case_shacl_inheritance_reviewer.stream import NTriplesReportWriter
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None  # type: ignore
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Increment when the layout of the profile file changes.
+PROFILE_FORMAT_VERSION = 2
+
+
+def current_rss_bytes() -> typing.Optional[int]:
+    """
+    Return this process's current resident set size, or None if the platform does not report it.
+    """
+    try:
+        with open("/proc/self/statm", "r") as statm_fh:
+            resident_pages = int(statm_fh.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def process_peak_rss_bytes() -> typing.Optional[int]:
+    """
+    Return the high-water mark of this process's resident set size, or None if the platform does not report it.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, other platforms report kibibytes.
+    if sys.platform == "darwin":
+        return int(max_rss)
+    return int(max_rss) * 1024
+
+
+class PhaseProfiler:
+    """
+    Collects one record per phase.  Each record is a dictionary, suitable for JSON.
+    """
+
+    def __init__(self) -> None:
+        self.phases: typing.List[typing.Dict[str, typing.Any]] = []
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(
+        self, name: str, **details: typing.Any
+    ) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+        """
+        Time the enclosed block as phase name.  Keyword arguments, and any keys the enclosed block sets on the yielded record, are kept in the record.
+        """
+        record: typing.Dict[str, typing.Any] = {"phase": name}
+        record.update(details)
+        if tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        _logger.debug("Starting phase %r.", name)
+        started_rss_bytes = current_rss_bytes()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - started
+            finished_rss_bytes = current_rss_bytes()
+            if started_rss_bytes is not None and finished_rss_bytes is not None:
+                record["rss_increase_bytes"] = finished_rss_bytes - started_rss_bytes
+            record["process_peak_rss_bytes"] = process_peak_rss_bytes()
+            if tracemalloc.is_tracing():
+                record["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+            self.phases.append(record)
+            _logger.debug(
+                "Finished phase %r in %.3f seconds.", name, record["wall_seconds"]
+            )
+
+    def record(self, name: str, wall_seconds: float, **details: typing.Any) -> None:
+        """
+        Add a phase timed elsewhere, such as in a worker process.  The phase's own memory use is not known, so only this process's high-water mark as of the call is recorded.
+        """
+        record: typing.Dict[str, typing.Any] = {"phase": name}
+        record.update(details)
+        record["wall_seconds"] = wall_seconds
+        record["process_peak_rss_bytes"] = process_peak_rss_bytes()
+        self.phases.append(record)
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        # Imported here to avoid a circular import at package load.
+        from case_shacl_inheritance_reviewer import __version__
+
+        return {
+            "format_version": PROFILE_FORMAT_VERSION,
+            "reviewer_version": __version__,
+            "rdflib_version": rdflib.__version__,
+            "python_version": platform.python_version(),
+            "wall_seconds": time.perf_counter() - self._started,
+            "process_peak_rss_bytes": process_peak_rss_bytes(),
+            "phases": self.phases,
+        }
+
+    def annotate(
+        self,
+        out_graph: typing.Union[rdflib.Graph, NTriplesReportWriter],
+        n_report: rdflib.term.Node,
+    ) -> None:
+        """
+        Add one shir:phaseProfile annotation to n_report per phase recorded so far.
+        """
+        # Imported here to avoid a circular import at package load.
+        from case_shacl_inheritance_reviewer import NS_RDF, NS_SHIR
+
+        # Key: Record key.
+        # Value: Annotation property.
+        key_to_predicate = {
+            "phase": NS_SHIR.phaseName,
+            "error_class": NS_SHIR.phaseErrorClass,
+            "file": NS_SHIR.phaseInputFile,
+            "wall_seconds": NS_SHIR.wallSeconds,
+            "results": NS_SHIR.resultCount,
+            "rss_increase_bytes": NS_SHIR.residentSetIncreaseBytes,
+            "process_peak_rss_bytes": NS_SHIR.processPeakResidentSetBytes,
+            "peak_traced_bytes": NS_SHIR.peakTracedBytes,
+        }
+        for (phase_index, record) in enumerate(self.phases):
+            n_phase_profile = rdflib.BNode()
+            out_graph.add((n_report, NS_SHIR.phaseProfile, n_phase_profile))
+            out_graph.add((n_phase_profile, NS_RDF.type, NS_SHIR.ReviewPhaseProfile))
+            out_graph.add(
+                (n_phase_profile, NS_SHIR.phaseIndex, rdflib.Literal(phase_index))
+            )
+            for key in sorted(record.keys()):
+                if key not in key_to_predicate or record[key] is None:
+                    continue
+                if key == "error_class":
+                    o_value: rdflib.term.Node = rdflib.URIRef(record[key])
+                elif key == "wall_seconds":
+                    o_value = rdflib.Literal(record[key], datatype=rdflib.XSD.double)
+                else:
+                    o_value = rdflib.Literal(record[key])
+                out_graph.add((n_phase_profile, key_to_predicate[key], o_value))
+            for (error_class_iri, error_class_results) in sorted(
+                record.get("error_class_results", dict()).items()
+            ):
+                n_error_class_results = rdflib.BNode()
+                out_graph.add(
+                    (n_phase_profile, NS_SHIR.errorClassResults, n_error_class_results)
+                )
+                out_graph.add(
+                    (
+                        n_error_class_results,
+                        NS_SHIR.phaseErrorClass,
+                        rdflib.URIRef(error_class_iri),
+                    )
+                )
+                out_graph.add(
+                    (
+                        n_error_class_results,
+                        NS_SHIR.resultCount,
+                        rdflib.Literal(error_class_results),
+                    )
+                )
+
+    def write(self, out_filepath: str) -> None:
+        with open(out_filepath, "w") as out_fh:
+            json.dump(self.to_dict(), out_fh, indent=2)
+            out_fh.write("\n")
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module compiles the SPARQL queries of the inheritance checks.  Compiled queries are memoized for the life of the process, and, if a cache is provided, stored in it, so later runs skip rdflib's SPARQL parser and algebra translation.
+
+rdflib's compiled queries do not survive pickling as-is: the algebra's node classes require constructor arguments, and evaluatable nodes hold methods bound to themselves.  A cached query is therefore stored as its prologue's base and namespace bindings, with its algebra pickled using a reducer for those node classes.
+"""
+
+import collections
+import copyreg
+import io
+import logging
+import os
+import pickle
+import types
+import typing
+
+import rdflib
+
+from case_shacl_inheritance_reviewer.cache import GraphCache
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Increment when the layout of a cached compiled query changes.
+QUERY_FORMAT_VERSION = 1
+
+# Key: Tuple.
+#   0: Query text.
+#   1: Sorted namespace bindings, as (prefix, namespace IRI) pairs.
+# Value: Compiled query.
+_memo: typing.Dict[
+    typing.Tuple[str, typing.Tuple[typing.Tuple[str, str], ...]], typing.Any
+] = dict()
+
+
+def _comp_value(
+    cls: typing.Any,
+    attributes: typing.Dict[str, typing.Any],
+    evalfn: typing.Optional[typing.Callable[..., typing.Any]],
+) -> typing.Any:
+    """
+    Reconstruct an algebra node.  Its dict items are restored by pickle after construction.
+    """
+    comp_value = cls.__new__(cls)
+    collections.OrderedDict.__init__(comp_value)
+    comp_value.__dict__.update(attributes)
+    if evalfn is not None:
+        comp_value._evalfn = types.MethodType(evalfn, comp_value)
+    return comp_value
+
+
+def _reduce_comp_value(comp_value: typing.Any) -> typing.Tuple[typing.Any, ...]:
+    attributes = dict(vars(comp_value))
+    evalfn = None
+    # The bound method refers back to the node, so is stored as its function.
+    if attributes.get("_evalfn") is not None:
+        evalfn = attributes.pop("_evalfn").__func__
+    return (
+        _comp_value,
+        (type(comp_value), attributes, evalfn),
+        None,
+        None,
+        # The items are read without CompValue.__getitem__, which can substitute variable bindings.
+        iter(collections.OrderedDict.items(comp_value)),
+    )
+
+
+def dumps_query(query_object: typing.Any) -> bytes:
+    from rdflib.plugins.sparql.parserutils import CompValue, Expr
+
+    out_fh = io.BytesIO()
+    pickler = pickle.Pickler(out_fh, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = copyreg.dispatch_table.copy()
+    pickler.dispatch_table[CompValue] = _reduce_comp_value
+    pickler.dispatch_table[Expr] = _reduce_comp_value
+    pickler.dump(
+        (
+            query_object.prologue.base,
+            list(query_object.prologue.namespace_manager.namespaces()),
+            query_object.algebra,
+            query_object._original_args,
+        )
+    )
+    return out_fh.getvalue()
+
+
+def loads_query(data: bytes) -> typing.Any:
+    from rdflib.plugins.sparql.sparql import Prologue, Query
+
+    (base, namespaces, algebra, original_args) = pickle.loads(data)
+    prologue = Prologue()
+    prologue.base = base
+    for (prefix, namespace) in namespaces:
+        prologue.bind(prefix, namespace)
+    query_object = Query(prologue, algebra)
+    query_object._original_args = original_args
+    return query_object
+
+
+def prepare_query(
+    query_string: str,
+    nsdict: typing.Dict[str, rdflib.URIRef],
+    cache: typing.Optional[GraphCache] = None,
+) -> typing.Any:
+    """
+    Compile a SPARQL query, or reuse an earlier compilation of the same query text with the same namespace bindings, from this process or from cache.
+
+    The cache key covers the query text, the namespace bindings, the rdflib version and the format version of cached queries, so entries from other rdflib versions are never read, and age out of the cache by eviction.
+    """
+    namespaces = tuple(sorted((str(k), str(v)) for (k, v) in nsdict.items()))
+    memo_key = (query_string, namespaces)
+    if memo_key in _memo:
+        return _memo[memo_key]
+
+    query_object: typing.Any = None
+    cache_key: typing.Optional[str] = None
+    if cache is not None:
+        cache_key = cache.settings_key(
+            "query",
+            str(QUERY_FORMAT_VERSION),
+            query_string,
+            *["%s %s" % x for x in namespaces],
+        )
+        data = cache.get(cache_key)
+        if data is not None:
+            try:
+                query_object = loads_query(data)
+            except Exception:
+                _logger.warning("Discarding unreadable cached query %r.", cache_key)
+
+    if query_object is None:
+        # The SPARQL processor, and the query parser it loads, take longer to import than the rest of the program, so are imported only when a query is compiled.
+        import rdflib.plugins.sparql.processor
+
+        _logger.debug("Compiling query...")
+        query_object = rdflib.plugins.sparql.processor.prepareQuery(
+            query_string, initNs=nsdict
+        )
+        _logger.debug("Compiled.")
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, dumps_query(query_object))
+            cache.evict()
+
+    _memo[memo_key] = query_object
+    return query_object
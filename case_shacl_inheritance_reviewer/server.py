@@ -0,0 +1,334 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module runs a long-lived review server.  The server keeps the parsed input graph, and the reviewer's compiled checks, in memory between requests, so a review does not pay for process startup, parsing, or query compilation.
+
+The server speaks HTTP, on a localhost TCP port or on a Unix socket.  Requests are handled one at a time.  Endpoints:
+
+* GET /status - JSON description of the loaded graph.
+* POST /reload - Parse input files again.  The optional JSON request body may have an "in_graph" list of files, replacing the loaded set, and a "changed" list of files to parse again.  With neither, every loaded file is parsed again.  Files that are not changed are merged again from their kept parse results, without parsing.  A member that is not a list of strings is refused with status 400.  If a file fails to load, the loaded graph is kept, and the response has status 500.
+* POST /review - Review the loaded graph.  The response body is the report, serialized in the format named by the optional JSON request body's "format" member (Default: turtle).  The number of results is in the X-Inheritance-Results response header.
+* POST /shutdown - Stop the server.
+
+Each file is parsed into its own parse result, so the per-file results are kept in memory in addition to the merged graph.
+"""
+
+import argparse
+import http.server
+import json
+import logging
+import os
+import socketserver
+import threading
+import typing
+
+import rdflib
+
+from case_shacl_inheritance_reviewer.cache import DEFAULT_MAX_BYTES, GraphCache
+from case_shacl_inheritance_reviewer.load import ParseResult, load_parse_result, merge
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+DEFAULT_PORT = 8765
+
+
+class ReviewState:
+    """
+    The loaded graph, and a reviewer of it.  Not safe for concurrent use.
+    """
+
+    def __init__(
+        self,
+        in_graph_filepaths: typing.Sequence[str],
+        engine: str = "sparql",
+        jobs: int = 1,
+        cache: typing.Optional[GraphCache] = None,
+        schema_only: bool = False,
+    ) -> None:
+        self.engine = engine
+        self.jobs = jobs
+        self.cache = cache
+        self.schema_only = schema_only
+        self.in_graph_filepaths: typing.List[str] = []
+        # Key: Input file path.
+        # Value: Parse result.
+        self._parse_results: typing.Dict[str, ParseResult] = dict()
+        self.reload(in_graph_filepaths)
+
+    def reload(
+        self,
+        in_graph_filepaths: typing.Optional[typing.Sequence[str]] = None,
+        changed_filepaths: typing.Optional[typing.Sequence[str]] = None,
+    ) -> None:
+        """
+        Replace the set of loaded files with in_graph_filepaths, if provided.  Files not loaded before, and files in changed_filepaths, are parsed; other files reuse their kept parse results.  If neither argument is provided, every file is parsed again.  If any file fails to load, the loaded files, graph, and reviewer are left unchanged.
+        """
+        # Imported here to avoid a circular import at package load.
+        from case_shacl_inheritance_reviewer import Reviewer
+
+        if in_graph_filepaths is None and changed_filepaths is None:
+            changed_filepaths = self.in_graph_filepaths
+        if in_graph_filepaths is None:
+            in_graph_filepaths = self.in_graph_filepaths
+        new_in_graph_filepaths = list(in_graph_filepaths)
+        to_parse = set(changed_filepaths or [])
+
+        parse_results: typing.Dict[str, ParseResult] = dict()
+        for in_graph_filepath in new_in_graph_filepaths:
+            if (
+                in_graph_filepath in to_parse
+                or in_graph_filepath not in self._parse_results
+            ):
+                _logger.debug("Loading graph in %r...", in_graph_filepath)
+                parse_results[in_graph_filepath] = load_parse_result(
+                    in_graph_filepath, self.cache, self.schema_only
+                )
+            else:
+                parse_results[in_graph_filepath] = self._parse_results[
+                    in_graph_filepath
+                ]
+
+        # The merged graph is rebuilt, rather than edited, so a triple that a changed file no longer states, but another file does, is kept.
+        graph = rdflib.Graph()
+        for in_graph_filepath in new_in_graph_filepaths:
+            merge(graph, parse_results[in_graph_filepath])
+        reviewer = Reviewer(graph, engine=self.engine, jobs=self.jobs, cache=self.cache)
+        reviewer.prepare()
+
+        self.in_graph_filepaths = new_in_graph_filepaths
+        self._parse_results = parse_results
+        self.graph = graph
+        self.reviewer = reviewer
+        _logger.info(
+            "Loaded %d triples from %d files.", len(graph), len(self.in_graph_filepaths)
+        )
+
+    def status(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "engine": self.engine,
+            "in_graph": self.in_graph_filepaths,
+            "schema_only": self.schema_only,
+            "triples": len(self.graph),
+        }
+
+
+class ReviewRequestHandler(http.server.BaseHTTPRequestHandler):
+    # Set on the handler class made for each server.
+    review_state: ReviewState
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address.
+        if isinstance(self.client_address, tuple) and len(self.client_address) > 0:
+            return str(self.client_address[0])
+        return "local"
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        _logger.info("%s - " + format, self.address_string(), *args)
+
+    def _read_json(self) -> typing.Dict[str, typing.Any]:
+        content_length = int(self.headers.get("Content-Length", 0))
+        if content_length == 0:
+            return dict()
+        request_json = json.loads(self.rfile.read(content_length))
+        if not isinstance(request_json, dict):
+            raise ValueError("Request body is not a JSON object.")
+        return request_json
+
+    @staticmethod
+    def _filepaths_member(
+        request_json: typing.Dict[str, typing.Any], member: str
+    ) -> typing.Optional[typing.List[str]]:
+        """
+        The request member that lists file paths, if present.
+        """
+        filepaths = request_json.get(member)
+        if filepaths is None:
+            return None
+        if not isinstance(filepaths, list) or not all(
+            isinstance(x, str) for x in filepaths
+        ):
+            raise ValueError("Request member %r is not a list of strings." % member)
+        return filepaths
+
+    def _respond(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str = "application/json",
+        headers: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for (header_name, header_value) in (headers or dict()).items():
+            self.send_header(header_name, header_value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _respond_json(self, status: int, value: typing.Any) -> None:
+        self._respond(status, json.dumps(value).encode("utf-8"))
+
+    def do_GET(self) -> None:
+        if self.path == "/status":
+            self._respond_json(200, self.review_state.status())
+        else:
+            self._respond_json(404, {"error": "Unknown path %r." % self.path})
+
+    def do_POST(self) -> None:
+        try:
+            request_json = self._read_json()
+        except ValueError as e:
+            self._respond_json(400, {"error": str(e)})
+            return
+
+        if self.path == "/reload":
+            try:
+                in_graph_filepaths = self._filepaths_member(request_json, "in_graph")
+                changed_filepaths = self._filepaths_member(request_json, "changed")
+            except ValueError as e:
+                self._respond_json(400, {"error": str(e)})
+                return
+            try:
+                self.review_state.reload(in_graph_filepaths, changed_filepaths)
+            except Exception as e:
+                _logger.exception("Reload failed.")
+                self._respond_json(500, {"error": str(e)})
+                return
+            self._respond_json(200, self.review_state.status())
+        elif self.path == "/review":
+            out_format = str(request_json.get("format", "turtle"))
+            try:
+                review_report = self.review_state.reviewer.review(collect_results=False)
+                assert isinstance(review_report.graph, rdflib.Graph)
+                body = review_report.graph.serialize(format=out_format).encode("utf-8")
+            except rdflib.plugin.PluginException as e:
+                self._respond_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                _logger.exception("Review failed.")
+                self._respond_json(500, {"error": str(e)})
+                return
+            self._respond(
+                200,
+                body,
+                content_type="text/plain; charset=utf-8",
+                headers={"X-Inheritance-Results": str(review_report.results_tally)},
+            )
+        elif self.path == "/shutdown":
+            self._respond_json(200, {"shutdown": True})
+            # shutdown() waits for serve_forever() to return, which happens in this thread.
+            threading.Thread(target=self.server.shutdown).start()
+        else:
+            self._respond_json(404, {"error": "Unknown path %r." % self.path})
+
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    """
+    HTTP server on a Unix socket.  http.server.HTTPServer assumes a (host, port) address, so is not used.
+    """
+
+
+def make_server(
+    review_state: ReviewState,
+    port: typing.Optional[int] = None,
+    socket_filepath: typing.Optional[str] = None,
+) -> socketserver.BaseServer:
+    """
+    Make a server for review_state, on socket_filepath if provided, otherwise on the localhost port (Default: DEFAULT_PORT).  Port 0 picks a free port.
+    """
+    handler_class = type(
+        "_ReviewRequestHandler",
+        (ReviewRequestHandler,),
+        {"review_state": review_state},
+    )
+    if socket_filepath is not None:
+        return UnixHTTPServer(socket_filepath, handler_class)
+    return http.server.HTTPServer(
+        ("127.0.0.1", DEFAULT_PORT if port is None else port), handler_class
+    )
+
+
+def main() -> None:
+    # Imported here to avoid a circular import at package load.
+    from case_shacl_inheritance_reviewer import ENGINES
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory caching parsed input files, as for case_shacl_inheritance_reviewer.",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help="Size limit of the cache directory.  (Default: %(default)s.)",
+    )
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="sparql",
+        help="Engine that evaluates inheritance checks.  (Default: %(default)s.)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes evaluating checks with the index engine.  (Default: %(default)s.)",
+    )
+    listen_group = parser.add_mutually_exclusive_group()
+    listen_group.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help="Port to listen on, on 127.0.0.1 only.  (Default: %(default)s.)",
+    )
+    listen_group.add_argument(
+        "--socket", help="Unix socket path to listen on, instead of a TCP port."
+    )
+    parser.add_argument(
+        "--schema-only",
+        action="store_true",
+        help="Keep only the in_graph triples the checks and context linking read, as for case_shacl_inheritance_reviewer.",
+    )
+    parser.add_argument("in_graph", nargs="+")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    graph_cache: typing.Optional[GraphCache] = None
+    if args.cache_dir is not None:
+        graph_cache = GraphCache(args.cache_dir, max_bytes=args.cache_max_bytes)
+
+    review_state = ReviewState(
+        args.in_graph,
+        engine=args.engine,
+        jobs=args.jobs,
+        cache=graph_cache,
+        schema_only=args.schema_only,
+    )
+    server = make_server(review_state, port=args.port, socket_filepath=args.socket)
+    _logger.info("Serving on %r.", server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket is not None and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
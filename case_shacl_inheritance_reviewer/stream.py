@@ -0,0 +1,62 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module writes a report as N-Triples while it is being built, so the memory used for the report does not grow with the number of results.
+"""
+
+import logging
+import os
+import typing
+
+import rdflib
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Number of triples buffered between writes.
+DEFAULT_FLUSH_TRIPLES = 10000
+
+
+class NTriplesReportWriter:
+    """
+    Accepts triples with the same add() call as rdflib.Graph, and appends them to an N-Triples file in batches.  Unlike a graph, only triples within one batch are de-duplicated, so callers are expected to add each triple once.
+    """
+
+    def __init__(
+        self, out_filepath: str, flush_triples: int = DEFAULT_FLUSH_TRIPLES
+    ) -> None:
+        self.flush_triples = flush_triples
+        # Exclusive creation, matching the requirement that out_graph not exist.
+        self._out_fh = open(out_filepath, "xb")
+        self._buffer = rdflib.Graph()
+        self._buffered_tally = 0
+
+    def add(
+        self, triple: typing.Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node]
+    ) -> None:
+        self._buffer.add(triple)
+        self._buffered_tally += 1
+        if self._buffered_tally >= self.flush_triples:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffered_tally == 0:
+            return
+        self._buffer.serialize(self._out_fh, format="nt", encoding="utf-8")
+        self._out_fh.flush()
+        self._buffer = rdflib.Graph()
+        self._buffered_tally = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._out_fh.close()
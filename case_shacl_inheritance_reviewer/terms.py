@@ -0,0 +1,128 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module implements compact storage for the index engine.  RDF terms are interned as integer IDs, and per-term lists of IDs (such as ancestor closures) are packed into flat machine-integer arrays, rather than held as Python sets of term objects.
+"""
+
+import array
+import bisect
+import typing
+
+import rdflib
+
+# Machine integer typecode of ID arrays.  Signed 32-bit on all supported platforms.
+ID_TYPECODE = "i"
+
+
+class TermStore:
+    """
+    Interns RDF terms.  IDs are consecutive integers from 0, in order of first interning.
+    """
+
+    __slots__ = ("terms", "_ids")
+
+    def __init__(self) -> None:
+        # Member at position i: Term with ID i.
+        self.terms: typing.List[rdflib.term.Node] = []
+        # Key: Term.
+        # Value: ID.
+        self._ids: typing.Dict[rdflib.term.Node, int] = dict()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def intern(self, term: rdflib.term.Node) -> int:
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self._ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def lookup(self, term: rdflib.term.Node) -> typing.Optional[int]:
+        """
+        Return the ID of term, or None if term was never interned.
+        """
+        return self._ids.get(term)
+
+    def term(self, term_id: int) -> rdflib.term.Node:
+        return self.terms[term_id]
+
+    def __getstate__(self) -> typing.List[rdflib.term.Node]:
+        # The ID map is rebuilt on unpickling, so it is not pickled.
+        return self.terms
+
+    def __setstate__(self, state: typing.List[rdflib.term.Node]) -> None:
+        self.terms = state
+        self._ids = {x: i for (i, x) in enumerate(self.terms)}
+
+
+class IdLists:
+    """
+    One list of IDs per term ID, stored back-to-back in one array, with one array of offsets into it.  Lists are appended in ascending term ID order, and can be read while later lists are still being appended.  Terms not appended have empty lists.  Lists appended sorted support contains().
+    """
+
+    __slots__ = ("_offsets", "_members", "_next_id")
+
+    def __init__(self, n_terms: int) -> None:
+        # Member at position i: Start of term i's list, and end of term i-1's list.
+        # Positions after the last appended list stay 0, so those terms' lists are empty.
+        self._offsets = array.array(ID_TYPECODE, [0]) * (n_terms + 1)
+        self._members = array.array(ID_TYPECODE)
+        self._next_id = 0
+
+    def append(self, term_id: int, member_ids: typing.Iterable[int]) -> None:
+        if term_id < self._next_id:
+            raise ValueError("Term ID %d was appended out of order." % term_id)
+        # Skipped terms have empty lists.
+        for skipped_id in range(self._next_id + 1, term_id + 1):
+            self._offsets[skipped_id] = len(self._members)
+        self._members.extend(member_ids)
+        self._offsets[term_id + 1] = len(self._members)
+        self._next_id = term_id + 1
+
+    @property
+    def offsets(self) -> "array.array[int]":
+        """
+        Start of each term's list in members, followed by the end of the last term's list.
+        """
+        # Complete the offsets of terms after the last appended list.  Later appends overwrite these.
+        n_trailing = len(self._offsets) - self._next_id - 1
+        if n_trailing > 0:
+            self._offsets[self._next_id + 1 :] = (
+                array.array(ID_TYPECODE, [len(self._members)]) * n_trailing
+            )
+        return self._offsets
+
+    @property
+    def members(self) -> "array.array[int]":
+        return self._members
+
+    def __getitem__(self, term_id: int) -> "array.array[int]":
+        return self._members[self._offsets[term_id] : self._offsets[term_id + 1]]
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def contains(self, term_id: int, member_id: int) -> bool:
+        """
+        Binary search of a sorted list.
+        """
+        start = self._offsets[term_id]
+        end = self._offsets[term_id + 1]
+        position = bisect.bisect_left(self._members, member_id, start, end)
+        return position < end and self._members[position] == member_id
+
+    def total_size(self) -> int:
+        return len(self._members)
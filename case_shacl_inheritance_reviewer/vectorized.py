@@ -0,0 +1,516 @@
+#!/usr/bin/python
+
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to title 17 Section 105 of the
+# United States Code this software is not subject to copyright
+# protection and is in the public domain. NIST assumes no
+# responsibility whatsoever for its use by other parties, and makes
+# no guarantees, expressed or implied, about its quality,
+# reliability, or any other characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module implements the "numpy" review engine, which evaluates the index engine's checks as NumPy array operations over many candidates at once.  NumPy is an optional dependency, needed only for this engine.
+
+The rdfs:subClassOf+ relation among reviewed node shapes, the rdfs:subPropertyOf+ relation among property shape paths, and the rdfs:subClassOf+ relation among sh:class values are each encoded as a packed bit matrix.  Candidate (subclass property shape, ancestor property shape) pairs are enumerated from the node shape matrix a block of rows at a time.  Each check is then a vectorized lookup or comparison over the whole block.
+
+sh:minCount and sh:maxCount values that are valid XSD integers are compared as 64-bit integers.  Any other values are compared one pair at a time, with the same SPARQL FILTER semantics as the index engine, so the yielded rows match the index engine's.
+"""
+
+import logging
+import os
+import typing
+
+import rdflib
+
+from case_shacl_inheritance_reviewer import NS_SH, NS_SHIR, UNKNOWN_ERROR_CLASS_MESSAGE
+from case_shacl_inheritance_reviewer.datatypes import int64_value
+from case_shacl_inheritance_reviewer.index import (
+    N_SH_CLASS,
+    HierarchyIndex,
+    ResultRow,
+    literal_compare,
+)
+from case_shacl_inheritance_reviewer.terms import IdLists
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore
+
+_logger = logging.getLogger(os.path.basename(__file__))
+
+# Upper bound of candidates evaluated in one block of array operations.
+MAX_BLOCK_CANDIDATES = 1 << 20
+
+# Number of node shape matrix rows unpacked at a time.
+ROW_BLOCK = 1024
+
+# Filter taking a block's candidate columns (class node shape, class property shape, class path, superclass node shape, superclass property shape, superclass path) and path multiplicities, and returning each candidate's tally.
+VectorFilter = typing.Callable[
+    [typing.List["numpy.ndarray"], "numpy.ndarray"], "numpy.ndarray"
+]
+
+
+def _as_numpy(ids: typing.Any) -> "numpy.ndarray":
+    """
+    Copy of an ID array, as 64-bit integers.
+    """
+    return numpy.frombuffer(ids, dtype=numpy.intc).astype(numpy.int64)
+
+
+def _expand(
+    starts: "numpy.ndarray", counts: "numpy.ndarray"
+) -> typing.Tuple["numpy.ndarray", "numpy.ndarray"]:
+    """
+    For segments [starts[i], starts[i] + counts[i]), return the segment number and the position of each member of every segment, in order.
+    """
+    segments = numpy.repeat(numpy.arange(len(counts)), counts)
+    firsts = numpy.cumsum(counts) - counts
+    positions = (
+        numpy.arange(int(counts.sum()))
+        - numpy.repeat(firsts, counts)
+        + numpy.repeat(starts, counts)
+    )
+    return (segments, positions)
+
+
+def _tally(
+    candidate_positions: "numpy.ndarray", path_multiplicities: "numpy.ndarray"
+) -> "numpy.ndarray":
+    """
+    Count the value pairs that failed a check, per candidate, weighted by the candidate's path multiplicity.
+    """
+    tallies: "numpy.ndarray" = (
+        numpy.bincount(candidate_positions, minlength=len(path_multiplicities))
+        * path_multiplicities
+    )
+    return tallies
+
+
+class BitMatrix:
+    """
+    A relation among a set of term IDs, as a square bit matrix packed eight columns to a byte.  Rows and columns are in the order of member_ids.
+    """
+
+    __slots__ = ("member_ids", "_positions", "_bits")
+
+    def __init__(
+        self, n_terms: int, member_ids: "numpy.ndarray", closure: IdLists
+    ) -> None:
+        """
+        Row i has the bits set of the members that are in the closure list of member i.
+        """
+        n_members = len(member_ids)
+        self.member_ids = member_ids
+        # Member at position i: Row and column of term ID i, or -1 if the term is not a member.
+        self._positions = numpy.full(n_terms, -1, dtype=numpy.int64)
+        self._positions[member_ids] = numpy.arange(n_members)
+        self._bits = numpy.zeros((n_members, (n_members + 7) // 8), dtype=numpy.uint8)
+
+        offsets = _as_numpy(closure.offsets)
+        (rows, positions) = _expand(
+            offsets[member_ids], offsets[member_ids + 1] - offsets[member_ids]
+        )
+        columns = self._positions[_as_numpy(closure.members)[positions]]
+        rows = rows[columns >= 0]
+        columns = columns[columns >= 0]
+        numpy.bitwise_or.at(
+            self._bits,
+            (rows, columns >> 3),
+            (128 >> (columns & 7)).astype(numpy.uint8),
+        )
+
+    def __len__(self) -> int:
+        return len(self.member_ids)
+
+    def position(self, term_id: int) -> int:
+        """
+        Row and column of term_id, or -1 if the term is not a member.
+        """
+        return int(self._positions[term_id])
+
+    def test(
+        self, row_ids: "numpy.ndarray", column_ids: "numpy.ndarray"
+    ) -> "numpy.ndarray":
+        """
+        Boolean array, true where the pair of term IDs is in the relation.  Non-members are in no pairs.
+        """
+        rows = self._positions[row_ids]
+        columns = self._positions[column_ids]
+        result = numpy.zeros(len(rows), dtype=bool)
+        valid = (rows >= 0) & (columns >= 0)
+        rows = rows[valid]
+        columns = columns[valid]
+        result[valid] = (self._bits[rows, columns >> 3] >> (7 - (columns & 7))) & 1 != 0
+        return result
+
+    def pairs(
+        self, start: int, stop: int
+    ) -> typing.Tuple["numpy.ndarray", "numpy.ndarray"]:
+        """
+        Return the member IDs of each pair in the relation, for the rows from start to stop.
+        """
+        (rows, columns) = numpy.nonzero(
+            numpy.unpackbits(self._bits[start:stop], axis=1, count=len(self))
+        )
+        return (self.member_ids[rows + start], self.member_ids[columns])
+
+
+class VectorizedIndex:
+    """
+    Array encodings of a HierarchyIndex, sufficient to evaluate every error class the index engine evaluates.
+    """
+
+    __slots__ = (
+        "hierarchy_index",
+        "_class_values",
+        "_count_integers",
+        "_count_is_integer",
+        "_count_values",
+        "_datatype_broadening_codes",
+        "_datatype_values",
+        "_entry_counts",
+        "_entry_paths",
+        "_entry_property_shapes",
+        "_entry_starts",
+        "_node_shape_matrix",
+        "_path_matrix",
+        "_class_value_matrix",
+    )
+
+    def __init__(self, hierarchy_index: HierarchyIndex) -> None:
+        if numpy is None:
+            raise ImportError(
+                "The numpy engine requires NumPy.  It can be installed with the 'numpy' extra of this package."
+            )
+        _logger.debug("Building bit matrices...")
+        self.hierarchy_index = hierarchy_index
+        n_terms = len(hierarchy_index.terms)
+
+        # Property shape entries of node shapes: each node shape's (property shape, path) pairs, found with the node shape's start and count of entries.
+        entry_offsets = _as_numpy(hierarchy_index.property_shape_ids.offsets)
+        self._entry_starts = entry_offsets[:-1]
+        self._entry_counts = entry_offsets[1:] - entry_offsets[:-1]
+        self._entry_property_shapes = _as_numpy(
+            hierarchy_index.property_shape_ids.members
+        )
+        self._entry_paths = _as_numpy(hierarchy_index.property_shape_path_ids.members)
+
+        self._node_shape_matrix = BitMatrix(
+            n_terms,
+            _as_numpy(hierarchy_index.node_shape_ids),
+            hierarchy_index.class_ancestor_ids,
+        )
+        self._path_matrix = BitMatrix(
+            n_terms,
+            numpy.unique(self._entry_paths),
+            hierarchy_index.property_ancestor_ids,
+        )
+
+        # Key: Constraint component parameter.
+        # Value: Offsets into, and members of, the property shapes' value lists.
+        self._class_values = self._value_lists(N_SH_CLASS)
+        self._class_value_matrix = BitMatrix(
+            n_terms,
+            numpy.unique(self._class_values[1]),
+            hierarchy_index.class_ancestor_ids,
+        )
+
+        self._datatype_values = self._value_lists(NS_SH.datatype)
+        # Members: (Broader datatype ID, narrower datatype ID) pairs, each encoded as one integer, broader ID * number of terms + narrower ID.
+        self._datatype_broadening_codes = numpy.array(
+            sorted(
+                x * n_terms + y for (x, y) in hierarchy_index.datatype_broadening_ids
+            ),
+            dtype=numpy.int64,
+        )
+
+        self._count_values = {
+            x: self._value_lists(x) for x in [NS_SH.maxCount, NS_SH.minCount]
+        }
+        # Members at position i: Whether term ID i is a valid XSD integer in the range of int64, and its value if so.
+        self._count_is_integer = numpy.zeros(n_terms, dtype=bool)
+        self._count_integers = numpy.zeros(n_terms, dtype=numpy.int64)
+        for (_, value_ids) in self._count_values.values():
+            for value_id in numpy.unique(value_ids).tolist():
+                integer = int64_value(hierarchy_index.terms.term(value_id))
+                if integer is not None:
+                    self._count_is_integer[value_id] = True
+                    self._count_integers[value_id] = integer
+        _logger.debug(
+            "Built, with %d node shapes, %d paths and %d sh:class values.",
+            len(self._node_shape_matrix),
+            len(self._path_matrix),
+            len(self._class_value_matrix),
+        )
+
+    def _value_lists(
+        self, n_parameter: rdflib.URIRef
+    ) -> typing.Tuple["numpy.ndarray", "numpy.ndarray"]:
+        id_lists = self.hierarchy_index.parameter_value_ids[n_parameter]
+        return (_as_numpy(id_lists.offsets), _as_numpy(id_lists.members))
+
+    def _focus_rows(
+        self, focus_node_shapes: typing.Optional[typing.Iterable[rdflib.term.Node]]
+    ) -> typing.List[typing.Tuple[int, int]]:
+        """
+        Node shape matrix row ranges to review.
+        """
+        n_rows = len(self._node_shape_matrix)
+        if focus_node_shapes is None:
+            return [
+                (x, min(x + ROW_BLOCK, n_rows)) for x in range(0, n_rows, ROW_BLOCK)
+            ]
+        rows = set()
+        for n_focus_node_shape in focus_node_shapes:
+            node_shape_id = self.hierarchy_index.terms.lookup(n_focus_node_shape)
+            if node_shape_id is None:
+                continue
+            row = self._node_shape_matrix.position(node_shape_id)
+            if row >= 0:
+                rows.add(row)
+        return [(x, x + 1) for x in sorted(rows)]
+
+    def _candidate_blocks(
+        self,
+        focus_node_shapes: typing.Optional[typing.Iterable[rdflib.term.Node]],
+    ) -> typing.Iterator[typing.List["numpy.ndarray"]]:
+        """
+        Yield blocks of candidates, as the six columns of the index engine's candidate rows.
+        """
+        for (start, stop) in self._focus_rows(focus_node_shapes):
+            (class_node_shapes, superclass_node_shapes) = self._node_shape_matrix.pairs(
+                start, stop
+            )
+            class_entry_counts = self._entry_counts[class_node_shapes]
+            superclass_entry_counts = self._entry_counts[superclass_node_shapes]
+            pair_candidate_counts = class_entry_counts * superclass_entry_counts
+            keep = pair_candidate_counts > 0
+            class_node_shapes = class_node_shapes[keep]
+            superclass_node_shapes = superclass_node_shapes[keep]
+            class_entry_counts = class_entry_counts[keep]
+            superclass_entry_counts = superclass_entry_counts[keep]
+            pair_candidate_counts = pair_candidate_counts[keep]
+
+            # Divide the node shape pairs into blocks of about MAX_BLOCK_CANDIDATES candidates.  A node shape pair with more candidates than that is a block on its own.
+            cumulative_counts = numpy.cumsum(pair_candidate_counts)
+            block_start = 0
+            while block_start < len(pair_candidate_counts):
+                block_end = max(
+                    block_start + 1,
+                    int(
+                        numpy.searchsorted(
+                            cumulative_counts,
+                            cumulative_counts[block_start]
+                            - pair_candidate_counts[block_start]
+                            + MAX_BLOCK_CANDIDATES,
+                            side="right",
+                        )
+                    ),
+                )
+                block = slice(block_start, block_end)
+                (pairs, offsets) = _expand(
+                    numpy.zeros(block_end - block_start, dtype=numpy.int64),
+                    pair_candidate_counts[block],
+                )
+                # Candidates of a node shape pair iterate superclass entries in the outer loop, and class entries in the inner loop.
+                class_entries = (
+                    self._entry_starts[class_node_shapes[block]][pairs]
+                    + offsets % class_entry_counts[block][pairs]
+                )
+                superclass_entries = (
+                    self._entry_starts[superclass_node_shapes[block]][pairs]
+                    + offsets // class_entry_counts[block][pairs]
+                )
+                yield [
+                    class_node_shapes[block][pairs],
+                    self._entry_property_shapes[class_entries],
+                    self._entry_paths[class_entries],
+                    superclass_node_shapes[block][pairs],
+                    self._entry_property_shapes[superclass_entries],
+                    self._entry_paths[superclass_entries],
+                ]
+                block_start = block_end
+
+    def _value_pairs(
+        self,
+        value_lists: typing.Tuple["numpy.ndarray", "numpy.ndarray"],
+        candidates: typing.List["numpy.ndarray"],
+    ) -> typing.Tuple["numpy.ndarray", "numpy.ndarray", "numpy.ndarray"]:
+        """
+        Return, for every pair of a superclass property shape value and a class property shape value of each candidate: the candidate's position, the class property shape value, and the superclass property shape value.
+        """
+        (offsets, members) = value_lists
+        superclass_property_shapes = candidates[4]
+        (candidate_positions, superclass_positions) = _expand(
+            offsets[superclass_property_shapes],
+            offsets[superclass_property_shapes + 1]
+            - offsets[superclass_property_shapes],
+        )
+        class_property_shapes = candidates[1][candidate_positions]
+        (pair_positions, class_positions) = _expand(
+            offsets[class_property_shapes],
+            offsets[class_property_shapes + 1] - offsets[class_property_shapes],
+        )
+        return (
+            candidate_positions[pair_positions],
+            members[class_positions],
+            members[superclass_positions[pair_positions]],
+        )
+
+    def _filter_path(
+        self,
+        candidates: typing.List["numpy.ndarray"],
+        path_multiplicities: "numpy.ndarray",
+    ) -> "numpy.ndarray":
+        return self._path_matrix.test(candidates[5], candidates[2]).astype(numpy.int64)
+
+    def _filter_class(
+        self,
+        candidates: typing.List["numpy.ndarray"],
+        path_multiplicities: "numpy.ndarray",
+    ) -> "numpy.ndarray":
+        (candidate_positions, class_values, superclass_values) = self._value_pairs(
+            self._class_values, candidates
+        )
+        hits = self._class_value_matrix.test(superclass_values, class_values)
+        return _tally(candidate_positions[hits], path_multiplicities)
+
+    def _filter_datatype(
+        self,
+        candidates: typing.List["numpy.ndarray"],
+        path_multiplicities: "numpy.ndarray",
+    ) -> "numpy.ndarray":
+        (candidate_positions, class_values, superclass_values) = self._value_pairs(
+            self._datatype_values, candidates
+        )
+        codes = class_values.astype(numpy.int64) * len(
+            self.hierarchy_index.terms
+        ) + superclass_values.astype(numpy.int64)
+        hits = numpy.isin(codes, self._datatype_broadening_codes)
+        return _tally(candidate_positions[hits], path_multiplicities)
+
+    def _filter_count(
+        self,
+        n_parameter: rdflib.URIRef,
+        compare: typing.Callable[[rdflib.Literal, rdflib.Literal], typing.Any],
+        vector_compare: typing.Callable[
+            ["numpy.ndarray", "numpy.ndarray"], "numpy.ndarray"
+        ],
+        candidates: typing.List["numpy.ndarray"],
+        path_multiplicities: "numpy.ndarray",
+    ) -> "numpy.ndarray":
+        (candidate_positions, class_values, superclass_values) = self._value_pairs(
+            self._count_values[n_parameter], candidates
+        )
+        integers = (
+            self._count_is_integer[class_values]
+            & self._count_is_integer[superclass_values]
+        )
+        hits = numpy.zeros(len(candidate_positions), dtype=bool)
+        hits[integers] = vector_compare(
+            self._count_integers[class_values[integers]],
+            self._count_integers[superclass_values[integers]],
+        )
+        terms = self.hierarchy_index.terms.terms
+        for position in numpy.nonzero(~integers)[0].tolist():
+            hits[position] = literal_compare(
+                compare,
+                terms[int(class_values[position])],
+                terms[int(superclass_values[position])],
+            )
+        return _tally(candidate_positions[hits], path_multiplicities)
+
+    def _filter_max_count(
+        self,
+        candidates: typing.List["numpy.ndarray"],
+        path_multiplicities: "numpy.ndarray",
+    ) -> "numpy.ndarray":
+        return self._filter_count(
+            NS_SH.maxCount,
+            lambda x, y: x.__gt__(y),
+            numpy.greater,
+            candidates,
+            path_multiplicities,
+        )
+
+    def _filter_min_count(
+        self,
+        candidates: typing.List["numpy.ndarray"],
+        path_multiplicities: "numpy.ndarray",
+    ) -> "numpy.ndarray":
+        return self._filter_count(
+            NS_SH.minCount,
+            lambda x, y: x.__lt__(y),
+            numpy.less,
+            candidates,
+            path_multiplicities,
+        )
+
+    def _filters(
+        self, error_class_iris: typing.Iterable[str]
+    ) -> typing.List[typing.Tuple[str, VectorFilter]]:
+        # Key: String of IRI of SHIR error class.
+        # Value: Filter function.
+        error_class_iri_to_filter: typing.Dict[str, VectorFilter] = {
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-class"]
+            ): self._filter_class,
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-datatype"]
+            ): self._filter_datatype,
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-maxCount"]
+            ): self._filter_max_count,
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-minCount"]
+            ): self._filter_min_count,
+            str(
+                NS_SHIR["PropertyShapeComponentBroadenedError-path"]
+            ): self._filter_path,
+        }
+        filters = []
+        for error_class_iri in error_class_iris:
+            if error_class_iri not in error_class_iri_to_filter:
+                raise ValueError(
+                    UNKNOWN_ERROR_CLASS_MESSAGE % ("numpy engine", error_class_iri)
+                )
+            filters.append(
+                (error_class_iri, error_class_iri_to_filter[error_class_iri])
+            )
+        return filters
+
+    def review(
+        self,
+        error_class_iris: typing.Iterable[str],
+        focus_node_shapes: typing.Optional[typing.Iterable[rdflib.term.Node]] = None,
+    ) -> typing.Iterator[typing.Tuple[str, ResultRow]]:
+        """
+        Yield the same (error class IRI, row) pairs as HierarchyIndex.review().
+        """
+        filters = self._filters(error_class_iris)
+        for candidates in self._candidate_blocks(focus_node_shapes):
+            # The class, datatype, maxCount and minCount checks share this path test.
+            path_multiplicities = (candidates[2] == candidates[5]).astype(
+                numpy.int64
+            ) + self._path_matrix.test(candidates[2], candidates[5])
+            for (error_class_iri, filter_function) in filters:
+                tallies = filter_function(candidates, path_multiplicities)
+                positions = numpy.nonzero(tallies)[0]
+                columns = [x[positions].tolist() for x in candidates]
+                for (position, tally) in enumerate(tallies[positions].tolist()):
+                    row = self.hierarchy_index.to_row(
+                        (
+                            columns[0][position],
+                            columns[1][position],
+                            columns[2][position],
+                            columns[3][position],
+                            columns[4][position],
+                            columns[5][position],
+                        )
+                    )
+                    for _ in range(tally):
+                        yield (error_class_iri, row)